@@ -2,7 +2,8 @@
 from django.contrib import admin
 from .models import (
     Grower, Location, MangoTree, MangoThreat, SurveillanceRecord, 
-    TreeInspection, SurveillancePlan, PlantPart
+    TreeInspection, SurveillancePlan, PlantPart, GrowerSurveillanceStats,
+    SurveillanceMonthlyRollup, OutbreakEvent, OutbreakNotification, BackgroundJob
 )
 
 
@@ -133,6 +134,43 @@ class PlantPartAdmin(admin.ModelAdmin):
     ordering = ['-surveillance_priority', 'name']
 
 
+@admin.register(GrowerSurveillanceStats)
+class GrowerSurveillanceStatsAdmin(admin.ModelAdmin):
+    list_display = ['grower', 'total_records', 'total_inspections', 'inspections_with_threats',
+                    'action_required_count', 'updated_at']
+    search_fields = ['grower__farm_name', 'grower__user__username']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(SurveillanceMonthlyRollup)
+class SurveillanceMonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ['grower', 'location', 'month', 'session_count', 'trees_surveyed',
+                    'inspection_count', 'distinct_threats']
+    list_filter = ['month', 'grower']
+    date_hierarchy = 'month'
+    readonly_fields = ['updated_at']
+
+
+@admin.register(OutbreakEvent)
+class OutbreakEventAdmin(admin.ModelAdmin):
+    list_display = ['threat', 'record', 'created_at', 'processed_at']
+    list_filter = ['threat']
+    readonly_fields = ['created_at']
+
+
+@admin.register(OutbreakNotification)
+class OutbreakNotificationAdmin(admin.ModelAdmin):
+    list_display = ['recipient', 'threat', 'location', 'distance_km', 'sent_at']
+    list_filter = ['threat']
+    date_hierarchy = 'sent_at'
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['task', 'status', 'user', 'attempts', 'run_after', 'finished_at']
+    list_filter = ['status', 'task']
+    readonly_fields = ['created_at', 'finished_at', 'locked_by', 'locked_at']
+
 # Register remaining models with basic admin
 
 
@@ -0,0 +1,169 @@
+# alerts.py - Outbreak notifications: queue high-risk detections, send per-recipient email digests
+
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import jobs
+from .models import Grower, OutbreakEvent, OutbreakNotification, TreeInspection
+from .spatial import neighbours
+
+logger = logging.getLogger(__name__)
+
+# Pending events read per worker pass
+DISPATCH_BATCH_SIZE = 500
+
+
+def queue_detections(record_id, threats):
+    """Queue an outbreak event for each high-risk MangoThreat found in a session, once it commits.
+
+    All the request thread pays is an INSERT after commit plus a job for the
+    workers, and nothing when no high-risk threat was found. Events already
+    queued for the same (record, threat) are ignored, so a session with
+    thousands of affected trees queues one per threat.
+    """
+    threat_ids = sorted({threat.pk for threat in threats if threat.risk_level == 'high'})
+    if record_id is None or not threat_ids:
+        return
+    transaction.on_commit(lambda: _queue_events(record_id, threat_ids))
+
+
+def _queue_events(record_id, threat_ids):
+    OutbreakEvent.objects.bulk_create(
+        [OutbreakEvent(record_id=record_id, threat_id=threat_id) for threat_id in threat_ids],
+        ignore_conflicts=True,
+    )
+    # One waiting dispatch job covers every event queued before a worker picks it up
+    jobs.enqueue('dispatch_outbreak_alerts', unique=True)
+
+
+@dataclass
+class Finding:
+    """A high-risk threat at one block, merged across the sessions in a batch"""
+    location: object
+    threat: object
+    trees: int
+    last_seen: object
+
+
+def _findings(events):
+    """{(location_id, threat_id): Finding} with trees counted in one grouped query"""
+    ThreatsThrough = TreeInspection.threats_found.through
+    trees = {
+        (record_id, threat_id): count
+        for record_id, threat_id, count in ThreatsThrough.objects.filter(
+            treeinspection__surveillance_record_id__in={event.record_id for event in events},
+            mangothreat_id__in={event.threat_id for event in events},
+        ).values_list(
+            'treeinspection__surveillance_record_id', 'mangothreat_id'
+        ).annotate(trees=Count('treeinspection_id')).order_by()
+    }
+    findings = {}
+    for event in events:
+        record = event.record
+        count = trees.get((event.record_id, event.threat_id), 0)
+        finding = findings.get((record.location_id, event.threat_id))
+        if finding is None:
+            findings[record.location_id, event.threat_id] = Finding(record.location, event.threat, count, record.date)
+        else:
+            finding.trees += count
+            finding.last_seen = max(finding.last_seen, record.date)
+    return findings
+
+
+def _recipients(findings, radius_km):
+    """{grower_id: {(location_id, threat_id): distance_km or None for their own block}}"""
+    locations = {finding.location.pk: finding.location for finding in findings.values()}
+    nearby = neighbours(locations.values(), radius_km)
+
+    recipients = {}
+    for key, finding in findings.items():
+        owner = finding.location.grower_id
+        if owner is not None:
+            recipients.setdefault(owner, {})[key] = None
+        for location, distance_km in nearby.get(finding.location.pk, ()):
+            grower_id = location.grower_id
+            if grower_id is None or grower_id == owner:
+                continue
+            # Distance to the recipient's nearest block
+            lines = recipients.setdefault(grower_id, {})
+            if key not in lines or distance_km < lines[key]:
+                lines[key] = distance_km
+    return recipients
+
+
+def _digest(grower, lines, findings):
+    """An EmailMessage listing the grower's findings, own blocks first"""
+    entries = []
+    for key, distance_km in sorted(lines.items(), key=lambda item: (item[1] is not None, item[1] or 0)):
+        finding = findings[key]
+        where = f"at your block {finding.location.name}" if distance_km is None else f"{distance_km} km from your nearest block"
+        entries.append(
+            f"- {finding.threat.name} {where}: {finding.trees} tree{'s' if finding.trees != 1 else ''}, "
+            f"last seen {finding.last_seen:%d %b %Y}"
+        )
+    body = "\n".join([
+        f"Hello {grower.user.get_full_name() or grower.user.username},",
+        "",
+        "High-risk threats were recorded on or near your farm:",
+        "",
+        *entries,
+        "",
+        "Check affected and neighbouring blocks and report any findings to your biosecurity officer.",
+    ])
+    subject = f"Outbreak alert: {len(entries)} high-risk detection{'s' if len(entries) != 1 else ''} near you"
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [grower.user.email])
+
+
+def dispatch_pending(batch_size=DISPATCH_BATCH_SIZE, now=None):
+    """Send digests for up to batch_size pending events; returns (events, digests).
+
+    Every recipient gets at most one email per pass, and a block/threat pair
+    already reported to them within OUTBREAK_ALERT_DEDUP_HOURS is left out.
+    Delivery is at least once: events are marked processed after the emails go
+    out, so a failure in between resends that batch on the next pass.
+    """
+    now = now or timezone.now()
+    events = list(
+        OutbreakEvent.objects.filter(processed_at__isnull=True)
+        .select_related('record__location', 'threat').order_by('pk')[:batch_size]
+    )
+    if not events:
+        return 0, 0
+
+    findings = _findings(events)
+    recipients = _recipients(findings, settings.OUTBREAK_ALERT_RADIUS_KM)
+
+    already_sent = set(OutbreakNotification.objects.filter(
+        sent_at__gte=now - timedelta(hours=settings.OUTBREAK_ALERT_DEDUP_HOURS),
+        location_id__in={location_id for location_id, _ in findings},
+        threat_id__in={threat_id for _, threat_id in findings},
+    ).values_list('recipient_id', 'location_id', 'threat_id'))
+
+    growers = Grower.objects.filter(pk__in=list(recipients)).select_related('user').in_bulk()
+    messages, notifications = [], []
+    for grower_id, lines in sorted(recipients.items()):
+        lines = {key: distance for key, distance in lines.items() if (grower_id, *key) not in already_sent}
+        grower = growers[grower_id]
+        if not lines or not grower.user.email:
+            continue
+        messages.append(_digest(grower, lines, findings))
+        notifications.extend(
+            OutbreakNotification(recipient_id=grower_id, location_id=location_id, threat_id=threat_id,
+                                 distance_km=distance, sent_at=now)
+            for (location_id, threat_id), distance in lines.items()
+        )
+
+    if messages:
+        get_connection().send_messages(messages)
+    with transaction.atomic():
+        OutbreakNotification.objects.bulk_create(notifications)
+        OutbreakEvent.objects.filter(pk__in=[event.pk for event in events]).update(processed_at=now)
+    logger.info("Sent %d outbreak digest(s) for %d event(s)", len(messages), len(events))
+    return len(events), len(messages)
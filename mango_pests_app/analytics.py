@@ -0,0 +1,135 @@
+# analytics.py - Independent aggregate queries for the analytics and history statistics endpoints
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Count, F, Sum
+
+from .models import (
+    GrowerSurveillanceStats, Location, MangoThreat, PlantPart, SurveillanceMonthlyRollup,
+    SurveillanceRecord, TreeInspection
+)
+
+TOP_N = 10
+
+
+def _stats_summary(grower):
+    stats = GrowerSurveillanceStats.for_grower(grower)
+    return {
+        'total_sessions': stats.total_records,
+        'total_inspections': stats.total_inspections,
+        'inspections_with_threats': stats.inspections_with_threats,
+        'action_required_count': stats.action_required_count,
+        'detection_rate': round(stats.detection_rate, 1),
+        'avg_session_minutes': stats.avg_time_minutes or 0,
+        'total_trees_surveyed': stats.total_trees_surveyed,
+        'earliest_date': stats.earliest_date,
+        'latest_date': stats.latest_date,
+    }
+
+
+def _monthly_trends(grower):
+    rollups = SurveillanceMonthlyRollup.objects.filter(grower=grower, location__isnull=True).order_by('month')
+    return [{
+        'month': rollup.month,
+        'session_count': rollup.session_count,
+        'avg_time': rollup.avg_time,
+        'trees_surveyed': rollup.trees_surveyed,
+        'threats_found': rollup.distinct_threats,
+    } for rollup in rollups]
+
+
+def _common_threats(grower):
+    return list(MangoThreat.objects.filter(
+        treeinspection__surveillance_record__grower=grower
+    ).values('name', 'slug', 'threat_type', 'risk_level').annotate(
+        detection_count=Count('treeinspection')
+    ).order_by('-detection_count', 'name')[:TOP_N])
+
+
+def _affected_plant_parts(grower):
+    return list(PlantPart.objects.filter(
+        treeinspection__surveillance_record__grower=grower
+    ).values('name', 'surveillance_priority').annotate(
+        inspection_count=Count('treeinspection'),
+        threat_count=Count('treeinspection__threats_found', distinct=True),
+    ).order_by('-inspection_count', 'name')[:TOP_N])
+
+
+def threat_analytics_queries(grower):
+    """{key: zero-argument callable} for ThreatAnalyticsView's figures; each is one query"""
+    threats = MangoThreat.objects.all()
+    return {
+        'by_type': lambda: list(threats.values('threat_type').annotate(count=Count('id')).order_by('threat_type')),
+        'by_risk': lambda: list(threats.values('risk_level').annotate(count=Count('id')).order_by('risk_level')),
+        'total_threats': threats.count,
+        'high_risk_count': threats.filter(risk_level='high').count,
+        'locations_count': Location.objects.filter(grower=grower).count,
+        'threats_detected': MangoThreat.objects.filter(
+            treeinspection__surveillance_record__grower=grower
+        ).distinct().count,
+        'user_metrics': lambda: _stats_summary(grower),
+        'monthly_trends': lambda: _monthly_trends(grower),
+        'common_threats': lambda: _common_threats(grower),
+        'affected_plant_parts': lambda: _affected_plant_parts(grower),
+    }
+
+
+def history_statistics_queries(grower):
+    """{key: zero-argument callable} for the surveillance history statistics"""
+    inspections = TreeInspection.objects.filter(surveillance_record__grower=grower)
+    return {
+        'summary': lambda: _stats_summary(grower),
+        'monthly_trends': lambda: _monthly_trends(grower),
+        'common_threats': lambda: _common_threats(grower),
+        'affected_plant_parts': lambda: _affected_plant_parts(grower),
+        'by_location': lambda: list(SurveillanceRecord.objects.filter(grower=grower).values(
+            'location_id', location_name=F('location__name')
+        ).annotate(
+            session_count=Count('id'), total_minutes=Sum('total_time_minutes')
+        ).order_by('location_name')),
+        'by_severity': lambda: list(inspections.order_by().values('severity_level').annotate(
+            count=Count('id')
+        ).order_by('severity_level')),
+    }
+
+
+def run_sequentially(queries):
+    return {key: query() for key, query in queries.items()}
+
+
+def _on_own_connection(query):
+    """Run `query` in a worker thread on that thread's connection, then close it.
+
+    Worker threads never see request_finished, so their connections would
+    otherwise stay open for the life of the process.
+    """
+    def run():
+        try:
+            return query()
+        finally:
+            connections.close_all()
+    return run
+
+
+def _in_transaction():
+    return connections['default'].in_atomic_block
+
+
+async def run_concurrently(queries):
+    """Evaluate independent queries at the same time, one worker thread and connection each.
+
+    Django's async ORM methods (acount(), aiterator(), ...) all run on one
+    shared thread, one query after another; thread_sensitive=False is what
+    actually overlaps them in the database. Other connections cannot see rows
+    the request's own transaction has not committed (ATOMIC_REQUESTS, tests),
+    so inside a transaction the queries run one by one on the shared thread.
+    """
+    if await sync_to_async(_in_transaction)():
+        return await sync_to_async(run_sequentially)(queries)
+    keys = list(queries)
+    results = await asyncio.gather(*(
+        sync_to_async(_on_own_connection(queries[key]), thread_sensitive=False)() for key in keys
+    ))
+    return dict(zip(keys, results))
@@ -0,0 +1,107 @@
+# api.py - Keyset pagination and field selection helpers for the JSON read API
+
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+API_VERSION = 1
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Selectable threat fields and how each is rendered as JSON
+THREAT_FIELDS = {
+    'id': lambda value: value,
+    'name': lambda value: value,
+    'slug': lambda value: value,
+    'threat_type': lambda value: value,
+    'risk_level': lambda value: value,
+    'description': lambda value: value,
+    'details': lambda value: value,
+    'image': lambda value: default_storage.url(value) if value else None,
+    'created_at': lambda value: value.isoformat(),
+    'updated_at': lambda value: value.isoformat(),
+}
+DEFAULT_THREAT_FIELDS = ('id', 'name', 'slug', 'threat_type', 'risk_level')
+
+# Always read so the next cursor can be built
+KEYSET_FIELDS = ('name', 'id')
+
+
+class APIError(Exception):
+    """Invalid request parameters, reported to the client as a 400"""
+
+
+def parse_fields(raw):
+    if not raw:
+        return DEFAULT_THREAT_FIELDS
+    fields = tuple(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in THREAT_FIELDS]
+    if unknown:
+        raise APIError(f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(THREAT_FIELDS)}")
+    return fields
+
+
+def parse_limit(raw):
+    if not raw:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise APIError("limit must be an integer")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_updated_since(raw):
+    if not raw:
+        return None
+    value = parse_datetime(raw)
+    if value is None:
+        raise APIError("updated_since must be an ISO 8601 datetime")
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, datetime.timezone.utc)
+    return value
+
+
+def encode_cursor(name, pk):
+    payload = json.dumps([name, pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        name, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        raise APIError("Invalid cursor")
+    if not isinstance(name, str) or not isinstance(pk, int):
+        raise APIError("Invalid cursor")
+    return name, pk
+
+
+def keyset_page(queryset, fields, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """One page ordered by (name, id) starting after `cursor`; returns (rows, next_cursor).
+
+    Seeks with WHERE (name, id) > (cursor) instead of OFFSET, so every page
+    costs the same however deep the client pages.
+    """
+    queryset = queryset.order_by(*KEYSET_FIELDS)
+    if cursor:
+        name, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(name__gt=name) | Q(name=name, id__gt=pk))
+
+    columns = tuple(dict.fromkeys(fields + KEYSET_FIELDS))
+    rows = list(queryset.values(*columns)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['name'], rows[-1]['id'])
+
+    results = [{field: THREAT_FIELDS[field](row[field]) for field in fields} for row in rows]
+    return results, next_cursor
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class mango_pests_appConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mango_pests_app'
+
+    def ready(self):
+        # Register signal handlers that maintain denormalized data
+        from . import signals  # noqa: F401
+        # Register background job tasks
+        from . import tasks  # noqa: F401
+        from .search import repair_search_index
+        post_migrate.connect(repair_search_index, sender=self)
@@ -0,0 +1,174 @@
+# benchmarks.py - Page-level performance benchmarks for every app URL
+
+import datetime
+import json
+import logging
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.urls import URLPattern, reverse
+
+from . import urls as app_urls
+from .models import Location, MangoThreat, MangoTree, SurveillanceRecord
+from .profiling import QueryTimer
+
+DEFAULT_BASELINE_PATH = Path(settings.BASE_DIR) / 'benchmarks' / 'page_baselines.json'
+
+# Username prefix for the seeded benchmark dataset
+BENCHMARK_PREFIX = 'bench'
+
+# Views with side effects on GET
+SKIPPED_URL_NAMES = {'logout'}
+
+DEFAULT_DATASET = {
+    'growers': 2,
+    'locations': 4,
+    'trees': 50,
+    'years': 1,
+    'seed': 42,
+    'end_date': '2025-06-30',
+}
+
+DEFAULT_THRESHOLDS = {
+    # Extra queries allowed over the baseline before a view counts as regressed
+    'max_extra_queries': 0,
+    # Allowed relative slowdown of median wall time, 0.5 = 50% slower
+    'max_slowdown': 0.5,
+    # Slowdowns smaller than this are treated as noise
+    'min_slowdown_ms': 10,
+}
+
+
+def seed_dataset(dataset=None, stdout=None):
+    """Generate the benchmark dataset unless it already exists; returns the grower user"""
+    dataset = {**DEFAULT_DATASET, **(dataset or {})}
+    username = f"{BENCHMARK_PREFIX}_grower_1"
+    if not User.objects.filter(username=username).exists():
+        call_command(
+            'generate_load_dataset', prefix=BENCHMARK_PREFIX, growers=dataset['growers'],
+            locations=dataset['locations'], trees=dataset['trees'], years=dataset['years'],
+            seed=dataset['seed'], end_date=datetime.date.fromisoformat(dataset['end_date']), stdout=stdout,
+        )
+    return User.objects.get(username=username)
+
+
+def url_kwargs_for(user):
+    """Sample URL kwargs from the benchmark user's own data"""
+    grower = user.grower
+    record = SurveillanceRecord.objects.filter(grower=grower).order_by('-date', '-pk').first()
+    threat = MangoThreat.objects.order_by('pk').first()
+    return {
+        'pk': {
+            'surveillance_record_detail': record.pk,
+            'location_update': Location.objects.filter(grower=grower).order_by('pk').first().pk,
+            'location_delete': Location.objects.filter(grower=grower).order_by('pk').first().pk,
+            'tree_update': MangoTree.objects.filter(location__grower=grower).order_by('pk').first().pk,
+            'tree_delete': MangoTree.objects.filter(location__grower=grower).order_by('pk').first().pk,
+            # Unknown jobs answer 404, which still measures the lookup
+            'api_job_status': 0,
+            'api_job_download': 0,
+        },
+        'threat_name': threat.slug,
+        'threat_id': threat.pk,
+        # Expired or unknown import reports answer 404
+        'report_id': 'benchmark',
+    }
+
+
+def benchmark_urls(user):
+    """(name, url) for every named pattern in mango_pests_app/urls.py"""
+    sample_kwargs = url_kwargs_for(user)
+    targets = []
+    for pattern in app_urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in SKIPPED_URL_NAMES:
+            continue
+        kwargs = {}
+        for key in pattern.pattern.converters:
+            value = sample_kwargs[key]
+            kwargs[key] = value[pattern.name] if isinstance(value, dict) else value
+        targets.append((pattern.name, reverse(pattern.name, kwargs=kwargs)))
+    return targets
+
+
+def measure(client, url, repeat=3):
+    """Median wall time plus query count and SQL time of the last request"""
+    timings = []
+    for run in range(repeat):
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                # Streaming views run their queries while the body is consumed
+                b''.join(response.streaming_content)
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'url': url,
+        'status': response.status_code,
+        'queries': timer.count,
+        'sql_ms': round(timer.seconds * 1000, 2),
+        'wall_ms': round(statistics.median(timings), 2),
+    }
+
+
+def run_benchmarks(user, repeat=3, stdout=None):
+    """Render every app URL as `user`; one warm-up request per URL fills lazy caches"""
+    # Record a broken view as a 500 instead of aborting the whole run
+    client = Client(raise_request_exception=False)
+    client.force_login(user)
+    request_logger = logging.getLogger('django.request')
+    previous_level = request_logger.level
+    request_logger.setLevel(logging.CRITICAL)
+    results = {}
+    try:
+        for name, url in benchmark_urls(user):
+            client.get(url)
+            results[name] = measure(client, url, repeat=repeat)
+            if stdout:
+                result = results[name]
+                stdout.write(
+                    f"{name:32} {result['status']}  {result['queries']:4} queries  "
+                    f"{result['sql_ms']:8.1f} ms SQL  {result['wall_ms']:8.1f} ms total"
+                )
+    finally:
+        request_logger.setLevel(previous_level)
+    return results
+
+
+def find_regressions(results, baseline, thresholds=None):
+    """Return a message for each view that regressed past the thresholds"""
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['status'] != previous['status']:
+            regressions.append(f"{name}: status {previous['status']} -> {result['status']}")
+        if result['queries'] > previous['queries'] + thresholds['max_extra_queries']:
+            regressions.append(f"{name}: {previous['queries']} -> {result['queries']} queries")
+        slowdown = result['wall_ms'] - previous['wall_ms']
+        if (slowdown > thresholds['min_slowdown_ms']
+                and result['wall_ms'] > previous['wall_ms'] * (1 + thresholds['max_slowdown'])):
+            regressions.append(f"{name}: {previous['wall_ms']:.1f} -> {result['wall_ms']:.1f} ms")
+    return regressions
+
+
+def load_baseline(path=DEFAULT_BASELINE_PATH):
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save_baseline(results, dataset, path=DEFAULT_BASELINE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {'dataset': {**DEFAULT_DATASET, **(dataset or {})}, 'views': results}
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True) + '\n')
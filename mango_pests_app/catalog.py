@@ -0,0 +1,117 @@
+# catalog.py - Versioned in-process cache of the threat and plant part catalogs
+
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import MangoThreat, PlantPart
+
+# Shared by every worker process through the configured cache backend
+CATALOG_VERSION_KEY = 'mango_pests_app:catalog_version'
+
+_lock = threading.Lock()
+_snapshot = None
+# Per thread: publish callbacks of catalog changes its open transaction has not committed,
+# and the private snapshot read while they are pending
+_local = threading.local()
+
+
+class CatalogSnapshot:
+    """Read-only view of MangoThreat and PlantPart rows at one catalog version.
+
+    Instances are shared between requests and threads, so treat the model
+    objects inside as read-only; fetch a fresh row before editing one.
+    """
+
+    def __init__(self, version, threats, plant_parts):
+        self.version = version
+        # Model Meta ordering: threats by name, plant parts by priority then name
+        self.threats = tuple(threats)
+        self.plant_parts = tuple(plant_parts)
+
+        self.threats_by_id = {threat.pk: threat for threat in self.threats}
+        self.threats_by_slug = {threat.slug: threat for threat in self.threats}
+        self.plant_parts_by_name = {part.name: part for part in self.plant_parts}
+        self.high_risk_threats = tuple(threat for threat in self.threats if threat.risk_level == 'high')
+        self.threat_counts = {
+            'total': len(self.threats),
+            'pest': sum(1 for threat in self.threats if threat.threat_type == 'pest'),
+            'disease': sum(1 for threat in self.threats if threat.threat_type == 'disease'),
+        }
+
+
+def current_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # First use, or the cache was flushed: start a fresh version every process agrees on
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def _pending_change():
+    """The latest catalog change this thread's open transaction will publish on commit, or None.
+
+    A change whose savepoint rolled back loses its on_commit callback, so only
+    callbacks still queued on the connection count.
+    """
+    pending = getattr(_local, 'pending', None)
+    if not pending:
+        return None
+    if not connection.in_atomic_block:
+        # Committed (and published) or rolled back
+        pending.clear()
+        return None
+    queued = {entry[1] for entry in connection.run_on_commit}
+    pending[:] = [publish for publish in pending if publish in queued]
+    return pending[-1] if pending else None
+
+
+def get_catalog():
+    """The catalog snapshot for the current version, rebuilt from the database when stale.
+
+    A transaction that changed the catalog reads a snapshot of its own until it
+    ends, so uncommitted rows never reach the one shared by other requests.
+    """
+    global _snapshot
+    version = current_version()
+    change = _pending_change()
+    if change is not None:
+        private = getattr(_local, 'snapshot', None)
+        if private is None or private.version != change.version or _local.based_on != version:
+            private = CatalogSnapshot(change.version, MangoThreat.objects.order_by('name'), PlantPart.objects.all())
+            _local.snapshot, _local.based_on = private, version
+        return private
+
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = CatalogSnapshot(
+                version, MangoThreat.objects.order_by('name'), PlantPart.objects.all()
+            )
+        return _snapshot
+
+
+def invalidate_catalog():
+    """Publish a new catalog version once the current transaction commits.
+
+    Nothing is published before then, so a rollback leaves every process on
+    the committed catalog; until the transaction ends this thread reads its own
+    snapshot (see get_catalog).
+    """
+    version = uuid.uuid4().hex
+
+    def publish():
+        cache.set(CATALOG_VERSION_KEY, version, timeout=None)
+
+    publish.version = version
+    if connection.in_atomic_block:
+        if getattr(_local, 'pending', None) is None:
+            _local.pending = []
+        _local.pending.append(publish)
+    transaction.on_commit(publish)
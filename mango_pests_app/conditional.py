@@ -0,0 +1,79 @@
+# conditional.py - HTTP validators and Cache-Control for threat pages and APIs
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from .catalog import get_catalog
+
+
+def viewer_key(request):
+    """Pages show the navbar for the signed-in user, so validators differ per viewer"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"u{user.pk}"
+    return "anon"
+
+
+def make_etag(*parts):
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def threat_detail_etag(request, threat_name, **kwargs):
+    # A missing threat has no validator, so the view still answers 404
+    threat = get_catalog().threats_by_slug.get(threat_name)
+    if threat is None:
+        return None
+    return make_etag("threat", threat.pk, threat.updated_at.isoformat(), viewer_key(request))
+
+
+def threat_detail_last_modified(request, threat_name, **kwargs):
+    threat = get_catalog().threats_by_slug.get(threat_name)
+    return threat.updated_at if threat is not None else None
+
+
+def catalog_etag(request, *args, **kwargs):
+    """Changes whenever any threat or plant part is saved or deleted, or the query changes.
+
+    The catalog version covers deletions and plant part edits, which no remaining
+    updated_at reflects, so catalog-wide responses send no Last-Modified: a client
+    revalidating on If-Modified-Since alone would get a stale 304.
+    """
+    return make_etag(
+        "catalog", get_catalog().version, request.path, request.GET.urlencode(), viewer_key(request)
+    )
+
+
+def threat_page_cache(view_func):
+    """Cache-Control for threat pages: shared caches for anonymous readers, revalidate otherwise.
+
+    Signed-in pages carry the user's navbar, so they stay private and always
+    revalidate against the ETag. Applied outside condition() so 304s get the
+    same headers.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') or response.status_code not in (200, 304):
+            return response
+        if viewer_key(request) == 'anon':
+            patch_cache_control(response, public=True, max_age=settings.THREAT_PAGE_MAX_AGE)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
+
+
+def private_revalidate(view_func):
+    """Cache-Control for per-user responses such as the API and forms with a CSRF token"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
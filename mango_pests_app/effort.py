@@ -0,0 +1,116 @@
+# effort.py - Set-based surveillance effort engine
+
+from decimal import Decimal
+
+from django.db.models import Case, CharField, Count, Q, Value, When
+
+from .models import MangoTree, SurveillancePlan
+from .routes import plan_route
+
+# Mirrors MangoTree.size_class() so trees can be grouped by size in the database
+TREE_SIZE_CLASS = Case(
+    When(height_meters__gt=4, then=Value('large')),
+    When(Q(height_meters__lt=2) & ~Q(height_meters=0), then=Value('small')),
+    default=Value('standard'),
+    output_field=CharField(),
+)
+
+
+def location_tree_minutes(locations):
+    """Per-location tree count and surveillance minutes in one grouped query.
+
+    Trees are grouped by location, age group, size class and health status.
+    Every tree in a group has the same per-tree time, so each group is priced
+    once with MangoTree.surveillance_time_for() and multiplied by its size.
+    Minutes are summed as Decimals so totals match the per-tree method exactly.
+
+    Returns {location_id: {'tree_count': int, 'minutes': Decimal}}.
+    """
+    groups = (
+        MangoTree.objects.filter(location__in=locations)
+        .annotate(size_class=TREE_SIZE_CLASS)
+        .values('location_id', 'age_group', 'size_class', 'health_status')
+        .annotate(tree_count=Count('id'))
+        .order_by()
+    )
+
+    effort = {}
+    for group in groups:
+        tree_minutes = MangoTree.surveillance_time_for(
+            group['age_group'], group['size_class'], group['health_status']
+        )
+        location_effort = effort.setdefault(
+            group['location_id'], {'tree_count': 0, 'minutes': Decimal('0')}
+        )
+        location_effort['tree_count'] += group['tree_count']
+        location_effort['minutes'] += Decimal(str(tree_minutes)) * group['tree_count']
+
+    return effort
+
+
+# Setup and documentation on top of the time at the trees; travel comes from the route
+PLAN_OVERHEAD = Decimal('0.2')
+
+
+def plan_effort_summary(tree_count, tree_minutes, travel_minutes=0, route_distance_km=0):
+    """The effort dict SurveillancePlan.calculate_surveillance_effort returns"""
+    total_minutes = Decimal(tree_minutes) * (1 + PLAN_OVERHEAD) + Decimal(travel_minutes)
+    return {
+        'total_hours': round(total_minutes / 60, 2),
+        'tree_count': tree_count,
+        'average_minutes_per_tree': round(float(tree_minutes) / tree_count if tree_count > 0 else 0, 1),
+        'travel_minutes': Decimal(travel_minutes),
+        'route_distance_km': Decimal(route_distance_km),
+    }
+
+
+def plan_routes(plan_ids):
+    """{plan_id: routes.Route} through each plan's locations, all plans' locations read in one query"""
+    Through = SurveillancePlan.locations.through
+    locations = {plan_id: [] for plan_id in plan_ids}
+    if not locations:
+        return {}
+    for link in Through.objects.filter(surveillanceplan_id__in=list(locations)).select_related(
+        'location'
+    ).order_by('location_id'):
+        locations[link.surveillanceplan_id].append(link.location)
+    return {plan_id: plan_route(plan_locations) for plan_id, plan_locations in locations.items()}
+
+
+def price_plans(plan_ids):
+    """Tree effort and route for many plans in two queries, whatever their size.
+
+    Returns {plan_id: {'tree_count', 'minutes', 'route'}}.
+    """
+    effort = plan_tree_minutes(plan_ids)
+    for plan_id, route in plan_routes(plan_ids).items():
+        effort[plan_id]['route'] = route
+    return effort
+
+
+def plan_tree_minutes(plan_ids):
+    """Tree count and surveillance minutes for many plans in one grouped query.
+
+    Same grouping as location_tree_minutes, keyed by plan through the plan's
+    locations. A tree at a location shared by two plans counts for both.
+
+    Returns {plan_id: {'tree_count': int, 'minutes': Decimal}} for every id given.
+    """
+    effort = {plan_id: {'tree_count': 0, 'minutes': Decimal('0')} for plan_id in plan_ids}
+    if not effort:
+        return effort
+    groups = (
+        MangoTree.objects.filter(location__surveillanceplan__in=list(effort))
+        .annotate(size_class=TREE_SIZE_CLASS)
+        .values('location__surveillanceplan', 'age_group', 'size_class', 'health_status')
+        .annotate(tree_count=Count('id'))
+        .order_by()
+    )
+    for group in groups:
+        tree_minutes = MangoTree.surveillance_time_for(
+            group['age_group'], group['size_class'], group['health_status']
+        )
+        plan_effort = effort[group['location__surveillanceplan']]
+        plan_effort['tree_count'] += group['tree_count']
+        plan_effort['minutes'] += Decimal(str(tree_minutes)) * group['tree_count']
+    return effort
@@ -0,0 +1,253 @@
+# exports.py - Constant-memory CSV/Parquet export of a grower's surveillance history
+
+import csv
+import datetime
+import io
+from itertools import islice
+
+from django.db.models import Exists, OuterRef
+
+from .catalog import get_catalog
+from .models import SurveillanceRecord, TreeInspection
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Rows buffered per CSV chunk handed to the response
+CSV_ROWS_PER_WRITE = 500
+
+# (column, pyarrow type name) - one row per inspection, record columns repeated on each.
+# Records with no inspections still get one row with the inspection columns empty.
+RECORD_COLUMNS = [
+    ('record_id', 'int64'),
+    ('date', 'date32'),
+    ('location_id', 'int64'),
+    ('location', 'string'),
+    ('start_time', 'time64'),
+    ('end_time', 'time64'),
+    ('weather_conditions', 'string'),
+    ('temperature_celsius', 'float64'),
+    ('trees_surveyed_count', 'int64'),
+    ('total_time_minutes', 'int64'),
+    ('completed', 'bool'),
+    ('notes', 'string'),
+]
+INSPECTION_COLUMNS = [
+    ('inspection_id', 'int64'),
+    ('tree_id', 'string'),
+    ('plant_parts_checked', 'string'),
+    ('threats_found', 'string'),
+    ('threat_count', 'int64'),
+    ('severity_level', 'string'),
+    ('inspection_time_minutes', 'float64'),
+    ('action_required', 'bool'),
+    ('follow_up_date', 'date32'),
+    ('photo_taken', 'bool'),
+    ('findings', 'string'),
+]
+COLUMNS = [name for name, _ in RECORD_COLUMNS + INSPECTION_COLUMNS]
+
+RECORD_VALUES = {
+    'record_id': 'pk', 'date': 'date', 'location_id': 'location_id', 'location': 'location__name',
+    'start_time': 'start_time', 'end_time': 'end_time', 'weather_conditions': 'weather_conditions',
+    'temperature_celsius': 'temperature_celsius', 'trees_surveyed_count': 'trees_surveyed_count',
+    'total_time_minutes': 'total_time_minutes', 'completed': 'completed', 'notes': 'notes',
+}
+INSPECTION_VALUES = {
+    'inspection_id': 'pk', 'record_id': 'surveillance_record_id', 'tree_id': 'tree__tree_id',
+    'threat_count': 'threat_count', 'severity_level': 'severity_level',
+    'inspection_time_minutes': 'inspection_time_minutes', 'action_required': 'action_required',
+    'follow_up_date': 'follow_up_date', 'photo_taken': 'photo_taken', 'findings': 'findings',
+}
+
+# Multi-valued M2M columns are joined into one cell
+LIST_SEPARATOR = '; '
+
+
+class ExportError(Exception):
+    """Export cannot be produced, e.g. an unknown format or a missing optional dependency"""
+
+
+def _parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def filter_history(queryset, params):
+    """Apply the surveillance history filters in `params` (request.GET or a dict of strings)"""
+    date_from = _parse_date(params.get('date_from'))
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    date_to = _parse_date(params.get('date_to'))
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    location_id = params.get('location')
+    if location_id:
+        try:
+            queryset = queryset.filter(location_id=int(location_id))
+        except (ValueError, TypeError):
+            pass
+    if params.get('has_threats') in ('1', 'on', 'true', 'True'):
+        queryset = queryset.filter(
+            Exists(TreeInspection.objects.filter(surveillance_record=OuterRef('pk'), has_threats=True))
+        )
+    return queryset
+
+
+def history_queryset(grower, params):
+    """The grower's records as SurveillanceHistoryView lists them, newest first"""
+    records = SurveillanceRecord.objects.filter(grower=grower)
+    return filter_history(records, params).order_by('-date', '-created_at', '-pk')
+
+
+def _inspection_rows(records, chunk_size):
+    """Inspection dicts in the same record order as `records`, with M2M names filled in.
+
+    Streams with .iterator() and looks up plant parts and threats for one chunk
+    of inspections at a time through the M2M tables, so memory stays flat.
+    """
+    catalog = get_catalog()
+    part_names = {part.pk: part.name for part in catalog.plant_parts}
+    threat_names = {threat.pk: threat.name for threat in catalog.threats}
+    parts_through = TreeInspection.plant_parts_checked.through
+    threats_through = TreeInspection.threats_found.through
+
+    inspections = TreeInspection.objects.filter(
+        surveillance_record__in=records.order_by().values('pk')
+    ).order_by(
+        '-surveillance_record__date', '-surveillance_record__created_at', '-surveillance_record_id', 'pk'
+    ).values(*INSPECTION_VALUES.values()).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(inspections, chunk_size))
+        if not chunk:
+            return
+        ids = [row['pk'] for row in chunk]
+        parts, threats = {}, {}
+        for inspection_id, part_id in parts_through.objects.filter(
+            treeinspection_id__in=ids
+        ).values_list('treeinspection_id', 'plantpart_id'):
+            parts.setdefault(inspection_id, []).append(part_names.get(part_id, str(part_id)))
+        for inspection_id, threat_id in threats_through.objects.filter(
+            treeinspection_id__in=ids
+        ).values_list('treeinspection_id', 'mangothreat_id'):
+            threats.setdefault(inspection_id, []).append(threat_names.get(threat_id, str(threat_id)))
+
+        for row in chunk:
+            flat = {column: row[source] for column, source in INSPECTION_VALUES.items()}
+            flat['plant_parts_checked'] = LIST_SEPARATOR.join(sorted(parts.get(row['pk'], ())))
+            flat['threats_found'] = LIST_SEPARATOR.join(sorted(threats.get(row['pk'], ())))
+            yield flat
+
+
+def history_rows(records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Flattened rows (dicts keyed by COLUMNS) for an ordered history_queryset().
+
+    Records and inspections are streamed side by side in the same order and
+    merged, like a left join that never holds more than one chunk of either.
+    """
+    record_rows = records.values(*RECORD_VALUES.values()).iterator(chunk_size=chunk_size)
+    inspections = _inspection_rows(records, chunk_size)
+    pending = next(inspections, None)
+    empty_inspection = dict.fromkeys(name for name, _ in INSPECTION_COLUMNS)
+
+    for record in record_rows:
+        base = {column: record[source] for column, source in RECORD_VALUES.items()}
+        emitted = False
+        while pending is not None and pending['record_id'] == base['record_id']:
+            yield {**base, **pending}
+            emitted = True
+            pending = next(inspections, None)
+        if not emitted:
+            yield {**base, **empty_inspection}
+
+
+def csv_chunks(rows):
+    """Encoded CSV (header first) in chunks of CSV_ROWS_PER_WRITE rows"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % CSV_ROWS_PER_WRITE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file that hands back whatever pyarrow has written since the last drain()"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_chunks(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Parquet bytes, one row group per chunk of rows; needs pyarrow"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    types = {
+        'int64': pa.int64(), 'string': pa.string(), 'bool': pa.bool_(), 'float64': pa.float64(),
+        'date32': pa.date32(), 'time64': pa.time64('us'),
+    }
+    schema = pa.schema([(name, types[kind]) for name, kind in RECORD_COLUMNS + INSPECTION_COLUMNS])
+    decimal_columns = ('temperature_celsius', 'inspection_time_minutes')
+    return _parquet_stream(pa, pq, schema, decimal_columns, rows, chunk_size)
+
+
+def _parquet_stream(pa, pq, schema, decimal_columns, rows, chunk_size):
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            for row in chunk:
+                for column in decimal_columns:
+                    if row[column] is not None:
+                        row[column] = float(row[column])
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def export_chunks(records, export_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Byte chunks of `records` in `export_format`; raises ExportError before any query runs"""
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown format {export_format!r}. Choose from: {', '.join(EXPORT_FORMATS)}")
+    rows = history_rows(records, chunk_size=chunk_size)
+    if export_format == 'parquet':
+        return parquet_chunks(rows, chunk_size=chunk_size)
+    return csv_chunks(rows)
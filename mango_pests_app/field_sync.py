@@ -0,0 +1,413 @@
+# field_sync.py - Batch upload of surveillance sessions captured offline by the field app
+
+import datetime
+import json
+import zlib
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.utils.dateparse import parse_date, parse_time
+
+from .alerts import queue_detections
+from .catalog import get_catalog
+from .inspections import INSPECTION_BATCH_SIZE
+from .models import (
+    GrowerSurveillanceStats, Location, MangoTree, SurveillanceMonthlyRollup, SurveillancePlan, SurveillanceRecord,
+    TreeInspection
+)
+
+BUNDLE_VERSION = 1
+
+# Limits on one upload, checked before anything is looked up
+MAX_BUNDLE_BYTES = 10 * 1024 * 1024  # after decompression
+MAX_SESSIONS = 200
+MAX_INSPECTIONS_PER_SESSION = 5000
+MAX_ERRORS_PER_SESSION = 20
+
+# Keeps each tree_id__in lookup well under SQLite's variable limit
+LOOKUP_BATCH_SIZE = 500
+
+CLIENT_KEY_MAX_LENGTH = SurveillanceRecord._meta.get_field('client_key').max_length
+SEVERITY_LEVELS = {value for value, label in TreeInspection._meta.get_field('severity_level').choices}
+
+
+class BundleError(Exception):
+    """The upload as a whole cannot be read, reported to the client as a 400"""
+
+
+class BundleTooLarge(BundleError):
+    """The upload is over the size limits, reported as a 413"""
+
+
+def decode_bundle(body, content_encoding=''):
+    """The list of sessions in a JSON bundle, gzip/deflate compressed or not"""
+    encoding = content_encoding.strip().lower()
+    if encoding in ('gzip', 'x-gzip', 'deflate') or body[:2] == b'\x1f\x8b':
+        # +32 accepts both gzip and zlib headers; max_length stops a decompression bomb early
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        try:
+            body = decompressor.decompress(body, MAX_BUNDLE_BYTES + 1)
+        except zlib.error:
+            raise BundleError("The bundle is not valid gzip/deflate data")
+    elif encoding not in ('', 'identity'):
+        raise BundleError(f"Unsupported Content-Encoding '{content_encoding}'")
+    if len(body) > MAX_BUNDLE_BYTES:
+        raise BundleTooLarge(f"The bundle is over {MAX_BUNDLE_BYTES // (1024 * 1024)} MiB uncompressed")
+
+    try:
+        bundle = json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        raise BundleError("The bundle is not valid JSON")
+    if not isinstance(bundle, dict) or not isinstance(bundle.get('sessions'), list):
+        raise BundleError('The bundle must be an object with a "sessions" list')
+    if bundle.get('version', BUNDLE_VERSION) != BUNDLE_VERSION:
+        raise BundleError(f"Unsupported bundle version {bundle.get('version')!r}")
+    if len(bundle['sessions']) > MAX_SESSIONS:
+        raise BundleTooLarge(f"A bundle holds at most {MAX_SESSIONS} sessions")
+    return bundle['sessions']
+
+
+def _text(data, field, max_length=None):
+    value = data.get(field)
+    if value in (None, ''):
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    if max_length and len(value) > max_length:
+        raise ValueError(f"{field} is longer than {max_length} characters")
+    return value
+
+
+def _flag(data, field, default=False):
+    value = data.get(field, default)
+    if not isinstance(value, bool):
+        raise ValueError(f"{field} must be true or false")
+    return value
+
+
+def _date(data, field, required=False):
+    value = data.get(field)
+    if value in (None, ''):
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    try:
+        parsed = parse_date(value) if isinstance(value, str) else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"{field} must be a YYYY-MM-DD date")
+    return parsed
+
+
+def _time(data, field):
+    value = data.get(field)
+    if value in (None, ''):
+        return None
+    try:
+        parsed = parse_time(value) if isinstance(value, str) else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"{field} must be an HH:MM time")
+    return parsed
+
+
+def _decimal(data, field):
+    """A DecimalField(4, 1) value"""
+    value = data.get(field)
+    if value in (None, ''):
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{field} must be a number")
+    try:
+        number = Decimal(str(value)).quantize(Decimal('0.1'))
+    except InvalidOperation:
+        raise ValueError(f"{field} must be a number")
+    # json.loads accepts a bare NaN, which quantizes fine but cannot be compared
+    if not number.is_finite():
+        raise ValueError(f"{field} must be a number")
+    if abs(number) >= 1000:
+        raise ValueError(f"{field} must be between -999.9 and 999.9")
+    return number
+
+
+def _names(data, field):
+    value = data.get(field) or []
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ValueError(f"{field} must be a list of strings")
+    return list(dict.fromkeys(value))
+
+
+class _Session:
+    """One session of the bundle while it is validated"""
+
+    def __init__(self, data):
+        self.data = data if isinstance(data, dict) else {}
+        self.client_key = None
+        self.record = None
+        self.inspections = []  # (tree_id, TreeInspection fields, plant part names, threat slugs)
+        self.errors = []
+        self.status = None
+
+    def error(self, message):
+        if len(self.errors) < MAX_ERRORS_PER_SESSION:
+            self.errors.append(message)
+
+    def check(self, parse, prefix=''):
+        """parse(), with a ValueError recorded against the session instead of raised"""
+        try:
+            return parse()
+        except ValueError as e:
+            self.error(f"{prefix}{e}")
+            return None
+
+    def result(self):
+        result = {'client_key': self.client_key, 'status': self.status}
+        if self.status == 'rejected':
+            result['errors'] = self.errors
+        else:
+            result['record_id'] = self.record.pk
+        if self.status == 'created':
+            result['inspections'] = len(self.inspections)
+        return result
+
+
+class FieldSync:
+    """Validate a grower's sessions in one pass, then save the valid ones in one transaction.
+
+    Each session carries a client_key chosen by the field app. A session whose
+    key is already stored is reported as a duplicate and not saved again, so an
+    upload can be retried safely. A session with any invalid field or reference
+    is rejected as a whole, with its errors.
+    """
+
+    def __init__(self, grower):
+        self.grower = grower
+        self.sessions = []
+
+    def run(self, sessions):
+        self.sessions = [_Session(data) for data in sessions]
+        for session in self.sessions:
+            self.parse(session)
+        self.resolve()
+        for attempt in range(2):
+            self.mark_duplicates()
+            try:
+                self.save()
+            except IntegrityError:
+                # A concurrent upload stored one of these keys after the check; check again once
+                if attempt:
+                    raise
+                continue
+            break
+        return self
+
+    def parse(self, session):
+        """Check everything that needs no database lookup"""
+        data = session.data
+        if not data:
+            session.error("A session must be an object")
+            return
+        session.client_key = session.check(lambda: _text(data, 'client_key', CLIENT_KEY_MAX_LENGTH))
+        if session.client_key is None and not session.errors:
+            session.error("client_key is required")
+
+        date = session.check(lambda: _date(data, 'date', required=True))
+        start_time = session.check(lambda: _time(data, 'start_time'))
+        end_time = session.check(lambda: _time(data, 'end_time'))
+        total_time = None
+        if start_time and end_time and date:
+            if end_time < start_time:
+                session.error("end_time is before start_time")
+            else:
+                delta = datetime.datetime.combine(date, end_time) - datetime.datetime.combine(date, start_time)
+                total_time = int(delta.total_seconds() / 60)
+        location_id = data.get('location_id')
+        if not isinstance(location_id, int) or isinstance(location_id, bool):
+            session.error("location_id must be a location id")
+            location_id = None
+
+        session.record = SurveillanceRecord(
+            grower=self.grower,
+            location_id=location_id,
+            date=date,
+            start_time=start_time,
+            end_time=end_time,
+            total_time_minutes=total_time,
+            weather_conditions=session.check(lambda: _text(data, 'weather_conditions', 100)),
+            temperature_celsius=session.check(lambda: _decimal(data, 'temperature_celsius')),
+            notes=session.check(lambda: _text(data, 'notes')),
+            # A session uploaded from the field has been finished unless the app says otherwise
+            completed=session.check(lambda: _flag(data, 'completed', default=True)) is not False,
+            client_key=session.client_key,
+        )
+
+        inspections = data.get('inspections') or []
+        if not isinstance(inspections, list):
+            session.error("inspections must be a list")
+            return
+        if len(inspections) > MAX_INSPECTIONS_PER_SESSION:
+            session.error(f"A session holds at most {MAX_INSPECTIONS_PER_SESSION} inspections")
+            return
+        seen = set()
+        for index, item in enumerate(inspections):
+            prefix = f"inspections[{index}]."
+            if not isinstance(item, dict):
+                session.error(f"inspections[{index}] must be an object")
+                continue
+            tree_id = session.check(lambda: _text(item, 'tree_id', 100), prefix)
+            if tree_id is None:
+                session.error(f"{prefix}tree_id is required")
+            elif tree_id in seen:
+                session.error(f"{prefix}tree '{tree_id}' is inspected more than once in this session")
+            seen.add(tree_id)
+
+            severity = item.get('severity_level') or 'none'
+            if not isinstance(severity, str) or severity not in SEVERITY_LEVELS:
+                session.error(f"{prefix}unknown severity_level {severity!r}")
+            fields = {
+                'severity_level': severity,
+                'inspection_time_minutes': session.check(lambda: _decimal(item, 'inspection_time_minutes'), prefix),
+                'findings': session.check(lambda: _text(item, 'findings'), prefix),
+                'action_required': bool(session.check(lambda: _flag(item, 'action_required'), prefix)),
+                'follow_up_date': session.check(lambda: _date(item, 'follow_up_date'), prefix),
+                'photo_taken': bool(session.check(lambda: _flag(item, 'photo_taken'), prefix)),
+                'photo_filename': session.check(lambda: _text(item, 'photo_filename', 255), prefix),
+            }
+            plant_parts = session.check(lambda: _names(item, 'plant_parts'), prefix) or []
+            if not plant_parts and not any(error.startswith(f"{prefix}plant_parts") for error in session.errors):
+                session.error(f"{prefix}plant_parts must name at least one part")
+            threats = session.check(lambda: _names(item, 'threats'), prefix) or []
+            session.inspections.append((tree_id, fields, plant_parts, threats))
+
+    def resolve(self):
+        """Check every location, tree, plant part and threat reference with set-based lookups"""
+        location_ids = set(Location.objects.filter(grower=self.grower).values_list('pk', flat=True))
+        tree_ids = sorted({
+            tree_id for session in self.sessions for tree_id, _, _, _ in session.inspections if tree_id
+        })
+        trees = {}
+        for start in range(0, len(tree_ids), LOOKUP_BATCH_SIZE):
+            trees.update(
+                (tree_id, (pk, location_id))
+                for pk, tree_id, location_id in MangoTree.objects.filter(
+                    location__grower=self.grower, tree_id__in=tree_ids[start:start + LOOKUP_BATCH_SIZE]
+                ).values_list('pk', 'tree_id', 'location_id')
+            )
+        catalog = get_catalog()
+
+        keys = set()
+        for session in self.sessions:
+            if session.client_key is not None:
+                if session.client_key in keys:
+                    session.error("client_key repeats an earlier session in this bundle")
+                keys.add(session.client_key)
+            location_id = session.record.location_id if session.record else None
+            if location_id is not None and location_id not in location_ids:
+                session.error(f"Unknown location {location_id}")
+            for index, (tree_id, fields, plant_parts, threats) in enumerate(session.inspections):
+                prefix = f"inspections[{index}]."
+                tree = trees.get(tree_id)
+                if tree_id and tree is None:
+                    session.error(f"{prefix}unknown tree '{tree_id}'")
+                elif tree and location_id in location_ids and tree[1] != location_id:
+                    session.error(f"{prefix}tree '{tree_id}' is not at location {location_id}")
+                for name in plant_parts:
+                    if name not in catalog.plant_parts_by_name:
+                        session.error(f"{prefix}unknown plant part '{name}'")
+                for slug in threats:
+                    if slug not in catalog.threats_by_slug:
+                        session.error(f"{prefix}unknown threat '{slug}'")
+            if session.errors:
+                session.status = 'rejected'
+        self.trees = trees
+        self.catalog = catalog
+
+    def mark_duplicates(self):
+        """One query for the keys this grower has already synced"""
+        pending = [session for session in self.sessions if session.status != 'rejected']
+        stored = dict(SurveillanceRecord.objects.filter(
+            grower=self.grower, client_key__in=[session.client_key for session in pending]
+        ).values_list('client_key', 'pk'))
+        for session in pending:
+            if session.client_key in stored:
+                session.status = 'duplicate'
+                session.record.pk = stored[session.client_key]
+            else:
+                session.status = 'created'
+
+    @transaction.atomic
+    def save(self):
+        """Insert the new sessions, their inspections and M2M links with bulk inserts"""
+        new = [session for session in self.sessions if session.status == 'created']
+        if not new:
+            return
+        for session in new:
+            # Cleared in case a failed attempt left a rolled-back primary key behind
+            session.record.pk = None
+            session.record._state.adding = True
+            session.record.trees_surveyed_count = len(session.inspections)
+        SurveillanceRecord.objects.bulk_create([session.record for session in new], batch_size=INSPECTION_BATCH_SIZE)
+
+        inspections, parts, threats = [], [], []
+        for session in new:
+            for tree_id, fields, plant_parts, threat_slugs in session.inspections:
+                inspections.append(TreeInspection(
+                    surveillance_record=session.record,
+                    tree_id=self.trees[tree_id][0],
+                    # save() is skipped by bulk_create, so set what it would have
+                    threat_count=len(threat_slugs),
+                    has_threats=bool(threat_slugs),
+                    **fields
+                ))
+                parts.append(plant_parts)
+                threats.append(threat_slugs)
+        inspections = TreeInspection.objects.bulk_create(inspections, batch_size=INSPECTION_BATCH_SIZE)
+
+        PlantPartsThrough = TreeInspection.plant_parts_checked.through
+        PlantPartsThrough.objects.bulk_create(
+            [
+                PlantPartsThrough(
+                    treeinspection_id=inspection.pk, plantpart_id=self.catalog.plant_parts_by_name[name].pk
+                )
+                for inspection, names in zip(inspections, parts)
+                for name in names
+            ],
+            batch_size=INSPECTION_BATCH_SIZE,
+        )
+        ThreatsThrough = TreeInspection.threats_found.through
+        ThreatsThrough.objects.bulk_create(
+            [
+                ThreatsThrough(treeinspection_id=inspection.pk, mangothreat_id=self.catalog.threats_by_slug[slug].pk)
+                for inspection, slugs in zip(inspections, threats)
+                for slug in slugs
+            ],
+            batch_size=INSPECTION_BATCH_SIZE,
+        )
+
+        # bulk_create sends no signals, so update the materialized tables once per bucket
+        GrowerSurveillanceStats.rebuild_for_grower(self.grower)
+        buckets = {
+            (session.record.location_id, SurveillanceMonthlyRollup.month_start(session.record.date))
+            for session in new
+        }
+        for location_id, month in buckets:
+            SurveillanceMonthlyRollup.refresh_bucket(self.grower.pk, location_id, month)
+        for month in {month for _, month in buckets}:
+            SurveillanceMonthlyRollup.refresh_bucket(self.grower.pk, None, month)
+        SurveillancePlan.refresh_schedules(SurveillancePlan.covering({location_id for location_id, _ in buckets}))
+        for session in new:
+            found = {slug for _, _, _, slugs in session.inspections for slug in slugs}
+            queue_detections(session.record.pk, [self.catalog.threats_by_slug[slug] for slug in found])
+
+    def manifest(self):
+        """Counts plus one result per session, in bundle order"""
+        statuses = [session.status for session in self.sessions]
+        return {
+            'version': BUNDLE_VERSION,
+            'created': statuses.count('created'),
+            'duplicates': statuses.count('duplicate'),
+            'rejected': statuses.count('rejected'),
+            'results': [session.result() for session in self.sessions],
+        }
@@ -4,6 +4,7 @@ from .models import MangoThreat, Location, MangoTree, SurveillanceRecord, Grower
 from django.contrib.auth.models import User
 from django import forms
 from .models import SurveillanceRecord, TreeInspection, MangoThreat, PlantPart, Location, MangoTree
+from .inspections import bulk_create_tree_inspections
 import datetime
 from django.core.exceptions import ValidationError
 
@@ -404,6 +405,36 @@ class MangoTreeForm(forms.ModelForm):
                 raise forms.ValidationError("A tree with this ID already exists.")
         return tree_id
 
+class OrchardImportForm(forms.Form):
+    """Upload a CSV/XLSX of trees to bulk import"""
+    MAX_UPLOAD_MB = 20
+
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+        help_text="CSV or XLSX with tree_id and age columns"
+    )
+    location = forms.ModelChoiceField(
+        queryset=Location.objects.none(),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        empty_label="Use the location column in the file",
+        help_text="Location for rows that do not name one"
+    )
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        if user:
+            self.fields['location'].queryset = Location.objects.filter(grower__user=user)
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            raise ValidationError("Please upload a .csv or .xlsx file.")
+        if upload.size > self.MAX_UPLOAD_MB * 1024 * 1024:
+            raise ValidationError(f"File size cannot exceed {self.MAX_UPLOAD_MB}MB.")
+        return upload
+
 class SurveillanceRecordForm(forms.ModelForm):
     class Meta:
         model = SurveillanceRecord
@@ -631,26 +662,16 @@ class SurveillanceRecordForm(forms.ModelForm):
         # Get trees at this location
         trees = MangoTree.objects.filter(location=location)
         
-        for tree in trees:
-            # Create tree inspection record
-            inspection = TreeInspection.objects.create(
-                surveillance_record=surveillance_record,
-                tree=tree,
-                severity_level='none',  # Default, can be updated later
-                inspection_time_minutes=tree.calculate_surveillance_time_minutes(),
-                findings=f"Surveyed plant parts: {', '.join([part.name for part in plant_parts])}"
-            )
-            
-            # Add plant parts checked
-            if plant_parts:
-                inspection.plant_parts_checked.set(plant_parts)
-            
-            # Add threats found (if any)
-            if threats:
-                inspection.threats_found.set(threats)
-                inspection.severity_level = 'moderate'  # Update severity if threats found
-                inspection.action_required = True
-                inspection.save()
+        # Create all tree inspection records in one batched transaction
+        bulk_create_tree_inspections(
+            surveillance_record,
+            trees,
+            plant_parts=plant_parts,
+            threats=threats,
+            severity_level='moderate' if threats else 'none',
+            action_required=bool(threats),
+            findings=f"Surveyed plant parts: {', '.join([part.name for part in plant_parts])}"
+        )
 
 
 class TreeInspectionForm(forms.ModelForm):
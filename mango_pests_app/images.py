@@ -0,0 +1,125 @@
+# images.py - Resized, re-encoded derivatives of uploaded threat images
+
+import hashlib
+import io
+import logging
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_WIDTHS = (160, 480, 1024)
+
+# format key -> (Pillow format, file extension, encoder options)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Content-addressed: the same upload always maps to the same files, so reruns reuse them
+DERIVATIVES_DIR = 'threat_images/derived'
+
+# Width of the <img src> fallback for browsers without srcset support
+FALLBACK_WIDTH = 480
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def derivative_name(digest, width, extension):
+    return f"{DERIVATIVES_DIR}/{digest[:2]}/{digest}/{width}.{extension}"
+
+
+def target_widths(original_width):
+    """Configured widths narrower than the original, plus the original when it is smaller
+    than the largest; images are never upscaled"""
+    widths = [width for width in DERIVATIVE_WIDTHS if width < original_width]
+    if original_width <= DERIVATIVE_WIDTHS[-1]:
+        widths.append(original_width)
+    return widths
+
+
+def _flatten(image):
+    """RGB copy for JPEG, compositing any transparency onto white"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, pillow_format, options):
+    buffer = io.BytesIO()
+    if pillow_format == 'JPEG':
+        image = _flatten(image)
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def build_derivatives(data, storage=None):
+    """Write every variant of the image bytes `data` and return the manifest stored on the threat.
+
+    {'source': sha256, 'width': w, 'height': h,
+     'variants': {'webp': [[width, name], ...], 'jpeg': [...]}} with widths ascending.
+    Variants already in storage are reused rather than re-encoded.
+    """
+    storage = storage or default_storage
+    digest = content_hash(data)
+    with Image.open(io.BytesIO(data)) as opened:
+        # First frame of animated GIFs; camera photos rotated upright
+        opened.seek(0)
+        source = ImageOps.exif_transpose(opened)
+        source.load()
+
+    variants = {key: [] for key in DERIVATIVE_FORMATS}
+    for width in target_widths(source.width):
+        height = max(1, round(source.height * width / source.width))
+        resized = None
+        for key, (pillow_format, extension, options) in DERIVATIVE_FORMATS.items():
+            name = derivative_name(digest, width, extension)
+            if not storage.exists(name):
+                if resized is None and width == source.width:
+                    resized = source
+                elif resized is None:
+                    resized = source.resize((width, height), Image.Resampling.LANCZOS)
+                storage.save(name, ContentFile(_encode(resized, pillow_format, options)))
+            variants[key].append([width, name])
+
+    return {'source': digest, 'width': source.width, 'height': source.height, 'variants': variants}
+
+
+def derivatives_for_field(field_file, storage=None):
+    """Manifest for an ImageField file (new upload or stored), or {} if it cannot be decoded"""
+    try:
+        field_file.open('rb')
+        field_file.seek(0)
+        data = field_file.read()
+        field_file.seek(0)
+        return build_derivatives(data, storage=storage)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning("Could not build derivatives for %s: %s", field_file.name, e)
+        return {}
+
+
+def srcset(manifest, key, storage=None):
+    """'url 160w, url 480w, ...' for one format, or '' when there are no derivatives"""
+    storage = storage or default_storage
+    entries = (manifest or {}).get('variants', {}).get(key, [])
+    return ', '.join(f"{storage.url(name)} {width}w" for width, name in entries)
+
+
+def fallback_url(manifest, storage=None):
+    """JPEG closest to FALLBACK_WIDTH without exceeding it (else the smallest), or None"""
+    storage = storage or default_storage
+    entries = (manifest or {}).get('variants', {}).get('jpeg', [])
+    if not entries:
+        return None
+    fitting = [entry for entry in entries if entry[0] <= FALLBACK_WIDTH]
+    width, name = fitting[-1] if fitting else entries[0]
+    return storage.url(name)
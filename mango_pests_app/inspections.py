@@ -0,0 +1,212 @@
+# inspections.py - Batched write path and set-based summaries for tree inspections
+
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .alerts import queue_detections
+from .catalog import get_catalog
+from .models import GrowerSurveillanceStats, MangoTree, SurveillanceMonthlyRollup, TreeInspection
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement, keeps us well under SQLite's variable limit
+INSPECTION_BATCH_SIZE = 500
+
+
+def bulk_create_tree_inspections(surveillance_record, trees, plant_parts=(), threats=(),
+                                 inspection_time=None, batch_size=INSPECTION_BATCH_SIZE,
+                                 **inspection_fields):
+    """Create one inspection per tree plus its plant part/threat links in a single transaction.
+
+    The number of queries depends on the batch size, not on the number of trees:
+    inspections are inserted with bulk_create and the M2M through tables are
+    filled with bulk through-model inserts instead of per-inspection .set() calls.
+    """
+    if inspection_time is None:
+        inspection_time = lambda tree: tree.calculate_surveillance_time_minutes()
+
+    plant_parts = list(plant_parts)
+    threats = list(threats)
+
+    with transaction.atomic():
+        inspections = TreeInspection.objects.bulk_create(
+            [
+                TreeInspection(
+                    surveillance_record=surveillance_record,
+                    tree=tree,
+                    inspection_time_minutes=inspection_time(tree),
+                    threat_count=len(threats),
+                    has_threats=bool(threats),
+                    **inspection_fields
+                )
+                for tree in trees
+            ],
+            batch_size=batch_size,
+        )
+
+        # Fill the M2M through tables directly
+        PlantPartsThrough = TreeInspection.plant_parts_checked.through
+        PlantPartsThrough.objects.bulk_create(
+            [
+                PlantPartsThrough(treeinspection_id=inspection.pk, plantpart_id=part.pk)
+                for inspection in inspections
+                for part in plant_parts
+            ],
+            batch_size=batch_size,
+        )
+
+        ThreatsThrough = TreeInspection.threats_found.through
+        ThreatsThrough.objects.bulk_create(
+            [
+                ThreatsThrough(treeinspection_id=inspection.pk, mangothreat_id=threat.pk)
+                for inspection in inspections
+                for threat in threats
+            ],
+            batch_size=batch_size,
+        )
+
+        # bulk_create sends no signals, so update the materialized tables here
+        if inspections:
+            GrowerSurveillanceStats.adjust_inspection_counts(
+                surveillance_record.grower_id,
+                total=len(inspections),
+                with_threats=len(inspections) if threats else 0,
+                action_required=len(inspections) if inspection_fields.get('action_required') else 0,
+            )
+            SurveillanceMonthlyRollup.refresh_for_record(
+                surveillance_record.grower_id, surveillance_record.location_id, surveillance_record.date
+            )
+            queue_detections(surveillance_record.pk, threats)
+
+    return inspections
+
+
+
+def record_session_inspections(surveillance_record, plant_parts, threat_ids):
+    """Inspect every tree at the record's location with the parts checked and threats found in the form.
+
+    Runs as the `record_inspections` background job. A record that already has
+    inspections is left alone, so running the job twice does not double them.
+    """
+    if TreeInspection.objects.filter(surveillance_record=surveillance_record).exists():
+        return {'inspections': 0, 'threats': []}
+
+    location = surveillance_record.location
+    trees = list(MangoTree.objects.filter(location=location))
+    if not trees:
+        logger.info(f"No trees found at location: {location}")
+        return {'inspections': 0, 'threats': []}
+
+    # Look up plant parts and threats in the catalog snapshot
+    catalog = get_catalog()
+    plant_part_objects = [
+        catalog.plant_parts_by_name[name] for name in dict.fromkeys(plant_parts)
+        if name in catalog.plant_parts_by_name
+    ]
+    threat_objects = [
+        catalog.threats_by_id[threat_id] for threat_id in dict.fromkeys(threat_ids)
+        if threat_id in catalog.threats_by_id
+    ]
+
+    # Determine overall severity based on threats found
+    overall_severity = 'none'
+    action_required = False
+    if threat_objects:
+        if any(threat.risk_level == 'high' for threat in threat_objects):
+            overall_severity = 'high'
+            action_required = True
+        elif any(threat.risk_level == 'moderate' for threat in threat_objects):
+            overall_severity = 'moderate'
+            action_required = True
+        else:
+            overall_severity = 'low'
+
+    # Build findings text (identical for every tree in the session)
+    threats_summary = [threat.name for threat in threat_objects]
+    findings_parts = []
+    if plant_parts:
+        findings_parts.append(f"Plant parts inspected: {', '.join(plant_parts)}")
+    if threat_objects:
+        findings_parts.append(f"Threats found: {', '.join(threats_summary)}")
+    else:
+        findings_parts.append("No threats detected")
+    findings_text = ". ".join(findings_parts)
+
+    threat_investigation_time = len(threat_objects) * 2
+
+    def inspection_time(tree):
+        # Ensure inspection time is positive and reasonable
+        return max(1, min(tree.calculate_surveillance_time_minutes() + threat_investigation_time, 120))
+
+    inspections = bulk_create_tree_inspections(
+        surveillance_record,
+        trees,
+        plant_parts=plant_part_objects,
+        threats=threat_objects,
+        inspection_time=inspection_time,
+        severity_level=overall_severity,
+        findings=findings_text,
+        action_required=action_required,
+        photo_taken=False,
+    )
+    logger.info(f"Created {len(inspections)} inspections for record {surveillance_record.pk}")
+    return {'inspections': len(inspections), 'threats': threats_summary}
+
+def summarize_record_inspections(surveillance_record):
+    """Counters plus plant part and threat summaries for one record in four grouped queries.
+
+    Replaces walking every inspection's parts x threats in Python. Counts are
+    through-table rows, i.e. the number of inspections that checked a part or
+    found a threat; the part/threat pairs come from inspections with threats only.
+    """
+    inspections = TreeInspection.objects.filter(surveillance_record=surveillance_record)
+    counts = inspections.aggregate(
+        total_inspections=Count('id'),
+        threats_found_count=Count('id', filter=Q(has_threats=True)),
+        action_required_count=Count('id', filter=Q(action_required=True)),
+    )
+
+    PlantPartsThrough = TreeInspection.plant_parts_checked.through
+    plant_parts_summary = {
+        row['plantpart__name']: {
+            'count': row['count'],
+            'threats': set(),
+            'priority': row['plantpart__surveillance_priority'],
+        }
+        for row in PlantPartsThrough.objects.filter(
+            treeinspection__surveillance_record=surveillance_record
+        ).values(
+            'plantpart__name', 'plantpart__surveillance_priority'
+        ).annotate(count=Count('treeinspection_id')).order_by('-plantpart__surveillance_priority', 'plantpart__name')
+    }
+
+    ThreatsThrough = TreeInspection.threats_found.through
+    threats_summary = {
+        row['mangothreat__name']: {
+            'count': row['count'],
+            'threat_type': row['mangothreat__threat_type'],
+            'risk_level': row['mangothreat__risk_level'],
+            'affected_parts': set(),
+        }
+        for row in ThreatsThrough.objects.filter(
+            treeinspection__surveillance_record=surveillance_record
+        ).values(
+            'mangothreat__name', 'mangothreat__threat_type', 'mangothreat__risk_level'
+        ).annotate(count=Count('treeinspection_id')).order_by('-count', 'mangothreat__name')
+    }
+
+    if threats_summary:
+        pairs = inspections.filter(
+            has_threats=True, plant_parts_checked__isnull=False
+        ).values_list('plant_parts_checked__name', 'threats_found__name').distinct()
+        for part_name, threat_name in pairs:
+            plant_parts_summary[part_name]['threats'].add(threat_name)
+            threats_summary[threat_name]['affected_parts'].add(part_name)
+
+    return {
+        **counts,
+        'plant_parts_summary': plant_parts_summary,
+        'threats_summary': threats_summary,
+    }
@@ -0,0 +1,162 @@
+# jobs.py - Lightweight background job queue stored in the application database
+
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q, Subquery
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+# Retry backoff: 10s, 20s, 40s ... capped at an hour
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+# A running job whose worker has not finished it in this long is assumed dead and requeued
+LOCK_TIMEOUT = timedelta(minutes=30)
+
+# Task name -> callable taking the job payload as keyword arguments, filled by @task
+TASKS = {}
+# Tasks run without a wrapping transaction (see run)
+NON_ATOMIC_TASKS = set()
+# Task name -> lock timeout for tasks that can legitimately run longer than LOCK_TIMEOUT
+LOCK_TIMEOUTS = {}
+
+
+def task(name, atomic=True, lock_timeout=None):
+    """Register a function as a job task under `name`.
+
+    atomic=False is for tasks that only read or commit their own batches, so
+    work already done survives a later failure and no write lock is held
+    while they wait on anything slow.
+    """
+    def register(func):
+        TASKS[name] = func
+        if not atomic:
+            NON_ATOMIC_TASKS.add(name)
+        if lock_timeout is not None:
+            LOCK_TIMEOUTS[name] = lock_timeout
+        return func
+    return register
+
+
+def enqueue(name, payload=None, user=None, unique=False, run_after=None):
+    """Queue a job and return it.
+
+    Saved in the caller's transaction, so a job about rows that roll back is
+    never run. With unique=True an identical job that has not started yet is
+    reused; job_unique_waiting_idx settles concurrent callers on one row.
+    """
+    if name not in TASKS:
+        raise LookupError(f"Unknown task {name!r}")
+    payload = payload or {}
+    if not unique:
+        return BackgroundJob.objects.create(
+            task=name, payload=payload, user=user, run_after=run_after or timezone.now()
+        )
+    waiting = BackgroundJob.objects.filter(task=name, payload=payload, unique=True, status=BackgroundJob.QUEUED, attempts=0)
+    job = waiting.first()
+    if job is not None:
+        return job
+    try:
+        with transaction.atomic():
+            return BackgroundJob.objects.create(
+                task=name, payload=payload, user=user, unique=True, run_after=run_after or timezone.now()
+            )
+    except IntegrityError:
+        # Another request queued it between our lookup and insert
+        return waiting.get()
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def worker_name(index=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def claim(worker, limit=1, now=None):
+    """Mark up to `limit` due jobs as running for this worker and return them.
+
+    Rows are locked with SELECT ... FOR UPDATE SKIP LOCKED where the backend
+    supports it, so concurrent workers pass over each other's jobs. Elsewhere
+    (SQLite) the claim is a single UPDATE over a LIMIT subquery: there is no
+    read lock to upgrade, and the status check leaves the loser of a race nothing.
+    """
+    now = now or timezone.now()
+    due = BackgroundJob.objects.filter(status=BackgroundJob.QUEUED, run_after__lte=now).order_by('run_after', 'pk')
+    claimed = {'status': BackgroundJob.RUNNING, 'locked_by': worker, 'locked_at': now, 'attempts': F('attempts') + 1}
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            BackgroundJob.objects.filter(pk__in=ids).update(**claimed)
+    else:
+        BackgroundJob.objects.filter(
+            pk__in=Subquery(due.values('pk')[:limit]), status=BackgroundJob.QUEUED
+        ).update(**claimed)
+    return list(BackgroundJob.objects.filter(
+        status=BackgroundJob.RUNNING, locked_by=worker, locked_at=now
+    ).order_by('run_after', 'pk'))
+
+
+def run(job):
+    """Run a claimed job in its own transaction and record the outcome, rescheduling failures"""
+    now = timezone.now()
+    try:
+        func = TASKS.get(job.task)
+        if func is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        if job.task in NON_ATOMIC_TASKS:
+            result = func(**job.payload)
+        else:
+            # A failed attempt leaves nothing behind, so a retry starts clean
+            with transaction.atomic():
+                result = func(**job.payload)
+    except Exception as e:
+        logger.exception("Job %s failed on attempt %d", job, job.attempts)
+        job.error = f"{type(e).__name__}: {e}"
+        if job.attempts >= job.max_attempts:
+            job.status, job.finished_at = BackgroundJob.FAILED, now
+        else:
+            job.status, job.run_after = BackgroundJob.QUEUED, now + retry_delay(job.attempts)
+    else:
+        job.status, job.result, job.error, job.finished_at = BackgroundJob.SUCCEEDED, result, '', timezone.now()
+    job.locked_by, job.locked_at = '', None
+    job.save(update_fields=['status', 'result', 'error', 'run_after', 'finished_at', 'locked_by', 'locked_at'])
+    return job
+
+
+def requeue_stale(now=None):
+    """Return jobs held by a worker that died to the queue, or fail them when out of attempts"""
+    now = now or timezone.now()
+    timed_out = Q(locked_at__lt=now - LOCK_TIMEOUT) & ~Q(task__in=list(LOCK_TIMEOUTS))
+    for name, timeout in LOCK_TIMEOUTS.items():
+        timed_out |= Q(task=name, locked_at__lt=now - timeout)
+    stale = BackgroundJob.objects.filter(timed_out, status=BackgroundJob.RUNNING)
+    reset = {'locked_by': '', 'locked_at': None, 'error': "Worker stopped before the job finished"}
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(status=BackgroundJob.FAILED, finished_at=now, **reset)
+    requeued = stale.update(status=BackgroundJob.QUEUED, run_after=now, **reset)
+    return requeued + failed
+
+
+def work(worker, burst=False, poll_interval=1.0, batch_size=1):
+    """Claim and run jobs until the queue is empty (burst) or forever; returns jobs run"""
+    processed = 0
+    requeue_stale()
+    while True:
+        jobs = claim(worker, limit=batch_size)
+        for job in jobs:
+            run(job)
+        processed += len(jobs)
+        if not jobs:
+            if burst:
+                return processed
+            time.sleep(poll_interval)
+            requeue_stale()
+
@@ -0,0 +1,140 @@
+import importlib.util
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from mango_pests_app.profiling import percentile
+
+# (label, sync URL name served by WSGI, async URL name served by uvicorn)
+ENDPOINTS = [
+    ('threat analytics', 'api_threat_analytics', 'api_threat_analytics_async'),
+    ('history statistics', 'api_history_statistics', 'api_history_statistics_async'),
+]
+
+STARTUP_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def session_cookie(user):
+    """Cookie header for a fresh authenticated session, so the servers need no login form"""
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    store[SESSION_KEY] = str(user.pk)
+    store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    store.save()
+    return f"{settings.SESSION_COOKIE_NAME}={store.session_key}"
+
+
+def host_header():
+    """A Host the servers accept; ALLOWED_HOSTS may not list 127.0.0.1"""
+    return next((host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')), 'localhost')
+
+
+def fetch(url, cookie):
+    request = urllib.request.Request(url, headers={'Cookie': cookie, 'Host': host_header()})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+        # An expired session would be redirected to the login page, which is not a result
+        ok = response.status == 200 and response.headers.get_content_type() == 'application/json'
+    return (time.perf_counter() - start) * 1000, ok
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync analytics endpoints under WSGI (runserver) with their async versions under "
+        "uvicorn, against the configured database. Seed it first with generate_load_dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='load_grower_1', help="Grower whose data is queried")
+        parser.add_argument('--requests', type=int, default=50, help="Timed requests per endpoint")
+        parser.add_argument('--concurrency', type=int, default=8, help="Requests in flight at once")
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec('uvicorn') is None:
+            raise CommandError("uvicorn is not installed (pip install uvicorn)")
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f"No user {options['username']!r}; run generate_load_dataset first or pass --username"
+            )
+        cookie = session_cookie(user)
+
+        port = free_port()
+        wsgi = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runserver', '--noreload', f'127.0.0.1:{port}']
+        sync_endpoints = [(label, name) for label, name, _ in ENDPOINTS]
+        results = self.run_server('wsgi', wsgi, port, sync_endpoints, cookie, options)
+
+        port = free_port()
+        asgi = [sys.executable, '-m', 'uvicorn', 'mango_surveillance_web.asgi:application',
+                '--port', str(port), '--log-level', 'warning']
+        async_endpoints = [(label, name) for label, _, name in ENDPOINTS]
+        results += self.run_server('asgi', asgi, port, async_endpoints, cookie, options)
+
+        self.stdout.write(f"{options['requests']} requests per endpoint, {options['concurrency']} concurrent")
+        self.stdout.write(f"{'endpoint':<20} {'server':<6} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'req/s':>7}")
+        for label, server, timings, seconds in sorted(results):
+            ordered = sorted(timings)
+            self.stdout.write(
+                f"{label:<20} {server:<6} {percentile(ordered, 50):>8.1f} {percentile(ordered, 95):>8.1f} "
+                f"{statistics.mean(ordered):>8.1f} {len(ordered) / seconds:>7.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS("✅ Async analytics benchmark complete"))
+
+    def run_server(self, server, command, port, endpoints, cookie, options):
+        process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get(
+                'DJANGO_SETTINGS_MODULE', 'mango_surveillance_web.settings')},
+        )
+        base = f"http://127.0.0.1:{port}"
+        try:
+            self.wait_until_ready(process, base + reverse('login'))
+            results = []
+            for label, url_name in endpoints:
+                url = base + reverse(url_name)
+                fetch(url, cookie)  # warm-up: imports, connection, catalog
+                start = time.perf_counter()
+                with ThreadPoolExecutor(options['concurrency']) as pool:
+                    responses = list(pool.map(lambda _: fetch(url, cookie), range(options['requests'])))
+                seconds = time.perf_counter() - start
+                if not all(ok for _, ok in responses):
+                    raise CommandError(f"{url} did not answer with JSON under {server}")
+                results.append((label, server, [ms for ms, _ in responses], seconds))
+            return results
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+    def wait_until_ready(self, process, url):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"Server exited with code {process.returncode} before it was ready")
+            try:
+                urllib.request.urlopen(urllib.request.Request(url, headers={'Host': host_header()}), timeout=2).close()
+                return
+            except urllib.error.HTTPError:
+                return  # Any HTTP answer means the server is up
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.2)
+        raise CommandError(f"Server did not answer {url} within {STARTUP_TIMEOUT}s")
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from mango_pests_app import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every URL in mango_pests_app/urls.py against a seeded dataset and record "
+        "wall time, SQL query count and SQL time per view. Compares against the JSON "
+        "baseline and fails when a view regresses past the thresholds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default=str(benchmarks.DEFAULT_BASELINE_PATH),
+                            help="Baseline JSON file (default benchmarks/page_baselines.json)")
+        parser.add_argument('--save-baseline', action='store_true',
+                            help="Write this run's results as the new baseline instead of comparing")
+        parser.add_argument('--repeat', type=int, default=3, help="Timed requests per URL (default 3)")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Keep the benchmark test database (and its seeded data) between runs")
+        parser.add_argument('--max-extra-queries', type=int,
+                            default=benchmarks.DEFAULT_THRESHOLDS['max_extra_queries'],
+                            help="Extra queries allowed over the baseline (default 0)")
+        parser.add_argument('--max-slowdown', type=float,
+                            default=benchmarks.DEFAULT_THRESHOLDS['max_slowdown'],
+                            help="Allowed relative slowdown, 0.5 = 50%% (default 0.5)")
+        parser.add_argument('--min-slowdown-ms', type=float,
+                            default=benchmarks.DEFAULT_THRESHOLDS['min_slowdown_ms'],
+                            help="Ignore slowdowns below this many ms (default 10)")
+        for key, value in benchmarks.DEFAULT_DATASET.items():
+            parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value,
+                                help=f"Benchmark dataset {key.replace('_', ' ')} (default {value})")
+
+    def handle(self, *args, **options):
+        dataset = {key: options[key] for key in benchmarks.DEFAULT_DATASET}
+        baseline = None
+        if not options['save_baseline']:
+            baseline = benchmarks.load_baseline(options['baseline'])
+            if baseline is None:
+                raise CommandError(f"No baseline at {options['baseline']}. Run with --save-baseline first.")
+            if baseline['dataset'] != dataset:
+                raise CommandError(
+                    f"Baseline was recorded with dataset {baseline['dataset']}, this run uses {dataset}."
+                )
+
+        # Benchmarks run in a throwaway test database, never the development one
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, keepdb=options['keepdb'])
+        old_config = runner.setup_databases()
+        try:
+            user = benchmarks.seed_dataset(dataset)
+            results = benchmarks.run_benchmarks(user, repeat=options['repeat'], stdout=self.stdout)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        if options['save_baseline']:
+            benchmarks.save_baseline(results, dataset, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Saved baseline for {len(results)} views to {options['baseline']}"
+            ))
+            return
+
+        regressions = benchmarks.find_regressions(results, baseline['views'], {
+            'max_extra_queries': options['max_extra_queries'],
+            'max_slowdown': options['max_slowdown'],
+            'min_slowdown_ms': options['min_slowdown_ms'],
+        })
+        for name in sorted(set(results) - set(baseline['views'])):
+            self.stdout.write(self.style.WARNING(f"{name}: no baseline yet"))
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(f"❌ {regression}")
+            raise CommandError(f"{len(regressions)} performance regression(s) against the baseline")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(results)} views within thresholds"))
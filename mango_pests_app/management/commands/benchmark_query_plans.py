@@ -0,0 +1,163 @@
+import datetime
+import random
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from mango_pests_app.models import (
+    Grower, Location, MangoTree, SurveillancePlan, SurveillanceRecord, TreeInspection
+)
+
+
+class Rollback(Exception):
+    """Raised to discard the seeded benchmark data"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large synthetic surveillance history and print EXPLAIN plans and timings "
+        "for the main view query shapes, with and without the surveillance indexes. "
+        "Seeded rows are rolled back unless --keep is given; run against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inspections', type=int, default=1_000_000,
+                            help="Number of tree inspections to seed (default 1,000,000)")
+        parser.add_argument('--trees', type=int, default=1000, help="Trees across all benchmark locations (default 1000)")
+        parser.add_argument('--locations', type=int, default=10, help="Locations to spread sessions over")
+        parser.add_argument('--plans', type=int, default=5000, help="Surveillance plans to seed (default 5000)")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded data")
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        try:
+            with transaction.atomic():
+                grower = self.seed(options)
+                queries = self.query_shapes(grower)
+
+                self.stdout.write(self.style.MIGRATE_HEADING("\n=== Without surveillance indexes ==="))
+                with self.indexes_dropped():
+                    self.report(queries)
+
+                self.stdout.write(self.style.MIGRATE_HEADING("\n=== With surveillance indexes ==="))
+                self.report(queries)
+
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write("Seeded benchmark data rolled back.")
+
+    def seed(self, options):
+        start = time.perf_counter()
+        user, created = User.objects.get_or_create(username='benchmark_grower')
+        grower, created = Grower.objects.get_or_create(user=user, defaults={'farm_name': 'Benchmark Farm'})
+
+        locations = Location.objects.bulk_create([
+            Location(name=f"Benchmark Block {i}", address="Benchmark Road", grower=grower, area_hectares=5)
+            for i in range(options['locations'])
+        ])
+        trees_per_location = max(1, options['trees'] // len(locations))
+        trees = MangoTree.objects.bulk_create([
+            MangoTree(location=location, tree_id=f"BENCH-{location.pk}-{i}", age=age, age_group='mature',
+                      health_status=random.choice(['excellent', 'good', 'fair', 'poor']))
+            for location in locations
+            for i, age in enumerate(random.choices(range(1, 25), k=trees_per_location))
+        ], batch_size=1000)
+        trees_by_location = {}
+        for tree in trees:
+            trees_by_location.setdefault(tree.location_id, []).append(tree)
+
+        session_count = max(1, options['inspections'] // trees_per_location)
+        first_day = datetime.date.today() - datetime.timedelta(days=14 * session_count // len(locations))
+        records = SurveillanceRecord.objects.bulk_create([
+            SurveillanceRecord(
+                grower=grower, location=locations[i % len(locations)],
+                date=first_day + datetime.timedelta(days=14 * (i // len(locations))),
+                trees_surveyed_count=trees_per_location, total_time_minutes=random.randint(60, 240),
+                completed=True,
+            )
+            for i in range(session_count)
+        ], batch_size=1000)
+
+        created_inspections = 0
+        for record in records:
+            batch = []
+            for tree in trees_by_location[record.location_id]:
+                severity = random.choices(['none', 'low', 'moderate', 'high'], weights=[90, 5, 3, 2])[0]
+                batch.append(TreeInspection(
+                    surveillance_record=record, tree=tree, severity_level=severity,
+                    action_required=severity in ('moderate', 'high'), inspection_time_minutes=5,
+                ))
+            TreeInspection.objects.bulk_create(batch, batch_size=1000)
+            created_inspections += len(batch)
+
+        today = datetime.date.today()
+        SurveillancePlan.objects.bulk_create([
+            SurveillancePlan(
+                grower=grower, name=f"Benchmark Plan {i}", frequency_days=14, start_date=first_day,
+                is_active=random.random() < 0.9,
+                next_due_date=today + datetime.timedelta(days=random.randint(-30, 180)),
+            )
+            for i in range(options['plans'])
+        ], batch_size=1000)
+
+        self.analyze()
+        self.stdout.write(
+            f"Seeded {len(records)} sessions, {options['plans']} plans and {created_inspections} inspections "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        return grower
+
+    def query_shapes(self, grower):
+        """The query shapes used by the history, analytics and record views"""
+        location = grower.locations.first()
+        latest = SurveillanceRecord.objects.filter(grower=grower).order_by('-date').first()
+        year_ago = latest.date - datetime.timedelta(days=365)
+        return {
+            'history page (grower, newest first)':
+                SurveillanceRecord.objects.filter(grower=grower).order_by('-date', '-created_at')[:20],
+            'grower date range':
+                SurveillanceRecord.objects.filter(grower=grower, date__range=[year_ago, latest.date]),
+            'location date range':
+                SurveillanceRecord.objects.filter(location=location, date__gte=year_ago),
+            'grower inspections needing action':
+                TreeInspection.objects.filter(surveillance_record__grower=grower, action_required=True),
+            'record inspections with findings':
+                TreeInspection.objects.filter(surveillance_record=latest).exclude(severity_level='none'),
+            'plans due this week':
+                SurveillancePlan.due_by(datetime.date.today() + datetime.timedelta(days=6), grower=grower),
+        }
+
+    def report(self, queries):
+        for label, queryset in queries.items():
+            start = time.perf_counter()
+            rows = len(list(queryset.values_list('pk', flat=True)))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.stdout.write(self.style.SUCCESS(f"\n{label}: {rows} rows in {elapsed_ms:.1f} ms"))
+            self.stdout.write(queryset.explain())
+
+    @contextmanager
+    def indexes_dropped(self):
+        """Temporarily drop the model indexes; runs raw DDL so it works inside the seeding transaction"""
+        self.run_index_sql('remove_sql')
+        try:
+            yield
+        finally:
+            self.run_index_sql('create_sql')
+
+    def run_index_sql(self, method):
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model in (SurveillanceRecord, TreeInspection, SurveillancePlan):
+                for index in model._meta.indexes:
+                    cursor.execute(str(getattr(index, method)(model, editor)))
+        self.analyze()
+
+    def analyze(self):
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from mango_pests_app.catalog import invalidate_catalog
+from mango_pests_app.images import derivatives_for_field
+from mango_pests_app.models import MangoThreat
+
+
+class Command(BaseCommand):
+    help = "Backfill resized WebP/JPEG derivatives for threat images already in media/threat_images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threat', help="Only process the threat with this slug")
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Rebuild manifests for threats that already have derivatives (existing files are reused)"
+        )
+
+    def handle(self, *args, **options):
+        threats = MangoThreat.objects.exclude(image='').exclude(image__isnull=True).order_by('pk')
+        if options['threat']:
+            threats = threats.filter(slug=options['threat'])
+        if not options['force']:
+            threats = threats.filter(image_variants={})
+
+        built = failed = 0
+        for threat in threats.iterator():
+            try:
+                manifest = derivatives_for_field(threat.image)
+            finally:
+                threat.image.close()
+            if not manifest:
+                failed += 1
+                self.stderr.write(f"Skipped {threat.name}: could not read {threat.image.name}")
+                continue
+
+            # update() keeps this from re-running save(); bumping updated_at refreshes page ETags
+            MangoThreat.objects.filter(pk=threat.pk).update(image_variants=manifest, updated_at=timezone.now())
+            built += 1
+            widths = [width for width, name in manifest['variants']['jpeg']]
+            self.stdout.write(f"Built derivatives for {threat.name}: {widths} px")
+
+        if built:
+            invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Built image derivatives for {built} threat(s), {failed} skipped"
+        ))
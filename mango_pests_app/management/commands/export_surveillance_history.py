@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from mango_pests_app.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, ExportError, export_chunks, history_queryset
+from mango_pests_app.models import Grower
+
+
+class Command(BaseCommand):
+    help = "Stream a grower's surveillance history to CSV or Parquet, one row per tree inspection"
+
+    def add_arguments(self, parser):
+        parser.add_argument('grower', help="Grower id or username")
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help="File to write (default: stdout, CSV only)")
+        parser.add_argument('--date-from', help="YYYY-MM-DD")
+        parser.add_argument('--date-to', help="YYYY-MM-DD")
+        parser.add_argument('--location', type=int, help="Only this location id")
+        parser.add_argument('--has-threats', action='store_true', help="Only records where threats were found")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        lookup = {'pk': options['grower']} if options['grower'].isdigit() else {'user__username': options['grower']}
+        try:
+            grower = Grower.objects.get(**lookup)
+        except Grower.DoesNotExist:
+            raise CommandError(f"No grower {options['grower']!r}")
+        if options['format'] == 'parquet' and not options['output']:
+            raise CommandError("Parquet export needs --output")
+
+        # Same parameter names as the history page's filter form
+        params = {
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+            'location': str(options['location']) if options['location'] else None,
+            'has_threats': '1' if options['has_threats'] else None,
+        }
+        records = history_queryset(grower, params)
+        try:
+            chunks = export_chunks(records, options['format'], chunk_size=options['chunk_size'])
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
+            return
+
+        written = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Exported {records.count()} record(s) to {options['output']} ({written / 1024:.0f} KiB)"
+        ))
@@ -0,0 +1,272 @@
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from mango_pests_app.models import (
+    Grower, GrowerSurveillanceStats, Location, MangoThreat, MangoTree, PlantPart,
+    SurveillanceMonthlyRollup, SurveillanceRecord, TreeInspection
+)
+
+# Used when the database has no catalogue yet
+DEFAULT_THREATS = [
+    {'name': 'Anthracnose', 'description': 'Dark leaf/fruit spots', 'threat_type': 'disease',
+     'risk_level': 'high', 'details': 'Fungal disease'},
+    {'name': 'Powdery Mildew', 'description': 'White patches on leaves', 'threat_type': 'disease',
+     'risk_level': 'moderate', 'details': 'Fungal spores'},
+    {'name': 'Fruit Fly', 'description': 'Larvae in fruit', 'threat_type': 'pest',
+     'risk_level': 'high', 'details': 'Causes internal rotting'},
+    {'name': 'Scale Insect', 'description': 'Sap-sucking pest', 'threat_type': 'pest',
+     'risk_level': 'moderate', 'details': 'Found on bark and stems'},
+]
+
+DEFAULT_PLANT_PARTS = [
+    {'name': 'Leaves', 'description': 'Leaf inspection', 'surveillance_priority': 5, 'time_multiplier': 1.2},
+    {'name': 'Fruit', 'description': 'Fruit inspection', 'surveillance_priority': 5, 'time_multiplier': 1.5},
+    {'name': 'Branches', 'description': 'Branch inspection', 'surveillance_priority': 3, 'time_multiplier': 1.0},
+    {'name': 'Trunk', 'description': 'Trunk inspection', 'surveillance_priority': 2, 'time_multiplier': 0.8},
+]
+
+VARIETIES = [choice for choice, label in MangoTree.VARIETY_CHOICES if choice != 'other']
+HEALTH_WEIGHTS = {'excellent': 20, 'good': 50, 'fair': 22, 'poor': 8}
+
+# Detection odds scale with tree health and the wet season (Nov-Mar in the Top End)
+HEALTH_THREAT_FACTORS = {'excellent': 0.5, 'good': 0.8, 'fair': 1.4, 'poor': 2.5}
+WET_SEASON_MONTHS = {11, 12, 1, 2, 3}
+WET_SEASON_FACTOR = 2.0
+RISK_WEIGHTS = {'low': 1, 'moderate': 2, 'high': 3}
+RISK_SEVERITIES = {
+    'low': (['low', 'moderate'], [80, 20]),
+    'moderate': (['low', 'moderate', 'high'], [40, 45, 15]),
+    'high': (['low', 'moderate', 'high'], [20, 45, 35]),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large synthetic dataset: N growers x M locations x K trees with "
+        "fortnightly surveillance sessions over several years. Rows are written with "
+        "bulk_create in batches; the same --seed and --end-date always give the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--growers', type=int, default=5, help="Number of growers (default 5)")
+        parser.add_argument('--locations', type=int, default=4, help="Locations per grower (default 4)")
+        parser.add_argument('--trees', type=int, default=100, help="Trees per location (default 100)")
+        parser.add_argument('--years', type=float, default=2, help="Years of surveillance history (default 2)")
+        parser.add_argument('--interval-days', type=int, default=14,
+                            help="Days between sessions at a location (default 14)")
+        parser.add_argument('--threat-rate', type=float, default=0.04,
+                            help="Base chance a healthy tree has a detection in the dry season (default 0.04)")
+        parser.add_argument('--end-date', type=datetime.date.fromisoformat,
+                            help="Date of the last session, YYYY-MM-DD (default today)")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed (default 42)")
+        parser.add_argument('--prefix', default='load', help="Prefix for generated usernames and tree ids")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Inspections per write batch")
+
+    def handle(self, *args, **options):
+        for name in ('growers', 'locations', 'trees', 'interval_days', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1")
+
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f"{prefix}_grower_").exists():
+            raise CommandError(
+                f"Users with the '{prefix}_grower_' prefix already exist. "
+                f"Pass a different --prefix or delete the previous load dataset."
+            )
+
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.batch_size = options['batch_size']
+        self.threats = self.load_threats()
+        self.plant_parts = list(PlantPart.objects.order_by('pk')) or [
+            PlantPart.objects.create(**data) for data in DEFAULT_PLANT_PARTS
+        ]
+        self.session_dates = self.build_session_dates()
+
+        sessions_per_grower = options['locations'] * len(self.session_dates)
+        self.total_inspections = options['growers'] * sessions_per_grower * options['trees']
+        self.created_inspections = 0
+        self.start = time.perf_counter()
+        self.stdout.write(
+            f"Generating {options['growers']} grower(s) x {options['locations']} location(s) x "
+            f"{options['trees']} tree(s) x {len(self.session_dates)} session date(s) = "
+            f"{self.total_inspections:,} tree inspections"
+        )
+
+        for grower_number in range(1, options['growers'] + 1):
+            grower = self.generate_grower(grower_number)
+            # bulk_create sends no signals, so rebuild the materialized tables once per grower
+            GrowerSurveillanceStats.rebuild_for_grower(grower)
+            SurveillanceMonthlyRollup.rebuild_for_grower(grower.pk)
+
+        elapsed = time.perf_counter() - self.start
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Created {self.created_inspections:,} tree inspections in {elapsed:.1f}s"
+        ))
+
+    def load_threats(self):
+        threats = list(MangoThreat.objects.order_by('pk'))
+        if not threats:
+            threats = [MangoThreat.objects.create(**data) for data in DEFAULT_THREATS]
+        return threats
+
+    def build_session_dates(self):
+        end_date = self.options['end_date'] or datetime.date.today()
+        interval = self.options['interval_days']
+        count = max(1, int(self.options['years'] * 365 // interval))
+        return [end_date - datetime.timedelta(days=interval * i) for i in reversed(range(count))]
+
+    def generate_grower(self, number):
+        options = self.options
+        prefix = options['prefix']
+        rng = self.rng
+
+        user = User.objects.create_user(username=f"{prefix}_grower_{number}", password=None)
+        farm_size = Decimal(rng.randint(5, 40) * options['locations'])
+        grower = Grower.objects.create(
+            user=user,
+            farm_name=f"Load Test Farm {number}",
+            region=rng.choice(['Darwin', 'Katherine', 'Mareeba', 'Bowen', 'Kununurra']),
+            mango_tree_count=options['locations'] * options['trees'],
+            farm_size_hectares=farm_size,
+            stocking_rate=round(Decimal(options['locations'] * options['trees']) / farm_size, 2),
+        )
+
+        latitude, longitude = -12.4 + rng.uniform(-2, 2), 130.8 + rng.uniform(-2, 2)
+        locations = [
+            Location(
+                name=f"Block {index + 1}",
+                address=f"{prefix.title()} Road, Farm {number}",
+                grower=grower,
+                gps_latitude=round(Decimal(latitude + rng.uniform(-0.02, 0.02)), 6),
+                gps_longitude=round(Decimal(longitude + rng.uniform(-0.02, 0.02)), 6),
+                area_hectares=Decimal(rng.randint(2, 40)),
+                soil_type=rng.choice(['Loam', 'Clay', 'Sandy']),
+                irrigation_type=rng.choice(['Drip', 'Sprinkler']),
+            )
+            for index in range(options['locations'])
+        ]
+        for location in locations:
+            # save() is skipped by bulk_create, so set what it would have
+            location.grid_lat, location.grid_lon = Location.grid_cell_for(location.gps_latitude, location.gps_longitude)
+        locations = Location.objects.bulk_create(locations)
+
+        trees_by_location = {}
+        for location in locations:
+            trees_by_location[location.pk] = MangoTree.objects.bulk_create(
+                [self.build_tree(location, number, index) for index in range(options['trees'])],
+                batch_size=self.batch_size,
+            )
+
+        for location_index, location in enumerate(locations):
+            self.generate_sessions(grower, location, location_index, trees_by_location[location.pk])
+        return grower
+
+    def build_tree(self, location, grower_number, index):
+        rng = self.rng
+        age = rng.randint(1, 25)
+        return MangoTree(
+            location=location,
+            tree_id=f"{self.options['prefix'].upper()}-G{grower_number}-L{location.pk}-T{index + 1}",
+            age=age,
+            age_group=MangoTree.age_group_for(age),
+            variety=rng.choice(VARIETIES),
+            height_meters=round(Decimal(min(1.0 + age * 0.25, 8) + rng.uniform(-0.5, 0.5)), 1),
+            canopy_diameter_meters=round(Decimal(min(1.5 + age * 0.3, 10) + rng.uniform(-0.5, 0.5)), 1),
+            health_status=rng.choices(list(HEALTH_WEIGHTS), weights=list(HEALTH_WEIGHTS.values()))[0],
+        )
+
+    def generate_sessions(self, grower, location, location_index, trees):
+        rng = self.rng
+        tree_minutes = [Decimal(str(tree.calculate_surveillance_time_minutes())) for tree in trees]
+        session_minutes = int(sum(tree_minutes))
+        # Stagger blocks so one grower's sessions do not all fall on the same day
+        offset = datetime.timedelta(days=location_index % self.options['interval_days'])
+
+        records = SurveillanceRecord.objects.bulk_create([
+            SurveillanceRecord(
+                grower=grower,
+                location=location,
+                date=session_date - offset,
+                start_time=datetime.time(7, 0),
+                weather_conditions=rng.choice(['Sunny', 'Cloudy', 'Humid', 'Showers']),
+                temperature_celsius=round(Decimal(rng.uniform(22, 36)), 1),
+                trees_surveyed_count=len(trees),
+                total_time_minutes=max(1, session_minutes + rng.randint(-10, 20)),
+                completed=True,
+            )
+            for session_date in self.session_dates
+        ], batch_size=self.batch_size)
+
+        pending = []
+        for record in records:
+            season_factor = WET_SEASON_FACTOR if record.date.month in WET_SEASON_MONTHS else 1.0
+            for tree, minutes in zip(trees, tree_minutes):
+                pending.append(self.build_inspection(record, tree, minutes, season_factor))
+                if len(pending) >= self.batch_size:
+                    self.write_inspections(pending)
+                    pending = []
+        if pending:
+            self.write_inspections(pending)
+
+    def build_inspection(self, record, tree, minutes, season_factor):
+        """Return (inspection, threats, plant_parts) for one tree in one session"""
+        rng = self.rng
+        threats = []
+        chance = self.options['threat_rate'] * HEALTH_THREAT_FACTORS[tree.health_status] * season_factor
+        if rng.random() < chance:
+            weights = [RISK_WEIGHTS.get(threat.risk_level, 1) for threat in self.threats]
+            picked = rng.choices(self.threats, weights=weights, k=rng.choice([1, 1, 1, 2]))
+            threats = list(dict.fromkeys(picked))
+
+        severity = 'none'
+        if threats:
+            worst = max(threats, key=lambda threat: RISK_WEIGHTS.get(threat.risk_level, 1))
+            levels, weights = RISK_SEVERITIES.get(worst.risk_level, RISK_SEVERITIES['moderate'])
+            severity = rng.choices(levels, weights=weights)[0]
+
+        plant_parts = rng.sample(self.plant_parts, k=min(len(self.plant_parts), rng.randint(2, 4)))
+        inspection = TreeInspection(
+            surveillance_record=record,
+            tree=tree,
+            severity_level=severity,
+            inspection_time_minutes=minutes + 2 * len(threats),
+            findings=", ".join(threat.name for threat in threats) or None,
+            action_required=severity in ('moderate', 'high'),
+            threat_count=len(threats),
+            has_threats=bool(threats),
+        )
+        return inspection, threats, plant_parts
+
+    def write_inspections(self, pending):
+        PlantPartsThrough = TreeInspection.plant_parts_checked.through
+        ThreatsThrough = TreeInspection.threats_found.through
+
+        with transaction.atomic():
+            inspections = TreeInspection.objects.bulk_create(
+                [inspection for inspection, threats, plant_parts in pending], batch_size=self.batch_size
+            )
+            PlantPartsThrough.objects.bulk_create([
+                PlantPartsThrough(treeinspection_id=inspection.pk, plantpart_id=part.pk)
+                for inspection, threats, plant_parts in pending
+                for part in plant_parts
+            ], batch_size=self.batch_size)
+            ThreatsThrough.objects.bulk_create([
+                ThreatsThrough(treeinspection_id=inspection.pk, mangothreat_id=threat.pk)
+                for inspection, threats, plant_parts in pending
+                for threat in threats
+            ], batch_size=self.batch_size)
+
+        self.created_inspections += len(inspections)
+        elapsed = time.perf_counter() - self.start
+        rate = self.created_inspections / elapsed if elapsed else 0
+        self.stdout.write(
+            f"  {self.created_inspections:,}/{self.total_inspections:,} inspections "
+            f"({self.created_inspections * 100 / self.total_inspections:.1f}%) - {rate:,.0f} rows/s"
+        )
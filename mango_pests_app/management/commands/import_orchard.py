@@ -0,0 +1,53 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from mango_pests_app.models import Grower, Location
+from mango_pests_app.orchard_import import DEFAULT_CHUNK_SIZE, ImportFileError, OrchardImport, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import mango trees (and new locations) for a grower from a CSV or XLSX file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or XLSX file with tree_id and age columns")
+        parser.add_argument('--grower', required=True, help="Grower id or username")
+        parser.add_argument('--location', type=int, help="Location id for rows without a location column")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--report', help="Write rejected rows to this CSV file")
+
+    def handle(self, *args, **options):
+        lookup = {'pk': options['grower']} if options['grower'].isdigit() else {'user__username': options['grower']}
+        try:
+            grower = Grower.objects.get(**lookup)
+        except Grower.DoesNotExist:
+            raise CommandError(f"No grower {options['grower']!r}")
+        location = None
+        if options['location']:
+            try:
+                location = Location.objects.get(pk=options['location'], grower=grower)
+            except Location.DoesNotExist:
+                raise CommandError(f"Grower has no location {options['location']}")
+
+        importer = OrchardImport(grower, location=location, chunk_size=options['chunk_size'])
+        try:
+            with open(options['path'], 'rb') as source:
+                importer.run(*read_rows(source, options['path']))
+        except (OSError, ImportFileError, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(f"{e} ({importer.created} tree(s) imported before the error)")
+
+        if importer.rejected:
+            if options['report']:
+                with open(options['report'], 'w', newline='') as report:
+                    report.write(importer.error_report())
+                self.stdout.write(f"Wrote {len(importer.rejected)} rejected row(s) to {options['report']}")
+            else:
+                for row_number, row, errors in importer.rejected[:20]:
+                    self.stderr.write(f"Row {row_number}: {errors}")
+                if len(importer.rejected) > 20:
+                    self.stderr.write(f"... and {len(importer.rejected) - 20} more (use --report)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {importer.created} tree(s) and {importer.created_locations} new location(s) "
+            f"in {importer.seconds:.1f}s ({importer.rows_per_second:,.0f} trees/s), "
+            f"{len(importer.rejected)} row(s) rejected"
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from mango_pests_app.models import Grower, SurveillanceMonthlyRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly surveillance rollup table used by trend charts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grower', type=int, help="Only rebuild rollups for this grower id")
+
+    def handle(self, *args, **options):
+        growers = Grower.objects.all()
+        if options['grower']:
+            growers = growers.filter(pk=options['grower'])
+
+        rebuilt = 0
+        for grower_id in growers.values_list('pk', flat=True).iterator():
+            SurveillanceMonthlyRollup.rebuild_for_grower(grower_id)
+            rebuilt += 1
+
+        total_rows = SurveillanceMonthlyRollup.objects.filter(grower__in=growers).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rebuilt {total_rows} monthly rollup row(s) for {rebuilt} grower(s)"
+        ))
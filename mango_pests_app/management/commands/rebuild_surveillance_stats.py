@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from mango_pests_app.jobs import enqueue
+from mango_pests_app.models import Grower, GrowerSurveillanceStats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized per-grower surveillance statistics from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grower', type=int, help="Only rebuild statistics for this grower id")
+        parser.add_argument('--background', action='store_true',
+                            help="Queue one rebuild job per grower for run_workers instead")
+
+    def handle(self, *args, **options):
+        growers = Grower.objects.all()
+        if options['grower']:
+            growers = growers.filter(pk=options['grower'])
+
+        if options['background']:
+            queued = [
+                enqueue('rebuild_statistics', {'grower_id': grower_id}, unique=True)
+                for grower_id in growers.values_list('pk', flat=True)
+            ]
+            self.stdout.write(self.style.SUCCESS(f"✅ Queued statistics rebuilds for {len(queued)} grower(s)"))
+            return
+
+        rebuilt = 0
+        for grower in growers.iterator():
+            stats = GrowerSurveillanceStats.rebuild_for_grower(grower)
+            rebuilt += 1
+            self.stdout.write(
+                f"Rebuilt stats for {grower}: {stats.total_records} records, "
+                f"{stats.total_inspections} inspections"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt surveillance statistics for {rebuilt} grower(s)"))
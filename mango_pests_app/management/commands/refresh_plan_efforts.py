@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from mango_pests_app.models import SurveillancePlan
+
+
+class Command(BaseCommand):
+    help = "Recompute the cached effort of every surveillance plan marked dirty, one grouped query per grower"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grower', type=int, help="Only refresh this grower id's plans")
+
+    def handle(self, *args, **options):
+        dirty = SurveillancePlan.objects.filter(effort_dirty=True)
+        if options['grower']:
+            dirty = dirty.filter(grower_id=options['grower'])
+
+        refreshed = 0
+        growers = list(dirty.order_by('grower_id').values_list('grower_id', flat=True).distinct())
+        for grower_id in growers:
+            refreshed += SurveillancePlan.refresh_efforts(grower_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Refreshed effort for {refreshed} plan(s) across {len(growers)} grower(s)"
+        ))
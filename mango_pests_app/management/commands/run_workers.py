@@ -0,0 +1,60 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def _worker_process(index, burst, poll_interval, batch_size):
+    # Imported here: a spawned process has to start Django before loading the app's models
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from mango_pests_app.jobs import work, worker_name
+    work(worker_name(index), burst=burst, poll_interval=poll_interval, batch_size=batch_size)
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database queue in a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKER_PROCESSES,
+                            help="Worker processes; 1 runs the queue in this process")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--batch-size', type=int, default=1, help="Jobs claimed at a time per worker")
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1:
+            raise CommandError("--processes must be at least 1")
+        worker_args = (options['burst'], options['poll_interval'], options['batch_size'])
+
+        if options['processes'] == 1:
+            from mango_pests_app.jobs import work, worker_name
+            processed = work(worker_name(), *worker_args)
+            self.stdout.write(self.style.SUCCESS(f"✅ Ran {processed} background job(s)"))
+            return
+
+        # Children must open their own database connections, never share the parent's
+        connections.close_all()
+        context = multiprocessing.get_context()
+        workers = [
+            context.Process(target=_worker_process, args=(index, *worker_args), daemon=True)
+            for index in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} worker process(es)")
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+        failed = sum(1 for worker in workers if worker.exitcode)
+        if failed:
+            raise CommandError(f"{failed} worker process(es) exited with an error")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(workers)} worker process(es) finished"))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from mango_pests_app.alerts import DISPATCH_BATCH_SIZE, dispatch_pending
+
+
+class Command(BaseCommand):
+    help = "Send outbreak alert digests for queued high-risk detections; run from cron or with --loop"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DISPATCH_BATCH_SIZE,
+                            help="Pending events read per pass")
+        parser.add_argument('--loop', action='store_true', help="Keep polling the queue instead of exiting")
+        parser.add_argument('--interval', type=float, default=30, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            events = digests = 0
+            while True:
+                handled, sent = dispatch_pending(batch_size=options['batch_size'])
+                events += handled
+                digests += sent
+                if handled < options['batch_size']:
+                    break
+            if events or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ Sent {digests} outbreak digest(s) for {events} detection event(s)"
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
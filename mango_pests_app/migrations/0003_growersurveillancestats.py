@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0002_remove_inspection_disease_remove_inspection_pest_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GrowerSurveillanceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_records', models.PositiveIntegerField(default=0)),
+                ('earliest_date', models.DateField(blank=True, null=True)),
+                ('latest_date', models.DateField(blank=True, null=True)),
+                ('total_trees_surveyed', models.PositiveIntegerField(default=0)),
+                ('timed_records', models.PositiveIntegerField(default=0, help_text='Records with a recorded duration')),
+                ('total_time_minutes', models.PositiveIntegerField(default=0)),
+                ('min_time_minutes', models.PositiveIntegerField(blank=True, null=True)),
+                ('max_time_minutes', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_inspections', models.PositiveIntegerField(default=0)),
+                ('inspections_with_threats', models.PositiveIntegerField(default=0)),
+                ('action_required_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('grower', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='surveillance_stats', to='mango_pests_app.grower')),
+            ],
+            options={
+                'verbose_name_plural': 'Grower surveillance stats',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0003_growersurveillancestats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveillanceMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('session_count', models.PositiveIntegerField(default=0)),
+                ('trees_surveyed', models.PositiveIntegerField(default=0)),
+                ('timed_sessions', models.PositiveIntegerField(default=0)),
+                ('total_minutes', models.PositiveIntegerField(default=0)),
+                ('inspection_count', models.PositiveIntegerField(default=0)),
+                ('distinct_threats', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('grower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='mango_pests_app.grower')),
+                ('location', models.ForeignKey(blank=True, help_text='Empty for the grower-wide total across all locations', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='mango_pests_app.location')),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='surveillancemonthlyrollup',
+            constraint=models.UniqueConstraint(fields=('grower', 'location', 'month'), name='unique_rollup_per_location_month'),
+        ),
+        migrations.AddConstraint(
+            model_name='surveillancemonthlyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('location__isnull', True)), fields=('grower', 'month'), name='unique_grower_wide_rollup_per_month'),
+        ),
+    ]
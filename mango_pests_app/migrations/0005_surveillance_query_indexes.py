@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0004_surveillancemonthlyrollup_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='surveillancerecord',
+            index=models.Index(fields=['grower', '-date', '-created_at'], name='record_grower_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveillancerecord',
+            index=models.Index(fields=['location', 'date'], name='record_location_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treeinspection',
+            index=models.Index(condition=models.Q(('action_required', True)), fields=['surveillance_record'], name='inspection_action_req_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treeinspection',
+            index=models.Index(condition=models.Q(('severity_level', 'none'), _negated=True), fields=['surveillance_record', 'severity_level'], name='inspection_severity_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:55
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_threat_counts(apps, schema_editor):
+    TreeInspection = apps.get_model('mango_pests_app', 'TreeInspection')
+    links = TreeInspection.threats_found.through.objects.filter(treeinspection_id=models.OuterRef('pk'))
+    link_count = links.order_by().values('treeinspection_id').annotate(
+        total=models.Count('mangothreat_id')
+    ).values('total')
+    TreeInspection.objects.update(
+        threat_count=Coalesce(models.Subquery(link_count), 0),
+        has_threats=models.Exists(links),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0005_surveillance_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='treeinspection',
+            name='has_threats',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='treeinspection',
+            name='threat_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='treeinspection',
+            index=models.Index(condition=models.Q(('has_threats', True)), fields=['surveillance_record'], name='inspection_has_threats_idx'),
+        ),
+        migrations.RunPython(backfill_threat_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Full-text index over MangoThreat name/description/details (SQLite FTS5)
+
+from django.db import migrations
+
+# External-content FTS5 table kept in sync with mango_pests_app_mangothreat by triggers,
+# so admin, views, the AJAX API and queryset.update()/bulk_create() all stay indexed.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE mango_pests_app_threat_search USING fts5(
+        name, description, details,
+        content='mango_pests_app_mangothreat', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER mango_pests_app_threat_search_ai AFTER INSERT ON mango_pests_app_mangothreat BEGIN
+        INSERT INTO mango_pests_app_threat_search(rowid, name, description, details)
+        VALUES (new.id, new.name, new.description, new.details);
+    END
+    """,
+    """
+    CREATE TRIGGER mango_pests_app_threat_search_ad AFTER DELETE ON mango_pests_app_mangothreat BEGIN
+        INSERT INTO mango_pests_app_threat_search(mango_pests_app_threat_search, rowid, name, description, details)
+        VALUES ('delete', old.id, old.name, old.description, old.details);
+    END
+    """,
+    """
+    CREATE TRIGGER mango_pests_app_threat_search_au AFTER UPDATE ON mango_pests_app_mangothreat BEGIN
+        INSERT INTO mango_pests_app_threat_search(mango_pests_app_threat_search, rowid, name, description, details)
+        VALUES ('delete', old.id, old.name, old.description, old.details);
+        INSERT INTO mango_pests_app_threat_search(rowid, name, description, details)
+        VALUES (new.id, new.name, new.description, new.details);
+    END
+    """,
+    # Index the threats that already exist
+    "INSERT INTO mango_pests_app_threat_search(mango_pests_app_threat_search) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS mango_pests_app_threat_search_ai",
+    "DROP TRIGGER IF EXISTS mango_pests_app_threat_search_ad",
+    "DROP TRIGGER IF EXISTS mango_pests_app_threat_search_au",
+    "DROP TABLE IF EXISTS mango_pests_app_threat_search",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Other databases fall back to icontains matching in search.py
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0006_treeinspection_threat_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0007_threat_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mangothreat',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0008_mangothreat_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveillancerecord',
+            name='client_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='surveillancerecord',
+            constraint=models.UniqueConstraint(fields=('grower', 'client_key'), name='unique_record_client_key'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:26
+
+import datetime
+
+from django.db import migrations, models
+
+
+def backfill_plan_schedules(apps, schema_editor):
+    # Historical models have no methods, so this repeats SurveillancePlan.refresh_schedules once
+    SurveillancePlan = apps.get_model('mango_pests_app', 'SurveillancePlan')
+    SurveillanceRecord = apps.get_model('mango_pests_app', 'SurveillanceRecord')
+    for plan in SurveillancePlan.objects.all():
+        plan.last_surveyed_date = SurveillanceRecord.objects.filter(
+            models.Q(surveillance_plan=plan) | models.Q(location__in=plan.locations.all())
+        ).aggregate(last=models.Max('date'))['last']
+        due = plan.start_date
+        if plan.last_surveyed_date:
+            due = max(due, plan.last_surveyed_date + datetime.timedelta(days=plan.frequency_days))
+        if not plan.is_active or (plan.end_date and due > plan.end_date):
+            due = None
+        plan.next_due_date = due
+        plan.save(update_fields=['last_surveyed_date', 'next_due_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0009_surveillancerecord_client_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveillanceplan',
+            name='last_surveyed_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='surveillanceplan',
+            name='next_due_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='surveillanceplan',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['grower', 'next_due_date'], name='plan_grower_next_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveillanceplan',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['next_due_date'], name='plan_next_due_idx'),
+        ),
+        migrations.RunPython(backfill_plan_schedules, migrations.RunPython.noop),
+    ]
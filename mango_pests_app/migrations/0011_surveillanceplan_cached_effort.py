@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0010_surveillanceplan_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveillanceplan',
+            name='effort_dirty',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='surveillanceplan',
+            name='estimated_tree_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='surveillanceplan',
+            name='estimated_tree_minutes',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='surveillanceplan',
+            index=models.Index(condition=models.Q(('effort_dirty', True)), fields=['grower'], name='plan_effort_dirty_idx'),
+        ),
+    ]
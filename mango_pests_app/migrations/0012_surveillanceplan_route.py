@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:31
+
+from django.db import migrations, models
+
+
+def mark_plan_efforts_dirty(apps, schema_editor):
+    # Cached estimates used a flat travel allowance; refresh_plan_efforts reprices them
+    SurveillancePlan = apps.get_model('mango_pests_app', 'SurveillancePlan')
+    SurveillancePlan.objects.update(effort_dirty=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0011_surveillanceplan_cached_effort'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveillanceplan',
+            name='estimated_travel_minutes',
+            field=models.DecimalField(decimal_places=1, default=0, editable=False, max_digits=7),
+        ),
+        migrations.AddField(
+            model_name='surveillanceplan',
+            name='route_distance_km',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, max_digits=8),
+        ),
+        migrations.AddField(
+            model_name='surveillanceplan',
+            name='route_location_ids',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(mark_plan_efforts_dirty, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:34
+
+import math
+from decimal import Decimal
+
+from django.db import migrations, models
+
+GRID_CELL_DEGREES = Decimal('0.05')  # Location.GRID_CELL_DEGREES when this migration was written
+
+
+def backfill_grid_cells(apps, schema_editor):
+    Location = apps.get_model('mango_pests_app', 'Location')
+    located = Location.objects.filter(gps_latitude__isnull=False, gps_longitude__isnull=False)
+    for location in located.iterator():
+        location.grid_lat = math.floor(location.gps_latitude / GRID_CELL_DEGREES)
+        location.grid_lon = math.floor(location.gps_longitude / GRID_CELL_DEGREES)
+        location.save(update_fields=['grid_lat', 'grid_lon'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0012_surveillanceplan_route'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='grid_lat',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='grid_lon',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['grid_lat', 'grid_lon'], name='location_grid_idx'),
+        ),
+        migrations.RunPython(backfill_grid_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0013_location_grid_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutbreakNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.DecimalField(blank=True, decimal_places=2, help_text="Empty when the block is the recipient's own", max_digits=6, null=True)),
+                ('sent_at', models.DateTimeField()),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mango_pests_app.location')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbreak_notifications', to='mango_pests_app.grower')),
+                ('threat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mango_pests_app.mangothreat')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['location', 'threat', 'sent_at'], name='notification_dedup_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutbreakEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbreak_events', to='mango_pests_app.surveillancerecord')),
+                ('threat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbreak_events', to='mango_pests_app.mangothreat')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='outbreak_event_pending_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='outbreakevent',
+            constraint=models.UniqueConstraint(fields=('record', 'threat'), name='unique_outbreak_event'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mango_pests_app', '0015_background_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='unique',
+            field=models.BooleanField(default=False, help_text='Queued with enqueue(unique=True): one waiting copy at most'),
+        ),
+        migrations.AddConstraint(
+            model_name='backgroundjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('attempts', 0), ('status', 'queued'), ('unique', True)), fields=('task', 'payload'), name='job_unique_waiting_idx'),
+        ),
+    ]
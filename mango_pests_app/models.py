@@ -1,10 +1,15 @@
 from django.db import models
+from django.db.models.functions import Coalesce, TruncMonth
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 import datetime
+import math
+
+from .images import fallback_url, srcset
 
 class Grower(models.Model):
     """Mango grower profile with surveillance settings"""
@@ -54,9 +59,36 @@ class Location(models.Model):
     area_hectares = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
     soil_type = models.CharField(max_length=50, null=True, blank=True)
     irrigation_type = models.CharField(max_length=50, null=True, blank=True)
+    
+    # Spatial grid cell of the GPS position, set on save; see spatial.nearby_locations
+    grid_lat = models.IntegerField(null=True, blank=True, editable=False)
+    grid_lon = models.IntegerField(null=True, blank=True, editable=False)
+    
+    # About 5.5 km north-south
+    GRID_CELL_DEGREES = Decimal('0.05')
+
+    class Meta:
+        indexes = [
+            # Proximity searches read a small block of cells instead of every location
+            models.Index(fields=['grid_lat', 'grid_lon'], name='location_grid_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.address}"
+    
+    def save(self, *args, **kwargs):
+        self.grid_lat, self.grid_lon = self.grid_cell_for(self.gps_latitude, self.gps_longitude)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'grid_lat', 'grid_lon'}
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def grid_cell_for(cls, latitude, longitude):
+        """(grid_lat, grid_lon) of a position, or (None, None) without one"""
+        if latitude is None or longitude is None:
+            return None, None
+        return (math.floor(Decimal(str(latitude)) / cls.GRID_CELL_DEGREES),
+                math.floor(Decimal(str(longitude)) / cls.GRID_CELL_DEGREES))
 
 class PlantPart(models.Model):
     """Plant parts that can be surveilled with priority levels"""
@@ -107,52 +139,73 @@ class MangoTree(models.Model):
                                            ('fair', 'Fair'), ('poor', 'Poor')], 
                                    default='good')
     
+    @staticmethod
+    def age_group_for(age):
+        """Age group for a tree age, also used by bulk loaders that skip save()"""
+        if age <= 3:
+            return 'young'
+        elif age <= 7:
+            return 'juvenile'
+        elif age <= 15:
+            return 'mature'
+        return 'old'
+    
     def save(self, *args, **kwargs):
         # Automatically set age group based on age
-        if self.age <= 3:
-            self.age_group = 'young'
-        elif self.age <= 7:
-            self.age_group = 'juvenile'
-        elif self.age <= 15:
-            self.age_group = 'mature'
-        else:
-            self.age_group = 'old'
+        self.age_group = self.age_group_for(self.age)
         super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.variety} ({self.tree_id}) - Age: {self.age}"
 
-    def calculate_surveillance_time_minutes(self):
-        """Calculate recommended surveillance time per tree"""
-        base_time = 5
-        
-        age_multipliers = {
-            'young': 0.7,
-            'juvenile': 0.9,
-            'mature': 1.0,
-            'old': 1.2
-        }
-        
-        size_multiplier = 1.0
-        if self.height_meters and self.height_meters > 4:
-            size_multiplier = 1.3
-        elif self.height_meters and self.height_meters < 2:
-            size_multiplier = 0.8
-            
-        health_multipliers = {
-            'excellent': 0.8,
-            'good': 1.0,
-            'fair': 1.3,
-            'poor': 1.5
-        }
-        
-        total_time = (base_time * 
-                     age_multipliers.get(self.age_group, 1.0) * 
-                     size_multiplier * 
-                     health_multipliers.get(self.health_status, 1.0))
+    # Surveillance time factors shared with the set-based effort engine (effort.py)
+    BASE_SURVEILLANCE_MINUTES = 5
+    
+    AGE_TIME_MULTIPLIERS = {
+        'young': 0.7,
+        'juvenile': 0.9,
+        'mature': 1.0,
+        'old': 1.2
+    }
+    
+    SIZE_TIME_MULTIPLIERS = {
+        'large': 1.3,
+        'standard': 1.0,
+        'small': 0.8
+    }
+    
+    HEALTH_TIME_MULTIPLIERS = {
+        'excellent': 0.8,
+        'good': 1.0,
+        'fair': 1.3,
+        'poor': 1.5
+    }
+    
+    @staticmethod
+    def size_class(height_meters):
+        """Classify a tree by height for surveillance time purposes"""
+        if height_meters and height_meters > 4:
+            return 'large'
+        elif height_meters and height_meters < 2:
+            return 'small'
+        return 'standard'
+    
+    @classmethod
+    def surveillance_time_for(cls, age_group, size_class, health_status):
+        """Surveillance time in minutes for a tree with the given characteristics"""
+        total_time = (cls.BASE_SURVEILLANCE_MINUTES * 
+                     cls.AGE_TIME_MULTIPLIERS.get(age_group, 1.0) * 
+                     cls.SIZE_TIME_MULTIPLIERS[size_class] * 
+                     cls.HEALTH_TIME_MULTIPLIERS.get(health_status, 1.0))
         
         return round(total_time, 1)
 
+    def calculate_surveillance_time_minutes(self):
+        """Calculate recommended surveillance time per tree"""
+        return self.surveillance_time_for(
+            self.age_group, self.size_class(self.height_meters), self.health_status
+        )
+
 class MangoThreat(models.Model):
     THREAT_TYPES = [
         ('pest', 'Pest'),
@@ -170,6 +223,8 @@ class MangoThreat(models.Model):
     description = models.TextField()
     details = models.TextField()
     image = models.ImageField(upload_to='threat_images/', null=True, blank=True)
+    # Manifest of resized WebP/JPEG copies of `image`, see images.build_derivatives
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     threat_type = models.CharField(max_length=10, choices=THREAT_TYPES)
     risk_level = models.CharField(max_length=10, choices=RISK_LEVELS, default='moderate')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -191,11 +246,35 @@ class MangoThreat(models.Model):
                 counter += 1
             
             self.slug = slug
+        new_upload = bool(self.image) and not self.image._committed
+        if new_upload or not self.image:
+            # Pages fall back to the original until the derivatives job stores the manifest
+            self.image_variants = {}
         super().save(*args, **kwargs)
+        if new_upload:
+            from .jobs import enqueue
+            # Resizing and encoding take seconds for large uploads, so a worker does it;
+            # the job is saved in this transaction and only runs once the upload commits
+            enqueue('build_image_derivatives', {'threat_id': self.pk, 'image': self.image.name}, unique=True)
     
     def get_absolute_url(self):
         from django.urls import reverse
         return reverse('threat_details', kwargs={'threat_name': self.slug})
+
+    @property
+    def image_webp_srcset(self):
+        return srcset(self.image_variants, 'webp')
+
+    @property
+    def image_jpeg_srcset(self):
+        return srcset(self.image_variants, 'jpeg')
+
+    @property
+    def image_src(self):
+        """Mid-size JPEG derivative, or the original upload when none was built"""
+        if not self.image:
+            return None
+        return fallback_url(self.image_variants) or self.image.url
     
     def __str__(self):
         return f"{self.name} ({self.get_threat_type_display()})"
@@ -216,32 +295,180 @@ class SurveillancePlan(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Cached effort; tree, location and plan location signals set effort_dirty, refresh_efforts recomputes
+    estimated_tree_count = models.PositiveIntegerField(default=0, editable=False)
+    estimated_tree_minutes = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    # Travel along the GPS route through the plan's locations, see routes.plan_route
+    estimated_travel_minutes = models.DecimalField(max_digits=7, decimal_places=1, default=0, editable=False)
+    route_distance_km = models.DecimalField(max_digits=8, decimal_places=3, default=0, editable=False)
+    route_location_ids = models.JSONField(default=list, blank=True, editable=False)
+    effort_dirty = models.BooleanField(default=True, editable=False)
+    
+    # Schedule, kept current by the record and plan location signals (see refresh_schedules)
+    last_surveyed_date = models.DateField(null=True, blank=True, editable=False)
+    next_due_date = models.DateField(null=True, blank=True, editable=False)
+    
+    class Meta:
+        indexes = [
+            # Due-soon worklists are one range scan, for a grower or across all growers
+            models.Index(fields=['grower', 'next_due_date'], condition=models.Q(is_active=True),
+                         name='plan_grower_next_due_idx'),
+            models.Index(fields=['next_due_date'], condition=models.Q(is_active=True), name='plan_next_due_idx'),
+            # Plans waiting for refresh_efforts
+            models.Index(fields=['grower'], condition=models.Q(effort_dirty=True), name='plan_effort_dirty_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.grower.farm_name} - {self.name}"
     
+    def save(self, *args, **kwargs):
+        # Frequency, dates or is_active may have changed
+        self.next_due_date = self.compute_next_due_date()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'next_due_date'}
+        super().save(*args, **kwargs)
+    
+    def compute_next_due_date(self):
+        """Day the next session is due, or None once the plan is inactive or finished"""
+        if not self.is_active:
+            return None
+        due = self.start_date
+        if self.last_surveyed_date:
+            due = max(due, self.last_surveyed_date + datetime.timedelta(days=self.frequency_days))
+        if self.end_date and due > self.end_date:
+            return None
+        return due
+    
+    def days_overdue(self, today=None):
+        today = today or datetime.date.today()
+        if self.next_due_date is None or self.next_due_date >= today:
+            return 0
+        return (today - self.next_due_date).days
+    
+    @classmethod
+    def due_by(cls, day, grower=None):
+        """Active plans due on or before `day` (overdue ones included), soonest first"""
+        plans = cls.objects.filter(is_active=True, next_due_date__lte=day)
+        if grower is not None:
+            plans = plans.filter(grower=grower)
+        return plans.order_by('next_due_date', 'pk')
+    
+    @classmethod
+    def covering(cls, location_ids, plan_ids=()):
+        """Ids of the plans a record at one of these locations (or linked to these plans) counts for"""
+        query = models.Q(locations__in=[pk for pk in location_ids if pk])
+        plan_ids = [pk for pk in plan_ids if pk]
+        if plan_ids:
+            query |= models.Q(pk__in=plan_ids)
+        return list(cls.objects.filter(query).values_list('pk', flat=True).distinct())
+    
+    @classmethod
+    def refresh_schedules(cls, plan_ids, batch_size=500):
+        """Recompute last survey and next-due dates from the records, three queries per batch.
+
+        A plan's last survey is its latest record, either linked to the plan or
+        at one of its locations (the record form does not ask for a plan).
+        """
+        plan_ids = list(plan_ids)
+        for start in range(0, len(plan_ids), batch_size):
+            plans = list(cls.objects.filter(pk__in=plan_ids[start:start + batch_size]))
+            ids = [plan.pk for plan in plans]
+            last_dates = dict(
+                SurveillanceRecord.objects.filter(surveillance_plan_id__in=ids).order_by().values(
+                    'surveillance_plan_id'
+                ).annotate(last=models.Max('date')).values_list('surveillance_plan_id', 'last')
+            )
+            at_locations = cls.locations.through.objects.filter(surveillanceplan_id__in=ids).order_by().values(
+                'surveillanceplan_id'
+            ).annotate(last=models.Max('location__surveillancerecord__date')).values_list('surveillanceplan_id', 'last')
+            for plan_id, last in at_locations:
+                if last and (last_dates.get(plan_id) is None or last > last_dates[plan_id]):
+                    last_dates[plan_id] = last
+
+            for plan in plans:
+                plan.last_surveyed_date = last_dates.get(plan.pk)
+                plan.next_due_date = plan.compute_next_due_date()
+            cls.objects.bulk_update(plans, ['last_surveyed_date', 'next_due_date'])
+    
     def calculate_surveillance_effort(self):
-        """Calculate total surveillance effort for this plan"""
-        total_minutes = 0
-        tree_count = 0
-        
-        for location in self.locations.all():
-            for tree in location.mango_trees.all():
-                total_minutes += tree.calculate_surveillance_time_minutes()
-                tree_count += 1
-        
-        # Add overhead time (travel, setup, documentation)
-        overhead_percentage = 0.3  # 30% overhead
-        total_minutes_with_overhead = total_minutes * (1 + overhead_percentage)
-        
-        total_hours = total_minutes_with_overhead / 60
-        self.total_estimated_hours = round(total_hours, 2)
-        self.save()
-        
-        return {
-            'total_hours': self.total_estimated_hours,
-            'tree_count': tree_count,
-            'average_minutes_per_tree': round(total_minutes / tree_count if tree_count > 0 else 0, 1)
-        }
+        """Total surveillance effort for this plan; never writes.
+
+        A clean plan answers from its cached columns. A dirty one is priced in
+        memory with one grouped query and stays dirty until refresh_efforts runs.
+        """
+        return self.efforts_for([self])[self.pk]
+    
+    @classmethod
+    def efforts_for(cls, plans):
+        """{plan_id: effort} for many plans, the dirty ones priced together in memory"""
+        from .effort import price_plans
+        fresh = price_plans([plan.pk for plan in plans if plan.effort_dirty])
+        efforts = {}
+        for plan in plans:
+            if plan.pk in fresh:
+                efforts[plan.pk] = cls._effort_summary(fresh[plan.pk])
+            else:
+                efforts[plan.pk] = cls._effort_summary({
+                    'tree_count': plan.estimated_tree_count,
+                    'minutes': plan.estimated_tree_minutes,
+                    'travel_minutes': plan.estimated_travel_minutes,
+                    'distance_km': plan.route_distance_km,
+                })
+        return efforts
+    
+    @staticmethod
+    def _effort_summary(priced):
+        from .effort import plan_effort_summary
+        route = priced.get('route')
+        return plan_effort_summary(
+            priced['tree_count'], priced['minutes'],
+            travel_minutes=route.travel_minutes if route else priced['travel_minutes'],
+            route_distance_km=Decimal(str(route.distance_km)) if route else priced['distance_km'],
+        )
+    
+    def route(self):
+        """The plan's locations in visiting order (see routes.plan_route)"""
+        from .routes import plan_route
+        if not self.effort_dirty and self.route_location_ids:
+            by_id = self.locations.in_bulk()
+            ordered = [by_id[pk] for pk in self.route_location_ids if pk in by_id]
+            if len(ordered) == len(by_id):
+                return ordered
+        return plan_route(list(self.locations.all())).locations
+    
+    @classmethod
+    def mark_effort_dirty(cls, location_ids=(), plan_ids=()):
+        """Flag the plans covering these locations (or with these ids) for recomputation"""
+        location_ids = [pk for pk in location_ids if pk]
+        plan_ids = [pk for pk in plan_ids if pk]
+        if not location_ids and not plan_ids:
+            return
+        query = models.Q(locations__in=location_ids) | models.Q(pk__in=plan_ids)
+        cls.objects.filter(pk__in=cls.objects.filter(query).values('pk'), effort_dirty=False).update(
+            effort_dirty=True
+        )
+    
+    @classmethod
+    def refresh_efforts(cls, grower_id):
+        """Recompute every dirty plan of one grower, two queries for all of them; returns how many"""
+        from .effort import price_plans
+        plans = list(cls.objects.filter(grower_id=grower_id, effort_dirty=True))
+        priced = price_plans([plan.pk for plan in plans])
+        for plan in plans:
+            effort = priced[plan.pk]
+            summary = cls._effort_summary(effort)
+            plan.estimated_tree_count = effort['tree_count']
+            plan.estimated_tree_minutes = effort['minutes']
+            plan.estimated_travel_minutes = summary['travel_minutes']
+            plan.route_distance_km = summary['route_distance_km']
+            plan.route_location_ids = [location.pk for location in effort['route'].locations]
+            plan.total_estimated_hours = summary['total_hours']
+            plan.effort_dirty = False
+        cls.objects.bulk_update(plans, [
+            'estimated_tree_count', 'estimated_tree_minutes', 'estimated_travel_minutes', 'route_distance_km',
+            'route_location_ids', 'total_estimated_hours', 'effort_dirty'
+        ], batch_size=500)
+        return len(plans)
 
 class SurveillanceRecord(models.Model):
     """Individual surveillance session record"""
@@ -262,9 +489,23 @@ class SurveillanceRecord(models.Model):
     notes = models.TextField(null=True, blank=True)
     completed = models.BooleanField(default=False)
     
+    # Idempotency key chosen by the offline field app, so a retried sync is not saved twice
+    client_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # History listing: filter by grower, newest sessions first
+            models.Index(fields=['grower', '-date', '-created_at'], name='record_grower_date_idx'),
+            # Per-location sessions within a date range
+            models.Index(fields=['location', 'date'], name='record_location_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['grower', 'client_key'], name='unique_record_client_key'),
+        ]
+
     def __str__(self):
         return f"Surveillance by {self.grower} at {self.location} on {self.date}"
     
@@ -302,6 +543,355 @@ class TreeInspection(models.Model):
     photo_taken = models.BooleanField(default=False)
     photo_filename = models.CharField(max_length=255, null=True, blank=True)
     
+    # Denormalized from threats_found, kept in sync by signals.py
+    threat_count = models.PositiveIntegerField(default=0, editable=False)
+    has_threats = models.BooleanField(default=False, editable=False)
+    
+    class Meta:
+        indexes = [
+            # Partial indexes: only the small fraction of inspections that need attention
+            models.Index(fields=['surveillance_record'], condition=models.Q(action_required=True),
+                         name='inspection_action_req_idx'),
+            models.Index(fields=['surveillance_record', 'severity_level'],
+                         condition=~models.Q(severity_level='none'),
+                         name='inspection_severity_idx'),
+            models.Index(fields=['surveillance_record'], condition=models.Q(has_threats=True),
+                         name='inspection_has_threats_idx'),
+        ]
+    
     def __str__(self):
         return f"Inspection of {self.tree} on {self.surveillance_record.date}"
+    
+    @classmethod
+    def refresh_threat_counts(cls, inspections):
+        """Recompute threat_count/has_threats from the M2M table in a single UPDATE"""
+        links = cls.threats_found.through.objects.filter(treeinspection_id=models.OuterRef('pk'))
+        link_count = links.order_by().values('treeinspection_id').annotate(
+            total=models.Count('mangothreat_id')
+        ).values('total')
+        return inspections.update(
+            threat_count=Coalesce(models.Subquery(link_count), 0),
+            has_threats=models.Exists(links),
+        )
+
+
+
+class GrowerSurveillanceStats(models.Model):
+    """Materialized per-grower surveillance statistics.
+
+    Kept up to date by the signal handlers in signals.py so dashboards read one
+    row instead of aggregating over every record and inspection. Rebuild from
+    scratch with `python manage.py rebuild_surveillance_stats`.
+    """
+    grower = models.OneToOneField(Grower, on_delete=models.CASCADE, related_name="surveillance_stats")
+    
+    # Surveillance record statistics
+    total_records = models.PositiveIntegerField(default=0)
+    earliest_date = models.DateField(null=True, blank=True)
+    latest_date = models.DateField(null=True, blank=True)
+    total_trees_surveyed = models.PositiveIntegerField(default=0)
+    timed_records = models.PositiveIntegerField(default=0,
+                                                help_text="Records with a recorded duration")
+    total_time_minutes = models.PositiveIntegerField(default=0)
+    min_time_minutes = models.PositiveIntegerField(null=True, blank=True)
+    max_time_minutes = models.PositiveIntegerField(null=True, blank=True)
+    
+    # Tree inspection statistics
+    total_inspections = models.PositiveIntegerField(default=0)
+    inspections_with_threats = models.PositiveIntegerField(default=0)
+    action_required_count = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Grower surveillance stats"
+    
+    def __str__(self):
+        return f"Surveillance stats for {self.grower}"
+    
+    @classmethod
+    def for_grower(cls, grower):
+        """Return the grower's statistics row, building it on first access"""
+        stats = cls.objects.filter(grower=grower).first()
+        if stats is None:
+            stats = cls.rebuild_for_grower(grower)
+        return stats
+    
+    @classmethod
+    def rebuild_for_grower(cls, grower):
+        """Recompute every statistic for one grower from the source tables"""
+        stats, created = cls.objects.get_or_create(grower=grower)
+        stats.refresh()
+        return stats
+    
+    @classmethod
+    def adjust_inspection_counts(cls, grower_id, total=0, with_threats=0, action_required=0):
+        """Incrementally add to (or subtract from) the inspection counters"""
+        updated = cls.objects.filter(grower_id=grower_id).update(
+            total_inspections=models.F('total_inspections') + total,
+            inspections_with_threats=models.F('inspections_with_threats') + with_threats,
+            action_required_count=models.F('action_required_count') + action_required,
+        )
+        if not updated:
+            stats, created = cls.objects.get_or_create(grower_id=grower_id)
+            stats.refresh()
+    
+    def refresh(self):
+        """Recompute and save all statistics"""
+        self.refresh_record_stats(save=False)
+        self.refresh_inspection_stats(save=False)
+        self.save()
+    
+    def refresh_record_stats(self, save=True):
+        """Recompute the record-level statistics with a single aggregate query"""
+        totals = SurveillanceRecord.objects.filter(grower_id=self.grower_id).aggregate(
+            record_count=models.Count('id'),
+            first_date=models.Min('date'),
+            last_date=models.Max('date'),
+            trees_sum=models.Sum('trees_surveyed_count'),
+            timed_count=models.Count('total_time_minutes'),
+            time_sum=models.Sum('total_time_minutes'),
+            time_min=models.Min('total_time_minutes'),
+            time_max=models.Max('total_time_minutes'),
+        )
+        self.total_records = totals['record_count']
+        self.earliest_date = totals['first_date']
+        self.latest_date = totals['last_date']
+        self.total_trees_surveyed = totals['trees_sum'] or 0
+        self.timed_records = totals['timed_count']
+        self.total_time_minutes = totals['time_sum'] or 0
+        self.min_time_minutes = totals['time_min']
+        self.max_time_minutes = totals['time_max']
+        if save:
+            self.save(update_fields=[
+                'total_records', 'earliest_date', 'latest_date', 'total_trees_surveyed',
+                'timed_records', 'total_time_minutes', 'min_time_minutes', 'max_time_minutes',
+                'updated_at'
+            ])
+    
+    def refresh_inspection_stats(self, save=True):
+        """Recount the inspection-level statistics"""
+        inspections = TreeInspection.objects.filter(surveillance_record__grower_id=self.grower_id)
+        self.total_inspections = inspections.count()
+        self.inspections_with_threats = inspections.filter(has_threats=True).count()
+        self.action_required_count = inspections.filter(action_required=True).count()
+        if save:
+            self.save(update_fields=['total_inspections', 'inspections_with_threats',
+                                     'action_required_count', 'updated_at'])
+    
+    @property
+    def avg_time_minutes(self):
+        if not self.timed_records:
+            return None
+        return self.total_time_minutes / self.timed_records
+    
+    @property
+    def avg_trees_per_session(self):
+        if not self.total_records:
+            return None
+        return self.total_trees_surveyed / self.total_records
+    
+    @property
+    def detection_rate(self):
+        """Percentage of inspections that found at least one threat"""
+        if not self.total_inspections:
+            return 0
+        return round(self.inspections_with_threats / self.total_inspections * 100, 1)
+
+
+class SurveillanceMonthlyRollup(models.Model):
+    """Pre-aggregated monthly surveillance totals for trend charts.
+
+    One row per (grower, location, month) plus a grower-wide row with no
+    location, so distinct threat counts stay exact across locations. Rows are
+    refreshed by the signal handlers in signals.py and can be rebuilt with
+    `python manage.py rebuild_monthly_rollups`.
+    """
+    grower = models.ForeignKey(Grower, on_delete=models.CASCADE, related_name="monthly_rollups")
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name="monthly_rollups",
+                                 null=True, blank=True,
+                                 help_text="Empty for the grower-wide total across all locations")
+    month = models.DateField(help_text="First day of the month")
+    
+    session_count = models.PositiveIntegerField(default=0)
+    trees_surveyed = models.PositiveIntegerField(default=0)
+    timed_sessions = models.PositiveIntegerField(default=0)
+    total_minutes = models.PositiveIntegerField(default=0)
+    inspection_count = models.PositiveIntegerField(default=0)
+    distinct_threats = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['month']
+        constraints = [
+            models.UniqueConstraint(fields=['grower', 'location', 'month'],
+                                    name='unique_rollup_per_location_month'),
+            models.UniqueConstraint(fields=['grower', 'month'], condition=models.Q(location__isnull=True),
+                                    name='unique_grower_wide_rollup_per_month'),
+        ]
+    
+    def __str__(self):
+        scope = self.location.name if self.location_id else "All locations"
+        return f"{self.grower} - {scope} - {self.month:%b %Y}"
+    
+    @property
+    def avg_time(self):
+        if not self.timed_sessions:
+            return None
+        return self.total_minutes / self.timed_sessions
+    
+    @staticmethod
+    def month_start(day):
+        return day.replace(day=1)
+    
+    @classmethod
+    def refresh_bucket(cls, grower_id, location_id, month):
+        """Recompute one (grower, location, month) row; location_id=None is the grower-wide row"""
+        month = cls.month_start(month)
+        next_month = (month + datetime.timedelta(days=32)).replace(day=1)
+        
+        records = SurveillanceRecord.objects.filter(
+            grower_id=grower_id, date__gte=month, date__lt=next_month
+        )
+        if location_id is not None:
+            records = records.filter(location_id=location_id)
+        
+        totals = records.aggregate(
+            sessions=models.Count('id'),
+            trees=models.Sum('trees_surveyed_count'),
+            timed=models.Count('total_time_minutes'),
+            minutes=models.Sum('total_time_minutes'),
+        )
+        
+        if not totals['sessions']:
+            cls.objects.filter(grower_id=grower_id, location_id=location_id, month=month).delete()
+            return None
+        
+        inspections = TreeInspection.objects.filter(surveillance_record__in=records)
+        rollup, created = cls.objects.update_or_create(
+            grower_id=grower_id, location_id=location_id, month=month,
+            defaults={
+                'session_count': totals['sessions'],
+                'trees_surveyed': totals['trees'] or 0,
+                'timed_sessions': totals['timed'],
+                'total_minutes': totals['minutes'] or 0,
+                'inspection_count': inspections.count(),
+                'distinct_threats': MangoThreat.objects.filter(treeinspection__in=inspections).distinct().count(),
+            }
+        )
+        return rollup
+    
+    @classmethod
+    def refresh_for_record(cls, grower_id, location_id, date):
+        """Refresh the location row and the grower-wide row a record belongs to"""
+        cls.refresh_bucket(grower_id, location_id, date)
+        cls.refresh_bucket(grower_id, None, date)
+    
+    @classmethod
+    def rebuild_for_grower(cls, grower_id):
+        """Drop and recompute every rollup row for one grower"""
+        cls.objects.filter(grower_id=grower_id).delete()
+        buckets = SurveillanceRecord.objects.filter(grower_id=grower_id).annotate(
+            month=TruncMonth('date')
+        ).values_list('location_id', 'month').distinct()
+        months = set()
+        for location_id, month in buckets:
+            cls.refresh_bucket(grower_id, location_id, month)
+            months.add(month)
+        for month in months:
+            cls.refresh_bucket(grower_id, None, month)
+
+
+class OutbreakEvent(models.Model):
+    """A high-risk threat found during a surveillance session, waiting to be notified.
+
+    Queued after the session commits by alerts.queue_detections, one row per
+    (record, threat) however many trees had it. `python manage.py send_outbreak_alerts`
+    turns pending rows into per-recipient digests.
+    """
+    record = models.ForeignKey(SurveillanceRecord, on_delete=models.CASCADE, related_name="outbreak_events")
+    threat = models.ForeignKey(MangoThreat, on_delete=models.CASCADE, related_name="outbreak_events")
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['record', 'threat'], name='unique_outbreak_event'),
+        ]
+        indexes = [
+            # The worker's queue: pending events in arrival order
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True),
+                         name='outbreak_event_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.threat} - {self.record}"
+
+
+class OutbreakNotification(models.Model):
+    """One block/threat line sent to a grower; recent rows form the deduplication window"""
+    recipient = models.ForeignKey(Grower, on_delete=models.CASCADE, related_name="outbreak_notifications")
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name="+")
+    threat = models.ForeignKey(MangoThreat, on_delete=models.CASCADE, related_name="+")
+    distance_km = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True,
+                                      help_text="Empty when the block is the recipient's own")
+    sent_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location', 'threat', 'sent_at'], name='notification_dedup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} - {self.threat} at {self.location} ({self.sent_at:%Y-%m-%d %H:%M})"
+
+
+class BackgroundJob(models.Model):
+    """Deferred work stored in the database and run by `python manage.py run_workers` (see jobs.py)"""
+    QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    unique = models.BooleanField(default=False, help_text="Queued with enqueue(unique=True): one waiting copy at most")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="background_jobs")
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Not claimed before this time (retry backoff)")
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest due job
+            models.Index(fields=['run_after', 'id'], condition=models.Q(status='queued'), name='job_ready_idx'),
+            # Jobs whose worker died are found by lock age
+            models.Index(fields=['locked_at'], condition=models.Q(status='running'), name='job_running_idx'),
+        ]
+        constraints = [
+            # Retries (attempts > 0) are left out, so requeueing one never clashes with a fresh copy
+            models.UniqueConstraint(
+                fields=['task', 'payload'], condition=models.Q(status='queued', unique=True, attempts=0),
+                name='job_unique_waiting_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
 
+    @property
+    def finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
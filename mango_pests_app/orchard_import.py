@@ -0,0 +1,274 @@
+# orchard_import.py - Chunked bulk import of mango trees (and their locations) from CSV/XLSX
+
+import csv
+import io
+import time
+import uuid
+import zipfile
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .models import Location, MangoTree, SurveillancePlan
+
+DEFAULT_CHUNK_SIZE = 1000
+
+REQUIRED_COLUMNS = ('tree_id', 'age')
+OPTIONAL_COLUMNS = (
+    'location', 'location_address', 'variety', 'height_meters', 'canopy_diameter_meters', 'health_status'
+)
+
+# Accept either the stored value or the display label, e.g. "Kensington Pride"
+VARIETIES = {
+    key: value
+    for value, label in MangoTree.VARIETY_CHOICES
+    for key in (value, label.lower())
+}
+HEALTH_STATUSES = {value for value, label in MangoTree._meta.get_field('health_status').choices}
+
+# Error reports are kept in the shared cache so any worker can serve the download
+REPORT_CACHE_PREFIX = 'mango_pests_app:import_report:'
+REPORT_TIMEOUT = 60 * 60
+
+
+class ImportFileError(Exception):
+    """The file as a whole cannot be imported (wrong type, missing columns, missing dependency)"""
+
+
+def _normalize_header(name):
+    return str(name or '').strip().lower().replace(' ', '_')
+
+
+def _check_header(header):
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ImportFileError(f"Missing required column(s): {', '.join(missing)}")
+
+
+def read_csv_rows(binary_file):
+    """(header, iterator of row dicts) for a CSV upload, read lazily"""
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = [_normalize_header(name) for name in next(reader, [])]
+    _check_header(header)
+    return header, (dict(zip(header, values)) for values in reader if any(values))
+
+
+def read_xlsx_rows(binary_file):
+    """(header, iterator of row dicts) for the first sheet of an XLSX upload; needs openpyxl"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("XLSX import requires openpyxl (pip install openpyxl); upload a CSV instead")
+    try:
+        # read_only streams rows instead of building the whole sheet in memory
+        workbook = load_workbook(binary_file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, OSError):
+        raise ImportFileError("This file is not a valid XLSX workbook")
+    rows = workbook.active.iter_rows(values_only=True)
+    header = [_normalize_header(name) for name in next(rows, ())]
+    _check_header(header)
+    return header, (
+        {column: '' if value is None else value for column, value in zip(header, values)}
+        for values in rows if any(value not in (None, '') for value in values)
+    )
+
+
+def read_rows(binary_file, filename):
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx_rows(binary_file)
+    if filename.lower().endswith('.csv'):
+        return read_csv_rows(binary_file)
+    raise ImportFileError("Upload a .csv or .xlsx file")
+
+
+def _decimal(value, field):
+    if value in ('', None):
+        return None
+    try:
+        number = Decimal(str(value)).quantize(Decimal('0.1'))
+    except InvalidOperation:
+        raise ValueError(f"{field} must be a number")
+    # 'nan' quantizes fine but raises InvalidOperation when compared
+    if not number.is_finite():
+        raise ValueError(f"{field} must be a number")
+    if number < 0 or number >= 1000:
+        raise ValueError(f"{field} must be between 0 and 999.9")
+    return number
+
+
+class OrchardImport:
+    """Import trees for one grower, `chunk_size` rows per validation query and bulk insert.
+
+    Rows name their location in a `location` column (by name or id) unless a
+    default location is given; unknown names are created when the row also has
+    a `location_address`, once one of their trees is actually inserted. Every
+    rejected row is kept with its errors for the report.
+    """
+
+    def __init__(self, grower, location=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.grower = grower
+        self.default_location = location
+        self.chunk_size = chunk_size
+        self.locations = {}
+        for existing in Location.objects.filter(grower=grower):
+            self.locations[existing.name.strip().lower()] = existing
+            self.locations[str(existing.pk)] = existing
+        self.seen_tree_ids = set()
+        self.created = 0
+        self.created_locations = 0
+        self.rejected = []
+        self.header = []
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.created / self.seconds if self.seconds else 0.0
+
+    def run(self, header, rows):
+        self.header = header
+        start = time.perf_counter()
+        numbered = enumerate(rows, start=2)  # row 1 is the header
+        while True:
+            chunk = list(islice(numbered, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        self.seconds = time.perf_counter() - start
+        return self
+
+    def location_for(self, row):
+        name = str(row.get('location') or '').strip()
+        if not name:
+            if self.default_location is None:
+                raise ValueError("location is required")
+            return self.default_location
+        location = self.locations.get(name.lower())
+        if location is None:
+            address = str(row.get('location_address') or '').strip()
+            if not address:
+                raise ValueError(f"Unknown location '{name}' (add a location_address column to create it)")
+            # Saved by import_chunk with the first tree that survives the duplicate check
+            location = Location(name=name, address=address, grower=self.grower)
+            self.locations[name.lower()] = location
+        return location
+
+    def save_new_locations(self, trees):
+        """Save the unsaved locations these trees belong to; returns them"""
+        pending = {id(tree.location): tree.location for tree in trees if tree.location.pk is None}
+        for location in pending.values():
+            location.save()
+        return list(pending.values())
+
+    def build_tree(self, row):
+        """Unsaved MangoTree for a row, or ValueError listing what is wrong with it"""
+        errors = []
+        tree_id = str(row.get('tree_id') or '').strip()
+        if not tree_id:
+            errors.append("tree_id is required")
+        elif len(tree_id) > MangoTree._meta.get_field('tree_id').max_length:
+            errors.append("tree_id is too long")
+        elif tree_id in self.seen_tree_ids:
+            errors.append(f"tree_id '{tree_id}' appears more than once in this file")
+
+        age = None
+        try:
+            # XLSX cells arrive as floats, so accept 12.0 but not 12.5
+            value = Decimal(str(row.get('age')).strip())
+            if value < 0 or value != value.to_integral_value():
+                raise InvalidOperation
+            age = int(value)
+        except (InvalidOperation, OverflowError):
+            errors.append("age must be a whole number of years")
+
+        variety = str(row.get('variety') or '').strip().lower()
+        if variety and variety not in VARIETIES:
+            errors.append(f"Unknown variety '{row.get('variety')}'")
+        health = str(row.get('health_status') or '').strip().lower()
+        if health and health not in HEALTH_STATUSES:
+            errors.append(f"Unknown health_status '{row.get('health_status')}'")
+
+        measurements = {}
+        for field in ('height_meters', 'canopy_diameter_meters'):
+            try:
+                measurements[field] = _decimal(row.get(field), field)
+            except ValueError as e:
+                errors.append(str(e))
+
+        if not errors:
+            try:
+                location = self.location_for(row)
+            except ValueError as e:
+                errors.append(str(e))
+        if errors:
+            raise ValueError('; '.join(errors))
+
+        self.seen_tree_ids.add(tree_id)
+        return MangoTree(
+            location=location, tree_id=tree_id, age=age,
+            # save() is skipped by bulk_create, so set what it would have
+            age_group=MangoTree.age_group_for(age),
+            variety=VARIETIES[variety] if variety else 'kensington_pride',
+            health_status=health or 'good',
+            **measurements,
+        )
+
+    def import_chunk(self, chunk):
+        candidates = []
+        for row_number, row in chunk:
+            try:
+                candidates.append((row_number, row, self.build_tree(row)))
+            except ValueError as e:
+                self.rejected.append((row_number, row, str(e)))
+
+        for attempt in range(2):
+            # One query for the whole chunk instead of an exists() per tree
+            taken = set(MangoTree.objects.filter(
+                tree_id__in=[tree.tree_id for _, _, tree in candidates]
+            ).values_list('tree_id', flat=True))
+            trees = [tree for _, _, tree in candidates if tree.tree_id not in taken]
+            new_locations = []
+            try:
+                with transaction.atomic():
+                    new_locations = self.save_new_locations(trees)
+                    MangoTree.objects.bulk_create(trees, batch_size=self.chunk_size)
+            except IntegrityError:
+                # The locations were rolled back with the trees; save them again with the survivors
+                for location in new_locations:
+                    location.pk = None
+                # Another import claimed some of these IDs after the check; check again once
+                if attempt:
+                    raise
+                continue
+            break
+
+        # bulk_create sends no signals, so flag the affected plans' effort here
+        SurveillancePlan.mark_effort_dirty(location_ids={tree.location_id for tree in trees})
+        self.created += len(trees)
+        self.created_locations += len(new_locations)
+        self.rejected += [
+            (row_number, row, f"A tree with ID '{tree.tree_id}' already exists")
+            for row_number, row, tree in candidates if tree.tree_id in taken
+        ]
+
+    def error_report(self):
+        """CSV of rejected rows: the row number, the reason and the original columns"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['row', 'errors'] + self.header)
+        for row_number, row, errors in sorted(self.rejected, key=lambda entry: entry[0]):
+            writer.writerow([row_number, errors] + [row.get(column, '') for column in self.header])
+        return buffer.getvalue()
+
+
+def store_error_report(user_id, report):
+    """Keep a report for download; returns its id"""
+    report_id = uuid.uuid4().hex
+    cache.set(f"{REPORT_CACHE_PREFIX}{user_id}:{report_id}", report, REPORT_TIMEOUT)
+    return report_id
+
+
+def load_error_report(user_id, report_id):
+    return cache.get(f"{REPORT_CACHE_PREFIX}{user_id}:{report_id}")
@@ -0,0 +1,160 @@
+# profiling.py - Opt-in per-request SQL and timing instrumentation
+
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+# Requests kept per view for the percentile endpoint
+SAMPLES_PER_VIEW = 500
+PERCENTILES = (50, 90, 95, 99)
+METRICS = ('total_ms', 'db_ms', 'template_ms', 'queries')
+
+
+class QueryTimer:
+    """Database execute wrapper that counts queries and sums their time per SQL statement"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.statement_seconds = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.seconds += elapsed
+            self.count += 1
+            self.statements[sql] += 1
+            self.statement_seconds[sql] += elapsed
+
+    def repeated_statements(self, limit=5):
+        """[(sql, count, total_ms)] for statements run more than once, most frequent first"""
+        return [
+            (sql, count, round(self.statement_seconds[sql] * 1000, 2))
+            for sql, count in self.statements.most_common(limit)
+            if count > 1
+        ]
+
+
+class RequestStats:
+    """Recent request profiles per view name, shared by all threads in the process"""
+
+    def __init__(self, samples_per_view=SAMPLES_PER_VIEW):
+        self.samples_per_view = samples_per_view
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def record(self, view_name, profile):
+        with self._lock:
+            samples = self._samples.setdefault(view_name, deque(maxlen=self.samples_per_view))
+            samples.append(profile)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        """{view_name: {'requests': n, metric: {'p50': ..., 'max': ...}}}"""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+
+        summary = {}
+        for view_name, samples in sorted(snapshot.items()):
+            view_summary = {'requests': len(samples)}
+            for metric in METRICS:
+                values = sorted(sample[metric] for sample in samples)
+                view_summary[metric] = {f"p{p}": percentile(values, p) for p in PERCENTILES}
+                view_summary[metric]['max'] = values[-1]
+            summary[view_name] = view_summary
+        return summary
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+request_stats = RequestStats()
+
+
+def view_name_for(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return '<unresolved>'
+    return match.view_name
+
+
+class RequestProfilingMiddleware:
+    """Record query count, DB time, template render time and total time per request.
+
+    Enabled with settings.REQUEST_PROFILING. Requests slower than
+    REQUEST_PROFILING_SLOW_MS are logged with their most repeated SQL statements,
+    and every response gets a Server-Timing header for the browser dev tools.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        request._template_seconds = 0.0
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        view_name = view_name_for(request)
+        profile = {
+            'total_ms': round(total_ms, 2),
+            'db_ms': round(timer.seconds * 1000, 2),
+            'template_ms': round(request._template_seconds * 1000, 2),
+            'queries': timer.count,
+        }
+        request_stats.record(view_name, profile)
+        response['Server-Timing'] = (
+            f"db;dur={profile['db_ms']}, tpl;dur={profile['template_ms']}, total;dur={profile['total_ms']}"
+        )
+
+        if total_ms >= getattr(settings, 'REQUEST_PROFILING_SLOW_MS', 500):
+            repeated = "".join(
+                f"\n  {count}x ({ms} ms) {sql}" for sql, count, ms in timer.repeated_statements()
+            )
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms total, %d queries in %.0f ms, templates %.0f ms%s",
+                request.method, request.get_full_path(), view_name, total_ms,
+                timer.count, profile['db_ms'], profile['template_ms'],
+                repeated or "\n  no repeated SQL",
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # TemplateResponse renders after the view returns; time that step separately.
+        # Function views using render() count their template time as view time.
+        render = response.render
+
+        def timed_render():
+            start = time.perf_counter()
+            try:
+                return render()
+            finally:
+                request._template_seconds += time.perf_counter() - start
+
+        response.render = timed_render
+        return response
@@ -0,0 +1,126 @@
+# routes.py - Visiting order and travel time between a grower's blocks from their GPS coordinates
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Average speed between blocks on farm tracks, including getting in and out of the vehicle
+TRAVEL_SPEED_KMH = 20
+# Blocks without coordinates keep the old flat allowance
+UNLOCATED_BLOCK_MINUTES = 10
+
+# Upper bound on improvement passes; each pass is O(n^2) but vectorised per row
+MAX_TWO_OPT_PASSES = 50
+
+
+def haversine_between(latitudes, longitudes, other_latitudes, other_longitudes):
+    """len(a) x len(b) great-circle distances in km between two sets of points given in degrees"""
+    lat = np.radians(np.asarray(latitudes, dtype=float))[:, None]
+    lon = np.radians(np.asarray(longitudes, dtype=float))[:, None]
+    other_lat = np.radians(np.asarray(other_latitudes, dtype=float))[None, :]
+    other_lon = np.radians(np.asarray(other_longitudes, dtype=float))[None, :]
+    a = np.sin((lat - other_lat) / 2) ** 2 + np.cos(lat) * np.cos(other_lat) * np.sin((lon - other_lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def haversine_matrix(latitudes, longitudes):
+    """n x n great-circle distances in km between points given in degrees"""
+    return haversine_between(latitudes, longitudes, latitudes, longitudes)
+
+
+def nearest_neighbour(dist, start=0):
+    """Greedy tour: always drive to the closest block not yet visited"""
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    tour = np.empty(n, dtype=int)
+    tour[0] = current = start
+    visited[start] = True
+    for position in range(1, n):
+        row = np.where(visited, np.inf, dist[current])
+        current = int(np.argmin(row))
+        tour[position] = current
+        visited[current] = True
+    return tour
+
+
+def two_opt(tour, dist, max_passes=MAX_TWO_OPT_PASSES):
+    """Improve a closed tour by reversing segments while that shortens it.
+
+    For each edge (a, b) every later edge (c, d) is scored at once with NumPy
+    and the best reversal is applied, so a pass costs n vectorised row operations.
+    """
+    tour = np.array(tour, dtype=int)
+    m = len(tour)
+    if m < 4:
+        return tour
+    for _ in range(max_passes):
+        improved = False
+        for i in range(m - 2):
+            closed = np.append(tour, tour[0])
+            a, b = closed[i], closed[i + 1]
+            c = closed[i + 2:m]
+            d = closed[i + 3:m + 1]
+            delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+            if i == 0:
+                delta[-1] = 0  # (c, d) would be the edge back into a
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-9:
+                j = i + 2 + k
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return tour
+
+
+def shortest_path_order(dist):
+    """Near-optimal order to visit every point once, starting and ending anywhere.
+
+    A dummy point at distance 0 from all others turns the open path into a
+    closed tour; cutting the tour at the dummy gives the path.
+    """
+    n = len(dist)
+    if n < 3:
+        return list(range(n))
+    padded = np.zeros((n + 1, n + 1))
+    padded[:n, :n] = dist
+    tour = two_opt(nearest_neighbour(padded, start=n), padded)
+    dummy = int(np.flatnonzero(tour == n)[0])
+    return [int(point) for point in np.concatenate([tour[dummy + 1:], tour[:dummy]])]
+
+
+def path_length(order, dist):
+    if len(order) < 2:
+        return 0.0
+    return float(dist[order[:-1], order[1:]].sum())
+
+
+@dataclass
+class Route:
+    """Visiting order for a set of locations; blocks without GPS are appended unordered"""
+    locations: list = field(default_factory=list)
+    distance_km: float = 0.0
+    unlocated: int = 0
+
+    @property
+    def travel_minutes(self):
+        minutes = self.distance_km / TRAVEL_SPEED_KMH * 60 + self.unlocated * UNLOCATED_BLOCK_MINUTES
+        return Decimal(str(round(minutes, 1)))
+
+
+def plan_route(locations):
+    """Route through Location objects using their gps_latitude/gps_longitude"""
+    located = [loc for loc in locations if loc.gps_latitude is not None and loc.gps_longitude is not None]
+    unlocated = [loc for loc in locations if loc.gps_latitude is None or loc.gps_longitude is None]
+    if not located:
+        return Route(locations=unlocated, unlocated=len(unlocated))
+    dist = haversine_matrix([loc.gps_latitude for loc in located], [loc.gps_longitude for loc in located])
+    order = shortest_path_order(dist)
+    return Route(
+        locations=[located[i] for i in order] + unlocated,
+        distance_km=round(path_length(order, dist), 3),
+        unlocated=len(unlocated),
+    )
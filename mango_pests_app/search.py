@@ -0,0 +1,170 @@
+# search.py - Ranked full-text threat search backed by SQLite FTS5
+
+import re
+
+from django.db import connection, connections
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+
+from .models import MangoThreat
+
+SEARCH_TABLE = 'mango_pests_app_threat_search'
+
+# Same triggers as migration 0007, reinstalled by repair_search_index()
+SEARCH_TRIGGERS_SQL = {
+    'mango_pests_app_threat_search_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS mango_pests_app_threat_search_ai
+        AFTER INSERT ON mango_pests_app_mangothreat BEGIN
+            INSERT INTO {SEARCH_TABLE}(rowid, name, description, details)
+            VALUES (new.id, new.name, new.description, new.details);
+        END""",
+    'mango_pests_app_threat_search_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS mango_pests_app_threat_search_ad
+        AFTER DELETE ON mango_pests_app_mangothreat BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description, details)
+            VALUES ('delete', old.id, old.name, old.description, old.details);
+        END""",
+    'mango_pests_app_threat_search_au': f"""
+        CREATE TRIGGER IF NOT EXISTS mango_pests_app_threat_search_au
+        AFTER UPDATE ON mango_pests_app_mangothreat BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description, details)
+            VALUES ('delete', old.id, old.name, old.description, old.details);
+            INSERT INTO {SEARCH_TABLE}(rowid, name, description, details)
+            VALUES (new.id, new.name, new.description, new.details);
+        END""",
+}
+
+# bm25() column weights: a hit in the name outranks one in the description or details
+RANK_WEIGHTS = (10.0, 4.0, 1.0)
+
+SORT_OPTIONS = {
+    'relevance': None,
+    'name_asc': 'name',
+    'name_desc': '-name',
+}
+
+_search_terms = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    return _search_terms.findall(query or '')
+
+
+_fts_databases = set()
+
+
+def fts_available(using='default'):
+    """True once the FTS5 table exists; positive answers are remembered per process"""
+    if using in _fts_databases:
+        return True
+    db = connections[using]
+    if db.vendor == 'sqlite' and SEARCH_TABLE in db.introspection.table_names():
+        _fts_databases.add(using)
+        return True
+    return False
+
+
+def match_expression(terms):
+    """FTS5 query matching every term as a prefix, e.g. 'fruit fl' -> "fruit"* AND "fl"*"""
+    return ' AND '.join(f'"{term}"*' for term in terms)
+
+
+class ThreatSearchResults:
+    """Lazily paginated search results; Paginator only ever loads one page of rows.
+
+    With FTS5 the ranking, filtering and LIMIT/OFFSET all run in SQLite and only
+    the threats on the requested page are fetched. Elsewhere matching falls back
+    to icontains on every term.
+    """
+
+    def __init__(self, query='', threat_type=None, sort=None):
+        self.terms = search_terms(query)
+        self.threat_type = threat_type if threat_type in ('pest', 'disease') else None
+        if sort not in SORT_OPTIONS or (sort == 'relevance' and not self.terms):
+            sort = 'relevance' if self.terms else 'name_asc'
+        self.sort = sort
+        self.use_fts = bool(self.terms) and fts_available()
+        self._count = None
+
+    def queryset(self):
+        """Matching threats as a queryset (unranked when searching with FTS5)"""
+        threats = MangoThreat.objects.all()
+        if self.threat_type:
+            threats = threats.filter(threat_type=self.threat_type)
+        if self.use_fts:
+            threats = threats.filter(id__in=RawSQL(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+                [match_expression(self.terms)],
+            ))
+        else:
+            for term in self.terms:
+                threats = threats.filter(
+                    Q(name__icontains=term) | Q(description__icontains=term) | Q(details__icontains=term)
+                )
+        return threats
+
+    def type_counts(self):
+        counts = self.queryset().aggregate(
+            pest=Count('id', filter=Q(threat_type='pest')),
+            disease=Count('id', filter=Q(threat_type='disease')),
+        )
+        self._count = counts['pest'] + counts['disease']
+        return counts
+
+    def count(self):
+        if self._count is None:
+            self._count = self.queryset().count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        if self.sort != 'relevance':
+            return list(self.queryset().order_by(SORT_OPTIONS[self.sort], 'pk')[start:stop])
+        if not self.use_fts:
+            return list(self.queryset().order_by('name', 'pk')[start:stop])
+        return self.ranked_page(start, stop)
+
+    def ranked_page(self, start, stop):
+        sql = (
+            f'SELECT t.id FROM {SEARCH_TABLE} s '
+            f'JOIN mango_pests_app_mangothreat t ON t.id = s.rowid '
+            f'WHERE {SEARCH_TABLE} MATCH %s'
+        )
+        params = [match_expression(self.terms)]
+        if self.threat_type:
+            sql += ' AND t.threat_type = %s'
+            params.append(self.threat_type)
+        sql += ' ORDER BY bm25({table}, {0}, {1}, {2}), t.name LIMIT %s OFFSET %s'.format(
+            *RANK_WEIGHTS, table=SEARCH_TABLE
+        )
+        params += [-1 if stop is None else stop - start, start]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            ids = [row[0] for row in cursor.fetchall()]
+        threats = MangoThreat.objects.in_bulk(ids)
+        return [threats[pk] for pk in ids if pk in threats]
+
+
+def repair_search_index(sender=None, using='default', **kwargs):
+    """post_migrate hook: reinstall the FTS triggers if a migration dropped them.
+
+    SQLite drops a table's triggers with it, which happens whenever Django
+    remakes mango_pests_app_mangothreat to alter a column.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite' or SEARCH_TABLE not in db.introspection.table_names():
+        return
+    with db.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+        if existing.issuperset(SEARCH_TRIGGERS_SQL):
+            return
+        for statement in SEARCH_TRIGGERS_SQL.values():
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
@@ -0,0 +1,283 @@
+# signals.py - Keep materialized surveillance statistics in sync
+
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .alerts import queue_detections
+from .catalog import get_catalog, invalidate_catalog
+from .models import (
+    GrowerSurveillanceStats, Location, MangoThreat, MangoTree, PlantPart, SurveillanceMonthlyRollup,
+    SurveillancePlan, SurveillanceRecord, TreeInspection
+)
+
+
+def _deleted_directly(origin, model):
+    """True when a deletion started on `model` itself rather than cascading from a parent"""
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+def _refresh_grower(grower_id):
+    """Recompute every materialized table for one grower"""
+    if grower_id is None:
+        return
+    stats, created = GrowerSurveillanceStats.objects.get_or_create(grower_id=grower_id)
+    stats.refresh()
+    SurveillanceMonthlyRollup.rebuild_for_grower(grower_id)
+
+
+def _refresh_inspection_aggregates(records):
+    """Refresh inspection-derived figures for the given (grower_id, location_id, date) records"""
+    records = set(records)
+    for stats in GrowerSurveillanceStats.objects.filter(grower_id__in={r[0] for r in records}):
+        stats.refresh_inspection_stats()
+    for grower_id, location_id, date in records:
+        SurveillanceMonthlyRollup.refresh_for_record(grower_id, location_id, date)
+
+
+def _record_keys(inspection_ids):
+    return SurveillanceRecord.objects.filter(
+        tree_inspections__pk__in=inspection_ids
+    ).values_list('grower_id', 'location_id', 'date').distinct()
+
+
+# Reference data catalog (admin, CRUD views and the AJAX API all save through the ORM)
+
+@receiver(post_save, sender=MangoThreat)
+@receiver(post_delete, sender=MangoThreat)
+@receiver(post_save, sender=PlantPart)
+@receiver(post_delete, sender=PlantPart)
+def invalidate_catalog_on_change(sender, **kwargs):
+    invalidate_catalog()
+
+
+# Surveillance records
+
+@receiver(pre_save, sender=SurveillanceRecord)
+def remember_previous_record_bucket(sender, instance, **kwargs):
+    # A record moved to another location or month leaves a stale rollup behind
+    instance._previous_bucket = None
+    instance._previous_plan_id = None
+    if instance.pk:
+        previous = SurveillanceRecord.objects.filter(
+            pk=instance.pk
+        ).values_list('location_id', 'date', 'surveillance_plan_id').first()
+        if previous:
+            instance._previous_bucket = previous[:2]
+            instance._previous_plan_id = previous[2]
+
+
+@receiver(post_save, sender=SurveillanceRecord)
+def update_plan_schedules_on_record_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_bucket', None)
+    SurveillancePlan.refresh_schedules(SurveillancePlan.covering(
+        {instance.location_id, previous[0] if previous else None},
+        {instance.surveillance_plan_id, getattr(instance, '_previous_plan_id', None)},
+    ))
+
+
+@receiver(post_save, sender=SurveillanceRecord)
+def update_stats_on_record_save(sender, instance, **kwargs):
+    stats = GrowerSurveillanceStats.objects.filter(grower_id=instance.grower_id).first()
+    if stats is None:
+        _refresh_grower(instance.grower_id)
+        return
+    stats.refresh_record_stats()
+
+    SurveillanceMonthlyRollup.refresh_for_record(instance.grower_id, instance.location_id, instance.date)
+    previous = getattr(instance, '_previous_bucket', None)
+    if previous:
+        previous_location_id, previous_date = previous
+        if (previous_location_id != instance.location_id
+                or SurveillanceMonthlyRollup.month_start(previous_date)
+                != SurveillanceMonthlyRollup.month_start(instance.date)):
+            SurveillanceMonthlyRollup.refresh_for_record(instance.grower_id, previous_location_id, previous_date)
+
+
+@receiver(post_delete, sender=SurveillanceRecord)
+def update_stats_on_record_delete(sender, instance, origin=None, **kwargs):
+    # Cascaded inspections skip their own handler, so recount everything once here
+    if _deleted_directly(origin, SurveillanceRecord):
+        stats, created = GrowerSurveillanceStats.objects.get_or_create(grower_id=instance.grower_id)
+        stats.refresh()
+        SurveillanceMonthlyRollup.refresh_for_record(instance.grower_id, instance.location_id, instance.date)
+        SurveillancePlan.refresh_schedules(
+            SurveillancePlan.covering({instance.location_id}, {instance.surveillance_plan_id})
+        )
+
+
+# Parents whose deletion cascades into records or inspections
+
+@receiver(post_delete, sender=Location)
+def update_stats_on_location_delete(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, Location):
+        _refresh_grower(instance.grower_id)
+        # The plan links went with the location's records, without an m2m_changed signal
+        SurveillancePlan.refresh_schedules(
+            SurveillancePlan.objects.filter(grower_id=instance.grower_id).values_list('pk', flat=True)
+        )
+
+
+@receiver(post_delete, sender=MangoTree)
+def update_stats_on_tree_delete(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, MangoTree):
+        grower_id = Location.objects.filter(pk=instance.location_id).values_list('grower_id', flat=True).first()
+        _refresh_grower(grower_id)
+
+
+@receiver(pre_delete, sender=MangoThreat)
+def remember_threat_detections(sender, instance, **kwargs):
+    # The through rows disappear without an m2m_changed signal
+    detections = TreeInspection.objects.filter(threats_found=instance)
+    instance._detected_in_inspections = list(detections.values_list('pk', flat=True))
+    instance._detected_by_growers = set(
+        detections.values_list('surveillance_record__grower_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=MangoThreat)
+def update_stats_on_threat_delete(sender, instance, **kwargs):
+    TreeInspection.refresh_threat_counts(
+        TreeInspection.objects.filter(pk__in=getattr(instance, '_detected_in_inspections', []))
+    )
+    for grower_id in getattr(instance, '_detected_by_growers', ()):
+        _refresh_grower(grower_id)
+
+
+# Tree inspections
+
+@receiver(post_save, sender=TreeInspection)
+def update_stats_on_inspection_save(sender, instance, created, **kwargs):
+    record = instance.surveillance_record
+    if created:
+        # Threats are linked after the row exists, see m2m handler below
+        GrowerSurveillanceStats.adjust_inspection_counts(
+            record.grower_id, total=1, action_required=int(instance.action_required)
+        )
+        SurveillanceMonthlyRollup.refresh_for_record(record.grower_id, record.location_id, record.date)
+    else:
+        _refresh_inspection_aggregates([(record.grower_id, record.location_id, record.date)])
+
+
+@receiver(post_delete, sender=TreeInspection)
+def update_stats_on_inspection_delete(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, TreeInspection):
+        _refresh_inspection_aggregates(
+            SurveillanceRecord.objects.filter(
+                pk=instance.surveillance_record_id
+            ).values_list('grower_id', 'location_id', 'date')
+        )
+
+
+@receiver(m2m_changed, sender=TreeInspection.threats_found.through)
+def update_stats_on_threats_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # instance is a MangoThreat; remember which inspections lose it
+        instance._cleared_inspection_ids = list(instance.treeinspection_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        # The change may span several growers
+        if action == 'post_clear':
+            inspection_ids = getattr(instance, '_cleared_inspection_ids', [])
+        else:
+            inspection_ids = pk_set or []
+        TreeInspection.refresh_threat_counts(TreeInspection.objects.filter(pk__in=inspection_ids))
+        _refresh_inspection_aggregates(_record_keys(inspection_ids))
+        return
+
+    had_threats = instance.has_threats
+    TreeInspection.refresh_threat_counts(TreeInspection.objects.filter(pk=instance.pk))
+    instance.threat_count, instance.has_threats = TreeInspection.objects.filter(
+        pk=instance.pk
+    ).values_list('threat_count', 'has_threats').get()
+
+    record = instance.surveillance_record
+    if instance.has_threats != had_threats:
+        GrowerSurveillanceStats.adjust_inspection_counts(
+            record.grower_id, with_threats=1 if instance.has_threats else -1
+        )
+    SurveillanceMonthlyRollup.refresh_for_record(record.grower_id, record.location_id, record.date)
+
+
+# Outbreak alerts
+
+@receiver(m2m_changed, sender=TreeInspection.threats_found.through)
+def queue_outbreak_events_on_threats_added(sender, instance, action, reverse, pk_set, **kwargs):
+    # Admin and per-inspection edits; the bulk write paths queue their own events
+    if action != 'post_add' or not pk_set:
+        return
+    if not reverse:
+        catalog = get_catalog()
+        queue_detections(instance.surveillance_record_id,
+                         [catalog.threats_by_id[pk] for pk in pk_set if pk in catalog.threats_by_id])
+        return
+    record_ids = TreeInspection.objects.filter(pk__in=pk_set).values_list('surveillance_record_id', flat=True)
+    for record_id in set(record_ids):
+        queue_detections(record_id, [instance])
+
+
+# Surveillance plan schedules
+
+@receiver(m2m_changed, sender=SurveillancePlan.locations.through)
+def update_plan_schedule_on_locations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # instance is a Location; remember which plans lose it
+        instance._cleared_plan_ids = list(instance.surveillanceplan_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        plan_ids = [instance.pk]
+    elif action == 'post_clear':
+        plan_ids = getattr(instance, '_cleared_plan_ids', [])
+    else:
+        plan_ids = pk_set or []
+    SurveillancePlan.refresh_schedules(plan_ids)
+    SurveillancePlan.mark_effort_dirty(plan_ids=plan_ids)
+
+
+# Surveillance plan effort, recomputed later by SurveillancePlan.refresh_efforts
+
+@receiver(pre_save, sender=MangoTree)
+def remember_previous_tree_location(sender, instance, **kwargs):
+    instance._previous_location_id = None
+    if instance.pk:
+        instance._previous_location_id = MangoTree.objects.filter(
+            pk=instance.pk
+        ).values_list('location_id', flat=True).first()
+
+
+@receiver(post_save, sender=MangoTree)
+def mark_plan_effort_on_tree_save(sender, instance, **kwargs):
+    SurveillancePlan.mark_effort_dirty(
+        location_ids={instance.location_id, getattr(instance, '_previous_location_id', None)}
+    )
+
+
+@receiver(post_delete, sender=MangoTree)
+def mark_plan_effort_on_tree_delete(sender, instance, origin=None, **kwargs):
+    # A cascade from a location is handled once by the location handlers
+    if _deleted_directly(origin, MangoTree):
+        SurveillancePlan.mark_effort_dirty(location_ids=[instance.location_id])
+
+
+@receiver(post_save, sender=Location)
+def mark_plan_effort_on_location_save(sender, instance, created, **kwargs):
+    if not created:
+        SurveillancePlan.mark_effort_dirty(location_ids=[instance.pk])
+
+
+@receiver(pre_delete, sender=Location)
+def remember_location_plans(sender, instance, **kwargs):
+    # The plan links are deleted without an m2m_changed signal
+    instance._plan_ids = list(instance.surveillanceplan_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Location)
+def mark_plan_effort_on_location_delete(sender, instance, **kwargs):
+    SurveillancePlan.mark_effort_dirty(plan_ids=getattr(instance, '_plan_ids', []))
@@ -0,0 +1,158 @@
+# spatial.py - Proximity queries over Location GPS positions using the grid index
+
+import math
+
+from django.db.models import Count, Max, Q
+
+from .api import APIError
+from .catalog import get_catalog
+from .models import Location, TreeInspection
+from .routes import haversine_between
+
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 100
+DEFAULT_DAYS = 30
+MAX_DAYS = 365
+
+# Detection sites used as centres for a threat search; each adds a cell range to the query
+MAX_SOURCE_SITES = 200
+
+KM_PER_DEGREE_LATITUDE = 111.32
+
+
+def parse_radius(value):
+    if value in (None, ''):
+        return DEFAULT_RADIUS_KM
+    try:
+        radius = float(value)
+    except ValueError:
+        raise APIError("radius_km must be a number")
+    if not 0 < radius <= MAX_RADIUS_KM:
+        raise APIError(f"radius_km must be between 0 and {MAX_RADIUS_KM}")
+    return radius
+
+
+def parse_days(value):
+    if value in (None, ''):
+        return DEFAULT_DAYS
+    try:
+        days = int(value)
+    except ValueError:
+        raise APIError("days must be a whole number")
+    if not 1 <= days <= MAX_DAYS:
+        raise APIError(f"days must be between 1 and {MAX_DAYS}")
+    return days
+
+
+def cell_ranges(latitude, longitude, radius_km):
+    """Inclusive (grid_lat, grid_lon) ranges of the cells a circle can touch"""
+    latitude, longitude = float(latitude), float(longitude)
+    dlat = radius_km / KM_PER_DEGREE_LATITUDE
+    # Degrees of longitude shrink towards the poles; size the box for the edge nearest one
+    widest = min(abs(latitude) + dlat, 89.0)
+    dlon = radius_km / (KM_PER_DEGREE_LATITUDE * math.cos(math.radians(widest)))
+    low_lat, low_lon = Location.grid_cell_for(latitude - dlat, longitude - dlon)
+    high_lat, high_lon = Location.grid_cell_for(latitude + dlat, longitude + dlon)
+    return (low_lat, high_lat), (low_lon, high_lon)
+
+
+def _within(centres, radius_km, exclude_ids=()):
+    """Locations in the grid cells around the centres, and the centres x locations distance matrix.
+
+    One query reads the cells through location_grid_idx; the exact great-circle
+    distances let callers drop the corners of those cell blocks.
+    """
+    cells = Q()
+    for latitude, longitude in centres:
+        lat_range, lon_range = cell_ranges(latitude, longitude, radius_km)
+        cells |= Q(grid_lat__range=lat_range, grid_lon__range=lon_range)
+    candidates = list(Location.objects.filter(cells).exclude(pk__in=list(exclude_ids)))
+    if not candidates:
+        return [], None
+    distances = haversine_between(
+        [latitude for latitude, _ in centres], [longitude for _, longitude in centres],
+        [location.gps_latitude for location in candidates], [location.gps_longitude for location in candidates],
+    )
+    return candidates, distances
+
+
+def nearby_locations(centres, radius_km, exclude_ids=()):
+    """[(location, distance_km)] within radius_km of any (latitude, longitude) centre, nearest first"""
+    if not centres:
+        return []
+    candidates, distances = _within(centres, radius_km, exclude_ids)
+    if not candidates:
+        return []
+    nearby = [
+        (location, round(float(distance), 2))
+        for location, distance in zip(candidates, distances.min(axis=0)) if distance <= radius_km
+    ]
+    nearby.sort(key=lambda pair: (pair[1], pair[0].pk))
+    return nearby
+
+
+def neighbours(sources, radius_km):
+    """{source id: [(location, distance_km)]} within radius_km of each Location, one query for all of them.
+
+    Sources without GPS coordinates have no neighbours.
+    """
+    sources = [source for source in sources if source.gps_latitude is not None and source.gps_longitude is not None]
+    if not sources:
+        return {}
+    candidates, distances = _within([(source.gps_latitude, source.gps_longitude) for source in sources], radius_km)
+    found = {}
+    for source, row in zip(sources, distances if candidates else [[]] * len(sources)):
+        nearby = [
+            (location, round(float(distance), 2))
+            for location, distance in zip(candidates, row)
+            if distance <= radius_km and location.pk != source.pk
+        ]
+        nearby.sort(key=lambda pair: (pair[1], pair[0].pk))
+        found[source.pk] = nearby
+    return found
+
+
+def recent_detections(location_ids, since, threat_ids=None):
+    """{location_id: [detection summary]} for threats found at these locations since a date, one query"""
+    ThreatsThrough = TreeInspection.threats_found.through
+    links = ThreatsThrough.objects.filter(
+        treeinspection__surveillance_record__location_id__in=list(location_ids),
+        treeinspection__surveillance_record__date__gte=since,
+    )
+    if threat_ids is not None:
+        links = links.filter(mangothreat_id__in=list(threat_ids))
+    rows = links.values(
+        'treeinspection__surveillance_record__location_id', 'mangothreat_id'
+    ).annotate(
+        trees=Count('treeinspection_id'),
+        last_seen=Max('treeinspection__surveillance_record__date'),
+    ).order_by()
+
+    threats = get_catalog().threats_by_id
+    detections = {}
+    for row in rows:
+        threat = threats.get(row['mangothreat_id'])
+        if threat is None:
+            continue
+        detections.setdefault(row['treeinspection__surveillance_record__location_id'], []).append({
+            'threat': threat.slug,
+            'name': threat.name,
+            'risk_level': threat.risk_level,
+            'trees': row['trees'],
+            'last_seen': row['last_seen'].isoformat(),
+        })
+    for summaries in detections.values():
+        summaries.sort(key=lambda summary: (summary['last_seen'], summary['trees']), reverse=True)
+    return detections
+
+
+def detection_sites(threat, since, grower=None):
+    """Locations with GPS where `threat` was found since a date, optionally only one grower's"""
+    sites = Location.objects.filter(
+        surveillancerecord__date__gte=since,
+        surveillancerecord__tree_inspections__threats_found=threat,
+        gps_latitude__isnull=False, gps_longitude__isnull=False,
+    )
+    if grower is not None:
+        sites = sites.filter(grower=grower)
+    return list(sites.distinct().order_by('pk')[:MAX_SOURCE_SITES])
@@ -158,7 +158,7 @@ function addThreatToList(threat) {
                 <h5 class="card-title">${threat.name}</h5>
                 <p class="card-text">${threat.description}</p>
                 <div class="d-flex justify-content-between align-items-center mb-2">
-                    <span class="badge bg-${threat.threat_type === 'Pest' ? 'warning' : 'danger'}">${threat.threat_type}</span>
+                    <span class="badge bg-${threat.threat_type.toLowerCase() === 'pest' ? 'warning' : 'danger'}">${threat.threat_type}</span>
                     <span class="badge bg-${getRiskBadgeColor(threat.risk_level)}">${threat.risk_level}</span>
                 </div>
                 <div class="btn-group w-100" role="group">
@@ -254,24 +254,53 @@ function removeThreatFromList(threatId) {
     }
 }
 
-// Update statistics
+// Server time of the last threat sync; syncs only download threats changed since then
+let lastThreatSync = null;
+
+// Start delta syncing from now; the page already shows the current threats
+function primeThreatSync() {
+    return fetch('/api/v1/threats/?fields=id&limit=1')
+    .then(response => response.json())
+    .then(data => { lastThreatSync = data.server_time; })
+    .catch(error => console.error('Error starting threat sync:', error));
+}
+
+// Update statistics and pull in threats changed since the last sync
 function updateStats() {
-    fetch('/api/threats/')
+    if (!lastThreatSync) {
+        primeThreatSync().then(() => lastThreatSync && updateStats());
+        return;
+    }
+    syncThreats(lastThreatSync, null);
+}
+
+function syncThreats(since, cursor) {
+    const params = new URLSearchParams({
+        fields: 'id,name,slug,threat_type,risk_level,description,created_at',
+        updated_since: since
+    });
+    if (cursor) params.set('cursor', cursor);
+
+    fetch(`/api/v1/threats/?${params}`)
     .then(response => response.json())
     .then(data => {
-        const threats = data.threats;
-        const totalThreats = threats.length;
-        const pestCount = threats.filter(t => t.threat_type === 'pest').length;
-        const diseaseCount = threats.filter(t => t.threat_type === 'disease').length;
-        
+        data.results
+            .filter(threat => !document.querySelector(`[data-threat-id="${threat.id}"]`))
+            .forEach(addThreatToList);
+        if (data.next_cursor) {
+            syncThreats(since, data.next_cursor);
+            return;
+        }
+        lastThreatSync = data.server_time;
+
         // Update stat cards
         const totalElement = document.getElementById('total-threats-count');
         const pestElement = document.getElementById('pest-count');
         const diseaseElement = document.getElementById('disease-count');
         
-        if (totalElement) totalElement.textContent = totalThreats;
-        if (pestElement) pestElement.textContent = pestCount;
-        if (diseaseElement) diseaseElement.textContent = diseaseCount;
+        if (totalElement) totalElement.textContent = data.counts.total;
+        if (pestElement) pestElement.textContent = data.counts.pest;
+        if (diseaseElement) diseaseElement.textContent = data.counts.disease;
     })
     .catch(error => console.error('Error updating stats:', error));
 }
@@ -314,6 +343,11 @@ document.addEventListener('DOMContentLoaded', function() {
     // Setup real-time search
     setupRealTimeSearch();
     
+    // Track threat changes from here on
+    if (document.getElementById('threats-list')) {
+        primeThreatSync();
+    }
+    
     // Add CSS animations
     const style = document.createElement('style');
     style.textContent = `
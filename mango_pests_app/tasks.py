@@ -0,0 +1,98 @@
+# tasks.py - Work run on the background job queue; registered on import by apps.ready
+
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .alerts import dispatch_pending
+from .catalog import invalidate_catalog
+from .exports import EXPORT_FORMATS, export_chunks, history_queryset
+from .images import derivatives_for_field
+from .inspections import record_session_inspections
+from .jobs import task
+from .models import (
+    Grower, GrowerSurveillanceStats, MangoThreat, SurveillanceMonthlyRollup, SurveillancePlan, SurveillanceRecord,
+)
+
+
+@task('record_inspections')
+def record_inspections(record_id, plant_parts, threat_ids):
+    """Tree inspections for a session saved through the record form"""
+    record = SurveillanceRecord.objects.select_related('location').filter(pk=record_id).first()
+    if record is None:
+        # Deleted before the job ran
+        return {'inspections': 0, 'threats': []}
+    return record_session_inspections(record, plant_parts, threat_ids)
+
+
+@task('build_image_derivatives')
+def build_image_derivatives(threat_id, image):
+    """Resized WebP/JPEG copies of a threat's new upload (manage.py build_image_derivatives backfills)"""
+    # Skipped when the threat was deleted or its image replaced, which queues a job of its own
+    threat = MangoThreat.objects.filter(pk=threat_id, image=image).first()
+    if threat is None:
+        return {'widths': []}
+    try:
+        manifest = derivatives_for_field(threat.image)
+    finally:
+        threat.image.close()
+    # update() keeps this from re-running save(); bumping updated_at refreshes page ETags
+    MangoThreat.objects.filter(pk=threat_id, image=image).update(image_variants=manifest, updated_at=timezone.now())
+    invalidate_catalog()
+    return {'widths': [width for width, name in manifest.get('variants', {}).get('jpeg', [])]}
+
+
+@task('refresh_plan_efforts')
+def refresh_plan_efforts(grower_id):
+    return {'plans': SurveillancePlan.refresh_efforts(grower_id)}
+
+
+@task('rebuild_statistics')
+def rebuild_statistics(grower_id):
+    """Recompute a grower's stats row and monthly rollups from scratch"""
+    grower = Grower.objects.filter(pk=grower_id).first()
+    if grower is None:
+        return {'records': 0, 'inspections': 0}
+    stats = GrowerSurveillanceStats.rebuild_for_grower(grower)
+    SurveillanceMonthlyRollup.rebuild_for_grower(grower.pk)
+    return {'records': stats.total_records, 'inspections': stats.total_inspections}
+
+
+@task('export_history', atomic=False, lock_timeout=timedelta(hours=6))
+def export_history(grower_id, params, export_format):
+    """Write a history export to default storage; the job status links to the file.
+
+    Only reads, so no transaction; large exports get a long lock timeout
+    instead of being requeued while still running.
+    """
+    grower = Grower.objects.get(pk=grower_id)
+    chunks = export_chunks(history_queryset(grower, params), export_format)
+    filename = f"surveillance-history-{timezone.localdate():%Y%m%d}.{EXPORT_FORMATS[export_format][1]}"
+    size = 0
+    with tempfile.TemporaryFile() as output:
+        for chunk in chunks:
+            output.write(chunk)
+            size += len(chunk)
+        output.seek(0)
+        name = default_storage.save(f"exports/{grower_id}/{uuid.uuid4().hex}/{filename}", File(output))
+    return {'file': name, 'filename': filename, 'bytes': size}
+
+
+@task('dispatch_outbreak_alerts', atomic=False)
+def dispatch_outbreak_alerts():
+    """Send digests for every pending outbreak event.
+
+    Each dispatch_pending batch commits on its own, so digests already sent
+    stay recorded if a later batch fails.
+    """
+    events = digests = 0
+    while True:
+        handled, sent = dispatch_pending()
+        events += handled
+        digests += sent
+        if not handled:
+            return {'events': events, 'digests': digests}
@@ -1,3 +1,1435 @@
-from django.test import TestCase
+import csv
+import gzip
+import importlib.util
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock, skipIf, skipUnless
+from decimal import Decimal
+from io import StringIO
+from itertools import product
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone as dj_timezone
+from PIL import Image
+
+from . import alerts, analytics, benchmarks, catalog, exports, jobs, routes, spatial
+from .effort import location_tree_minutes
+from .inspections import bulk_create_tree_inspections, summarize_record_inspections
+from .profiling import request_stats
+from .search import ThreatSearchResults, repair_search_index
+from .models import (
+    BackgroundJob, Grower, GrowerSurveillanceStats, Location, MangoThreat, MangoTree, OutbreakEvent, OutbreakNotification,
+    PlantPart, SurveillanceMonthlyRollup, SurveillancePlan, SurveillanceRecord, TreeInspection
+)
+
+
+class SurveillanceTestMixin:
+    """Shared fixtures for a grower with one location"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='grower', password='mango-pass-123')
+        self.grower = Grower.objects.create(user=self.user, farm_name='Test Farm')
+        self.location = Location.objects.create(
+            name='Block A', address='1 Orchard Road', grower=self.grower, area_hectares=2
+        )
+        self.leaves = PlantPart.objects.create(name='Leaves', description='Leaf inspection', surveillance_priority=5)
+        self.fruit = PlantPart.objects.create(name='Fruit', description='Fruit inspection', surveillance_priority=5)
+        self.fruit_fly = MangoThreat.objects.create(
+            name='Fruit Fly', description='Larvae in fruit', details='Internal rot',
+            threat_type='pest', risk_level='high'
+        )
+        self.scale = MangoThreat.objects.create(
+            name='Mango Scale', description='Sap-sucking pest', details='Found on bark',
+            threat_type='pest', risk_level='moderate'
+        )
+
+    def create_trees(self, count, location=None, prefix='T'):
+        location = location or self.location
+        return [
+            MangoTree.objects.create(
+                location=location, tree_id=f'{prefix}-{location.pk}-{i}', age=(i % 20) + 1,
+                height_meters=1 + (i % 5), health_status=['excellent', 'good', 'fair', 'poor'][i % 4]
+            )
+            for i in range(count)
+        ]
+
+    def create_record(self, location=None, **kwargs):
+        return SurveillanceRecord.objects.create(
+            grower=self.grower, location=location or self.location, **kwargs
+        )
+
+
+class BulkInspectionWriterTests(SurveillanceTestMixin, TestCase):
+
+    def write_session(self, tree_count):
+        trees = self.create_trees(tree_count, prefix=f'S{tree_count}')
+        record = self.create_record()
+        with CaptureQueriesContext(connection) as queries:
+            bulk_create_tree_inspections(
+                record, trees,
+                plant_parts=[self.leaves, self.fruit],
+                threats=[self.fruit_fly, self.scale],
+                severity_level='high', action_required=True,
+            )
+        return record, len(queries)
+
+    def test_query_count_does_not_grow_with_tree_count(self):
+        _, small_session_queries = self.write_session(5)
+        _, large_session_queries = self.write_session(60)
+        self.assertEqual(small_session_queries, large_session_queries)
+
+    def test_links_every_inspection_to_parts_and_threats(self):
+        record, _ = self.write_session(20)
+        inspections = TreeInspection.objects.filter(surveillance_record=record)
+        self.assertEqual(inspections.count(), 20)
+        self.assertEqual(
+            TreeInspection.plant_parts_checked.through.objects.filter(treeinspection__surveillance_record=record).count(),
+            40
+        )
+        self.assertEqual(
+            TreeInspection.threats_found.through.objects.filter(treeinspection__surveillance_record=record).count(),
+            40
+        )
+        self.assertFalse(inspections.exclude(severity_level='high').exists())
+
+    def test_record_create_view_uses_batched_writer(self):
+        self.create_trees(30)
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('surveillance_record_create'), {
+            'location': self.location.pk,
+            'date': '2025-06-01',
+            'plant_parts': ['Leaves'],
+            'threats_found': [self.fruit_fly.pk],
+        })
+        record = SurveillanceRecord.objects.get(grower=self.grower)
+        job = BackgroundJob.objects.get(task='record_inspections')
+        self.assertRedirects(response, reverse('surveillance_record_detail', kwargs={'pk': record.pk}) + f'?job={job.pk}',
+                             fetch_redirect_response=False)
+        inspections = TreeInspection.objects.filter(surveillance_record=record)
+        self.assertFalse(inspections.exists())
+        # Nothing is written yet, so the page says so instead of summarising the trees
+        page = self.client.get(response.url)
+        self.assertContains(page, 'Inspections for 30 trees are being saved in the background')
+        self.assertContains(page, 'Saving tree inspections')
+
+        self.assertEqual(jobs.work('test-worker', burst=True), 1)
+        self.assertEqual(inspections.count(), 30)
+        self.assertEqual(inspections.filter(severity_level='high', action_required=True).count(), 30)
+        self.assertEqual(inspections.filter(threats_found=self.fruit_fly).count(), 30)
+
+
+class EffortEngineTests(SurveillanceTestMixin, TestCase):
+
+    def test_grouped_minutes_match_per_tree_method(self):
+        heights = [None, 0, Decimal('1.9'), 2, 4, Decimal('4.1'), Decimal('7.5')]
+        healths = ['excellent', 'good', 'fair', 'poor']
+        second_block = Location.objects.create(name='Block B', address='2 Orchard Road', grower=self.grower)
+        trees = []
+        for i, (height, health, age) in enumerate(product(heights, healths, [1, 5, 10, 20])):
+            location = self.location if i % 2 else second_block
+            trees.append(MangoTree.objects.create(
+                location=location, tree_id=f'E-{i}', age=age, height_meters=height, health_status=health
+            ))
+
+        effort = location_tree_minutes(Location.objects.filter(grower=self.grower))
+
+        for location in (self.location, second_block):
+            location_trees = [tree for tree in trees if tree.location_id == location.pk]
+            expected = sum(Decimal(str(tree.calculate_surveillance_time_minutes())) for tree in location_trees)
+            self.assertEqual(effort[location.pk]['tree_count'], len(location_trees))
+            self.assertEqual(effort[location.pk]['minutes'], expected)
+
+    def test_calculator_query_count_does_not_grow_with_tree_count(self):
+        self.client.force_login(self.user)
+        self.create_trees(5)
+        self.client.get(reverse('surveillance_calculator'))  # warm up lazily built rows
+        with CaptureQueriesContext(connection) as small_farm:
+            self.client.get(reverse('surveillance_calculator'))
+        self.create_trees(100, prefix='More')
+        with CaptureQueriesContext(connection) as large_farm:
+            response = self.client.get(reverse('surveillance_calculator'))
+        self.assertEqual(len(small_farm), len(large_farm))
+        self.assertEqual(response.context['total_trees'], 105)
+
+
+class PlanEffortCacheTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.second_block = Location.objects.create(name='Block B', address='2 Orchard Road', grower=self.grower)
+        self.trees = self.create_trees(6) + self.create_trees(4, location=self.second_block)
+        self.both = SurveillancePlan.objects.create(grower=self.grower, name='Both blocks')
+        self.both.locations.add(self.location, self.second_block)
+        self.block_b = SurveillancePlan.objects.create(grower=self.grower, name='Block B only')
+        self.block_b.locations.add(self.second_block)
+
+    def expected_hours(self, trees, blocks):
+        # No GPS in these fixtures, so travel is the flat 10 minutes per block
+        minutes = sum(Decimal(str(tree.calculate_surveillance_time_minutes())) for tree in trees)
+        return round((minutes * Decimal('1.2') + 10 * blocks) / 60, 2)
+
+    def test_reading_effort_never_writes(self):
+        with CaptureQueriesContext(connection) as dirty_read:
+            effort = self.both.calculate_surveillance_effort()
+        self.assertEqual(len(dirty_read), 2)  # grouped trees, plan locations
+        self.assertEqual((effort['tree_count'], effort['total_hours']), (10, self.expected_hours(self.trees, 2)))
+        self.assertTrue(SurveillancePlan.objects.get(pk=self.both.pk).effort_dirty)
+
+        SurveillancePlan.refresh_efforts(self.grower.pk)
+        plan = SurveillancePlan.objects.get(pk=self.both.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(plan.calculate_surveillance_effort(), effort)
+
+    def test_refresh_prices_all_dirty_plans_in_two_queries(self):
+        with self.assertNumQueries(4):  # dirty plans, grouped trees, plan locations, bulk update
+            self.assertEqual(SurveillancePlan.refresh_efforts(self.grower.pk), 2)
+        self.block_b.refresh_from_db()
+        self.assertEqual(self.block_b.estimated_tree_count, 4)
+        self.assertEqual(self.block_b.total_estimated_hours, self.expected_hours(self.trees[6:], 1))
+        self.assertFalse(self.block_b.effort_dirty)
+
+    def test_tree_and_location_changes_mark_plans_dirty(self):
+        def dirty():
+            return set(SurveillancePlan.objects.filter(effort_dirty=True).values_list('name', flat=True))
+
+        SurveillancePlan.refresh_efforts(self.grower.pk)
+        self.trees[0].health_status = 'poor'
+        self.trees[0].save()
+        self.assertEqual(dirty(), {'Both blocks'})
+
+        SurveillancePlan.refresh_efforts(self.grower.pk)
+        self.create_trees(1, location=self.second_block, prefix='New')
+        self.assertEqual(dirty(), {'Both blocks', 'Block B only'})
+
+        SurveillancePlan.refresh_efforts(self.grower.pk)
+        self.trees[0].location = self.second_block
+        self.trees[0].save()
+        self.assertEqual(dirty(), {'Both blocks', 'Block B only'})
+
+        SurveillancePlan.refresh_efforts(self.grower.pk)
+        self.second_block.delete()
+        self.assertEqual(dirty(), {'Both blocks', 'Block B only'})
+        SurveillancePlan.refresh_efforts(self.grower.pk)
+        self.block_b.refresh_from_db()
+        self.assertEqual(self.block_b.estimated_tree_count, 0)
+
+
+class RoutePlannerTests(SurveillanceTestMixin, TestCase):
+
+    def test_route_visits_grid_blocks_along_the_shortest_path(self):
+        # A 5 x 4 grid about 1.1 km apart, shuffled; the best open path is 19 hops
+        points = [(-12.40 - row * 0.01, 130.90 + col * 0.01) for row in range(5) for col in range(4)]
+        shuffled = [points[i] for i in (7, 19, 0, 12, 3, 15, 8, 1, 18, 10, 5, 14, 2, 17, 9, 4, 13, 6, 16, 11)]
+        dist = routes.haversine_matrix([lat for lat, _ in shuffled], [lon for _, lon in shuffled])
+        order = routes.shortest_path_order(dist)
+        self.assertEqual(sorted(order), list(range(20)))
+        self.assertLess(routes.path_length(order, dist), 19 * 1.12)
+        # 0.01 degrees of latitude is about 1.112 km
+        self.assertAlmostEqual(routes.haversine_matrix([-12.40, -12.41], [130.90, 130.90])[0, 1], 1.112, 3)
+
+    def test_plan_travel_comes_from_the_route(self):
+        far = Location.objects.create(name='Far Block', address='3 Orchard Road', grower=self.grower,
+                                      gps_latitude=Decimal('-12.500000'), gps_longitude=Decimal('130.900000'))
+        Location.objects.filter(pk=self.location.pk).update(gps_latitude=Decimal('-12.400000'),
+                                                            gps_longitude=Decimal('130.900000'))
+        unmapped = Location.objects.create(name='Unmapped', address='4 Orchard Road', grower=self.grower)
+        plan = SurveillancePlan.objects.create(grower=self.grower, name='All blocks')
+        plan.locations.add(self.location, far, unmapped)
+
+        SurveillancePlan.refresh_efforts(self.grower.pk)
+        plan.refresh_from_db()
+        self.assertAlmostEqual(float(plan.route_distance_km), 11.12, 2)
+        # 11.12 km at 20 km/h plus the flat allowance for the block without GPS
+        self.assertEqual(plan.estimated_travel_minutes, Decimal('43.4'))
+        self.assertEqual([location.name for location in plan.route()][-1], 'Unmapped')
+
+    def test_calculator_travel_uses_the_route(self):
+        self.create_trees(2)
+        Location.objects.filter(pk=self.location.pk).update(gps_latitude=Decimal('-12.4'), gps_longitude=Decimal('130.9'))
+        other = Location.objects.create(name='Block B', address='2 Orchard Road', grower=self.grower,
+                                        gps_latitude=Decimal('-12.4'), gps_longitude=Decimal('130.91'))
+        self.create_trees(2, location=other)
+        self.client.force_login(self.user)
+        calculation = self.client.get(reverse('surveillance_calculator')).context['surveillance_calculation']
+        self.assertEqual(calculation['route_distance_km'], 1.1)
+        self.assertEqual(calculation['travel_time_minutes'], 3)
+
+
+class GrowerSurveillanceStatsTests(SurveillanceTestMixin, TestCase):
+
+    def assert_stats_match_source(self):
+        stats = GrowerSurveillanceStats.objects.get(grower=self.grower)
+        inspections = TreeInspection.objects.filter(surveillance_record__grower=self.grower)
+        records = SurveillanceRecord.objects.filter(grower=self.grower)
+        self.assertEqual(stats.total_records, records.count())
+        self.assertEqual(stats.total_inspections, inspections.count())
+        self.assertEqual(
+            stats.inspections_with_threats,
+            inspections.filter(threats_found__isnull=False).distinct().count()
+        )
+        self.assertEqual(stats.action_required_count, inspections.filter(action_required=True).count())
+        return stats
+
+    def test_stats_follow_record_and_inspection_changes(self):
+        trees = self.create_trees(10)
+        first = self.create_record(date=date(2025, 1, 5), total_time_minutes=30, trees_surveyed_count=10)
+        bulk_create_tree_inspections(first, trees, threats=[self.fruit_fly], action_required=True)
+        second = self.create_record(date=date(2025, 3, 1), total_time_minutes=90, trees_surveyed_count=10)
+        bulk_create_tree_inspections(second, trees)
+
+        inspection = TreeInspection.objects.create(surveillance_record=second, tree=trees[0])
+        inspection.threats_found.add(self.scale)
+
+        stats = self.assert_stats_match_source()
+        self.assertEqual(stats.earliest_date, date(2025, 1, 5))
+        self.assertEqual(stats.latest_date, date(2025, 3, 1))
+        self.assertEqual(stats.avg_time_minutes, 60)
+        self.assertEqual(stats.total_trees_surveyed, 20)
+
+        first.delete()
+        stats = self.assert_stats_match_source()
+        self.assertEqual(stats.earliest_date, date(2025, 3, 1))
+        self.assertEqual(stats.detection_rate, round(1 / 11 * 100, 1))
+
+    def test_rebuild_command_recreates_rows(self):
+        record = self.create_record()
+        bulk_create_tree_inspections(record, self.create_trees(5))
+        GrowerSurveillanceStats.objects.all().delete()
+
+        call_command('rebuild_surveillance_stats', stdout=StringIO())
+
+        stats = self.assert_stats_match_source()
+        self.assertEqual(stats.total_inspections, 5)
+
+    def test_history_statistics_read_a_single_row(self):
+        record = self.create_record(total_time_minutes=45, trees_surveyed_count=5)
+        bulk_create_tree_inspections(record, self.create_trees(5), threats=[self.scale])
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('surveillance_history'))
+        self.assertEqual(response.context['statistics']['total_records'], 1)
+        self.assertEqual(response.context['statistics']['threat_detection_rate'], 100)
+
+
+class MonthlyRollupTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.block_b = Location.objects.create(name='Block B', address='2 Orchard Road', grower=self.grower)
+        self.trees_a = self.create_trees(4)
+        self.trees_b = self.create_trees(3, location=self.block_b)
+
+    def rollup(self, month, location=None):
+        return SurveillanceMonthlyRollup.objects.get(grower=self.grower, location=location, month=month)
+
+    def test_rollups_track_sessions_per_location_and_grower(self):
+        march = date(2025, 3, 1)
+        record_a = self.create_record(date=date(2025, 3, 4), trees_surveyed_count=4, total_time_minutes=40)
+        bulk_create_tree_inspections(record_a, self.trees_a, threats=[self.fruit_fly])
+        record_b = self.create_record(location=self.block_b, date=date(2025, 3, 20), trees_surveyed_count=3)
+        bulk_create_tree_inspections(record_b, self.trees_b, threats=[self.fruit_fly, self.scale])
+
+        grower_wide = self.rollup(march)
+        self.assertEqual(grower_wide.session_count, 2)
+        self.assertEqual(grower_wide.trees_surveyed, 7)
+        self.assertEqual(grower_wide.inspection_count, 7)
+        self.assertEqual(grower_wide.distinct_threats, 2)
+        self.assertEqual(grower_wide.avg_time, 40)
+        self.assertEqual(self.rollup(march, self.location).distinct_threats, 1)
+
+        # Moving a session to another month updates both buckets
+        record_b.date = date(2025, 4, 2)
+        record_b.save()
+        self.assertEqual(self.rollup(march).distinct_threats, 1)
+        self.assertEqual(self.rollup(date(2025, 4, 1), self.block_b).session_count, 1)
+        self.assertFalse(
+            SurveillanceMonthlyRollup.objects.filter(location=self.block_b, month=march).exists()
+        )
+
+        record_a.delete()
+        self.assertFalse(SurveillanceMonthlyRollup.objects.filter(month=march).exists())
+
+    def test_rebuild_command_matches_incremental_rows(self):
+        for day in (date(2025, 1, 3), date(2025, 1, 17), date(2025, 2, 2)):
+            record = self.create_record(date=day, trees_surveyed_count=4)
+            bulk_create_tree_inspections(record, self.trees_a, threats=[self.scale])
+        fields = ('location_id', 'month', 'session_count', 'trees_surveyed', 'inspection_count', 'distinct_threats')
+        incremental = list(SurveillanceMonthlyRollup.objects.order_by('month', 'location_id').values_list(*fields))
+
+        SurveillanceMonthlyRollup.objects.all().delete()
+        call_command('rebuild_monthly_rollups', stdout=StringIO())
+
+        rebuilt = list(SurveillanceMonthlyRollup.objects.order_by('month', 'location_id').values_list(*fields))
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(len(rebuilt), 4)
+
+
+class ThreatCountDenormalizationTests(SurveillanceTestMixin, TestCase):
+
+    def assert_counts_match_links(self):
+        for inspection in TreeInspection.objects.all():
+            linked = inspection.threats_found.count()
+            self.assertEqual(inspection.threat_count, linked)
+            self.assertEqual(inspection.has_threats, linked > 0)
+
+    def test_counts_follow_threat_links(self):
+        trees = self.create_trees(3)
+        record = self.create_record(trees_surveyed_count=3)
+        inspections = bulk_create_tree_inspections(record, trees, threats=[self.fruit_fly, self.scale])
+        self.assert_counts_match_links()
+
+        inspection = TreeInspection.objects.get(pk=inspections[0].pk)
+        inspection.threats_found.remove(self.fruit_fly)
+        self.assert_counts_match_links()
+        inspection.threats_found.clear()
+        self.assert_counts_match_links()
+        self.assertEqual(
+            GrowerSurveillanceStats.objects.get(grower=self.grower).inspections_with_threats, 2
+        )
+
+        # Reverse side: changes made from the threat
+        self.scale.treeinspection_set.clear()
+        self.assert_counts_match_links()
+        self.fruit_fly.treeinspection_set.add(inspection)
+        self.assert_counts_match_links()
+
+        self.fruit_fly.delete()
+        self.assert_counts_match_links()
+        self.assertFalse(TreeInspection.objects.filter(has_threats=True).exists())
+        self.assertEqual(
+            GrowerSurveillanceStats.objects.get(grower=self.grower).inspections_with_threats, 0
+        )
+
+
+class GenerateLoadDatasetTests(TestCase):
+
+    def generate(self, prefix):
+        call_command(
+            'generate_load_dataset', growers=2, locations=2, trees=5, years=0.5,
+            end_date=date(2025, 6, 30), seed=7, prefix=prefix, batch_size=40, stdout=StringIO(),
+        )
+        return TreeInspection.objects.filter(tree__tree_id__startswith=prefix.upper())
+
+    def test_generates_requested_volume_deterministically(self):
+        first = self.generate('loada')
+        # 2 growers x 2 locations x 5 trees x 13 fortnightly sessions
+        self.assertEqual(first.count(), 260)
+        self.assertEqual(SurveillanceRecord.objects.filter(grower__user__username__startswith='loada').count(), 52)
+        self.assertTrue(first.filter(has_threats=True).exists())
+
+        second = self.generate('loadb')
+        self.assertEqual(
+            list(first.order_by('pk').values_list('severity_level', 'threat_count')),
+            list(second.order_by('pk').values_list('severity_level', 'threat_count')),
+        )
+
+        stats = GrowerSurveillanceStats.objects.get(grower__user__username='loada_grower_1')
+        self.assertEqual(stats.total_inspections, 130)
+
+
+class PageBenchmarkTests(TestCase):
+
+    def test_benchmarks_cover_app_urls_and_flag_regressions(self):
+        user = benchmarks.seed_dataset({'growers': 1, 'locations': 1, 'trees': 3, 'years': 0.2})
+        results = benchmarks.run_benchmarks(user, repeat=1)
+
+        self.assertNotIn('logout', results)
+        for name in ('surveillance_calculator', 'surveillance_history', 'surveillance_record_detail', 'analytics'):
+            self.assertEqual(results[name]['status'], 200)
+            self.assertGreater(results[name]['queries'], 0)
+
+        self.assertEqual(benchmarks.find_regressions(results, results), [])
+        baseline = {name: dict(result) for name, result in results.items()}
+        baseline['surveillance_history']['queries'] -= 1
+        baseline['analytics']['wall_ms'] = results['analytics']['wall_ms'] / 10 - 100
+        regressions = benchmarks.find_regressions(results, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('analytics:'))
+
+
+@override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_SLOW_MS=0)
+class RequestProfilingMiddlewareTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        request_stats.clear()
+        self.addCleanup(request_stats.clear)
+        record = self.create_record(trees_surveyed_count=3)
+        bulk_create_tree_inspections(record, self.create_trees(3), threats=[self.scale])
+
+    def test_profiles_requests_and_logs_slow_ones(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('mango_pests_app.profiling', 'WARNING') as logs:
+            response = self.client.get(reverse('surveillance_history'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('(surveillance_history)', logs.output[0])
+
+        # Stats are staff-only
+        with self.settings(REQUEST_PROFILING_SLOW_MS=60_000):
+            self.assertEqual(self.client.get(reverse('request_profile_stats')).status_code, 403)
+            self.user.is_staff = True
+            self.user.save()
+            stats = self.client.get(reverse('request_profile_stats')).json()['views']
+        history = stats['surveillance_history']
+        self.assertEqual(history['requests'], 1)
+        self.assertGreater(history['queries']['p50'], 0)
+        self.assertGreater(history['template_ms']['max'], 0)
+
+        # Resetting needs a POST with a CSRF token; a GET never clears
+        stats_url = reverse('request_profile_stats')
+        self.client.get(stats_url, {'reset': 1})
+        self.assertIn('surveillance_history', self.client.get(stats_url).json()['views'])
+        csrf_client = Client(enforce_csrf_checks=True)
+        csrf_client.force_login(self.user)
+        self.assertEqual(csrf_client.post(stats_url).status_code, 403)
+        self.assertEqual(self.client.post(stats_url).json()['views'], {})
+
+
+class RecordSummaryTests(SurveillanceTestMixin, TestCase):
+
+    def create_mixed_record(self, tree_count):
+        record = self.create_record(trees_surveyed_count=tree_count)
+        trees = self.create_trees(tree_count, prefix=f'R{tree_count}-')
+        third = tree_count // 3
+        bulk_create_tree_inspections(record, trees[:third], plant_parts=[self.leaves], threats=[self.scale],
+                                     action_required=True)
+        bulk_create_tree_inspections(record, trees[third:2 * third], plant_parts=[self.leaves, self.fruit],
+                                     threats=[self.fruit_fly, self.scale])
+        bulk_create_tree_inspections(record, trees[2 * third:], plant_parts=[self.fruit])
+        return record
+
+    def test_summaries_match_per_inspection_walk(self):
+        record = self.create_mixed_record(9)
+        summary = summarize_record_inspections(record)
+
+        self.assertEqual(summary['total_inspections'], 9)
+        self.assertEqual(summary['threats_found_count'], 6)
+        self.assertEqual(summary['action_required_count'], 3)
+        self.assertEqual(summary['plant_parts_summary'], {
+            'Fruit': {'count': 6, 'threats': {'Fruit Fly', 'Mango Scale'}, 'priority': 5},
+            'Leaves': {'count': 6, 'threats': {'Fruit Fly', 'Mango Scale'}, 'priority': 5},
+        })
+        self.assertEqual(summary['threats_summary']['Mango Scale']['count'], 6)
+        self.assertEqual(summary['threats_summary']['Mango Scale']['affected_parts'], {'Leaves', 'Fruit'})
+        self.assertEqual(summary['threats_summary']['Fruit Fly']['count'], 3)
+        self.assertEqual(summary['threats_summary']['Fruit Fly']['affected_parts'], {'Leaves', 'Fruit'})
+
+    def test_detail_page_query_count_does_not_grow_with_inspections(self):
+        self.client.force_login(self.user)
+        query_counts = []
+        for tree_count in (6, 60):
+            record = self.create_mixed_record(tree_count)
+            url = reverse('surveillance_record_detail', kwargs={'pk': record.pk})
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_detail_page_lists_inspections_a_page_at_a_time(self):
+        self.client.force_login(self.user)
+        record = self.create_mixed_record(9)
+        url = reverse('surveillance_record_detail', kwargs={'pk': record.pk})
+        with mock.patch('mango_pests_app.views.INSPECTIONS_PER_PAGE', 4):
+            first = self.client.get(url)
+            last = self.client.get(url, {'page': 3})
+        self.assertEqual(len(first.context['inspections']), 4)
+        self.assertContains(first, 'Trees 1-4 of 9')
+        self.assertEqual(list(last.context['inspections']), [record.tree_inspections.order_by('pk').last()])
+        # Counters still cover the whole session
+        self.assertEqual(last.context['total_inspections'], 9)
+
+
+class CatalogCacheTests(SurveillanceTestMixin, TestCase):
+
+    def test_snapshot_is_reused_until_catalog_changes(self):
+        snapshot = catalog.get_catalog()
+        self.assertEqual([threat.name for threat in snapshot.threats], ['Fruit Fly', 'Mango Scale'])
+        self.assertEqual(snapshot.threat_counts, {'total': 2, 'pest': 2, 'disease': 0})
+        with self.assertNumQueries(0):
+            self.assertIs(catalog.get_catalog(), snapshot)
+
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('api_threats'), {
+            'name': 'Anthracnose', 'description': 'Dark spots on leaves', 'details': 'Fungal disease',
+            'threat_type': 'disease', 'risk_level': 'high',
+        })
+        self.assertTrue(response.json()['success'], response.json())
+        refreshed = catalog.get_catalog()
+        self.assertEqual(refreshed.threat_counts['disease'], 1)
+        self.assertIn('Anthracnose', [threat['name'] for threat in self.client.get(reverse('api_threats')).json()['threats']])
+
+        self.leaves.delete()
+        self.assertEqual([part.name for part in catalog.get_catalog().plant_parts], ['Fruit'])
+
+    def test_version_published_by_another_process_triggers_rebuild(self):
+        snapshot = catalog.get_catalog()
+        # Simulate another worker changing the catalog behind our back
+        MangoThreat.objects.filter(pk=self.scale.pk).update(risk_level='high')
+        self.assertIs(catalog.get_catalog(), snapshot)
+        cache.set(catalog.CATALOG_VERSION_KEY, 'changed-elsewhere', timeout=None)
+        self.assertEqual(len(catalog.get_catalog().high_risk_threats), 2)
+
+    def test_rolled_back_change_is_never_published(self):
+        version = catalog.current_version()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            MangoThreat.objects.create(
+                name='Phantom Borer', description='Never committed', details='Rolled back', threat_type='pest'
+            )
+            # The transaction sees its own threat; nobody else does
+            self.assertIn('phantom-borer', catalog.get_catalog().threats_by_slug)
+            self.assertEqual(catalog.current_version(), version)
+            raise RuntimeError("Form failed after the save")
+        self.assertEqual(catalog.current_version(), version)
+        self.assertNotIn('phantom-borer', catalog.get_catalog().threats_by_slug)
+
+    def test_home_page_reads_threat_counts_from_snapshot(self):
+        catalog.get_catalog()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['total_threats'], 2)
+        self.assertFalse([q for q in queries.captured_queries if 'mango_pests_app_mangothreat' in q['sql']])
+
+
+class ThreatSearchTests(TestCase):
+
+    def setUp(self):
+        self.weevil = MangoThreat.objects.create(
+            name='Mango Seed Weevil', description='Larvae tunnel through the seed',
+            details='A quarantine pest of mango seeds', threat_type='pest', risk_level='high',
+        )
+        self.anthracnose = MangoThreat.objects.create(
+            name='Anthracnose', description='Fungal leaf and fruit spots',
+            details='Spread by rain splash; weevil damage lets it in', threat_type='disease',
+        )
+
+    def names(self, query, **kwargs):
+        results = ThreatSearchResults(query, **kwargs)
+        return [threat.name for threat in results[:results.count()]]
+
+    def test_ranked_prefix_search(self):
+        # A name hit outranks a hit in the details
+        self.assertEqual(self.names('weev'), ['Mango Seed Weevil', 'Anthracnose'])
+        self.assertEqual(self.names('weevil', threat_type='disease'), ['Anthracnose'])
+        self.assertEqual(self.names('fung spot'), ['Anthracnose'])
+        self.assertEqual(self.names('"weevil'), ['Mango Seed Weevil', 'Anthracnose'])
+        self.assertEqual(self.names('weevil', sort='name_asc'), ['Anthracnose', 'Mango Seed Weevil'])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.weevil.description = 'Burrows into the kernel'
+        self.weevil.save()
+        self.assertEqual(self.names('kernel'), ['Mango Seed Weevil'])
+        self.assertEqual(self.names('tunnel'), [])
+
+        MangoThreat.objects.filter(pk=self.anthracnose.pk).update(details='Blossom blight')
+        self.assertEqual(self.names('blossom'), ['Anthracnose'])
+
+        self.weevil.delete()
+        self.assertEqual(self.names('kernel'), [])
+
+    def test_repair_reinstalls_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER mango_pests_app_threat_search_au')
+        MangoThreat.objects.filter(pk=self.weevil.pk).update(details='Kernel borer')
+        repair_search_index()
+        self.assertEqual(self.names('borer'), ['Mango Seed Weevil'])
+
+    def test_list_view_paginates_in_database(self):
+        MangoThreat.objects.bulk_create([
+            MangoThreat(name=f'Leaf Miner {i:02}', slug=f'leaf-miner-{i:02}', description='Leaf mining larvae',
+                        details='Tunnels in leaves', threat_type='pest')
+            for i in range(25)
+        ])
+        response = self.client.get(reverse('threat_list'), {'q': 'leaf', 'page': 3})
+        self.assertEqual(response.context['total_results'], 26)
+        self.assertEqual(response.context['pest_count'], 25)
+        self.assertEqual(response.context['sort_option'], 'relevance')
+        self.assertEqual(len(response.context['page_obj']), 6)
+        self.assertContains(response, 'Leaf Miner')
+
+
+class ThreatReadAPITests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        MangoThreat.objects.bulk_create([
+            MangoThreat(name=f'Borer {i}', slug=f'borer-{i}', description='Bores', details='Shoots',
+                        threat_type='pest')
+            for i in range(5)
+        ])
+        self.client.force_login(self.user)
+
+    def test_cursor_pages_cover_catalog_in_name_order(self):
+        names, cursor, pages = [], None, 0
+        while True:
+            params = {'limit': 3, 'fields': 'name'}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(reverse('api_v1_threats'), params).json()
+            self.assertEqual(set().union(*[row.keys() for row in data['results']]), {'name'})
+            names += [row['name'] for row in data['results']]
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(names, sorted(MangoThreat.objects.values_list('name', flat=True)))
+
+    def test_updated_since_returns_only_changes(self):
+        first = self.client.get(reverse('api_v1_threats')).json()
+        self.assertEqual(len(first['results']), 7)
+        self.assertEqual(first['counts']['total'], 7)
+
+        self.scale.risk_level = 'high'
+        self.scale.save()
+        delta = self.client.get(reverse('api_v1_threats'), {'updated_since': first['server_time']}).json()
+        self.assertEqual([row['slug'] for row in delta['results']], [self.scale.slug])
+        self.assertEqual(delta['results'][0]['risk_level'], 'high')
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({'fields': 'name,password'}, {'cursor': 'not-a-cursor'}, {'updated_since': 'yesterday'}):
+            response = self.client.get(reverse('api_v1_threats'), params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+
+class ConditionalGetTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.detail_url = reverse('threat_details', kwargs={'threat_name': self.fruit_fly.slug})
+
+    def test_detail_revalidates_until_threat_changes(self):
+        first = self.client.get(self.detail_url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('public', first['Cache-Control'])
+        self.assertIn('Last-Modified', first)
+
+        repeat = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.content, b'')
+        self.assertIn('public', repeat['Cache-Control'])
+
+        # Editing another threat leaves this page's validator alone
+        self.scale.risk_level = 'high'
+        self.scale.save()
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        self.fruit_fly.description = 'Maggots in ripening fruit'
+        self.fruit_fly.save()
+        changed = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertContains(changed, 'Maggots in ripening fruit')
+
+    def test_signed_in_pages_are_private_per_user(self):
+        anonymous = self.client.get(self.detail_url)
+        self.client.force_login(self.user)
+        signed_in = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=anonymous['ETag'])
+        self.assertEqual(signed_in.status_code, 200)
+        self.assertIn('private', signed_in['Cache-Control'])
+        self.assertIn('no-cache', signed_in['Cache-Control'])
+
+    def test_compare_and_api_follow_catalog_version(self):
+        self.client.force_login(self.user)
+        for url in (reverse('compare_threats'), reverse('api_v1_threats')):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200, url)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304, url)
+
+            # Deletions leave every remaining updated_at alone, so there is no Last-Modified to trust
+            self.assertNotIn('Last-Modified', first)
+            self.scale.delete()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200, url)
+            self.scale = MangoThreat.objects.create(
+                name='Mango Scale', description='Sap-sucking pest', details='Found on bark', threat_type='pest'
+            )
+
+    def test_missing_threat_is_still_404(self):
+        url = reverse('threat_details', kwargs={'threat_name': 'no-such-threat'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"anything"').status_code, 404)
+
+
+def png_bytes(width, height, mode='RGBA'):
+    buffer = io.BytesIO()
+    Image.new(mode, (width, height), (200, 120, 20, 128) if mode == 'RGBA' else (200, 120, 20)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ThreatImageDerivativeTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def create_threat(self, name, image):
+        return MangoThreat.objects.create(
+            name=name, description='Leaf spots', details='Spreads in rain', threat_type='disease', image=image
+        )
+
+    def built(self, threat):
+        """Run the derivative job queued by the upload and reload the threat"""
+        jobs.work('test-worker', burst=True)
+        threat.refresh_from_db()
+        return threat
+
+    def test_upload_builds_content_addressed_variants(self):
+        data = png_bytes(1200, 800)
+        threat = self.create_threat('Anthracnose', SimpleUploadedFile('leaf.png', data, 'image/png'))
+        # Saving only queues the work; the page shows the original until it runs
+        self.assertEqual(threat.image_variants, {})
+        self.assertEqual(threat.image_src, threat.image.url)
+        self.assertTrue(BackgroundJob.objects.filter(task='build_image_derivatives', status='queued').exists())
+
+        threat = self.built(threat)
+        variants = threat.image_variants['variants']
+        self.assertEqual([width for width, name in variants['webp']], [160, 480, 1024])
+        for width, name in variants['jpeg']:
+            with default_storage.open(name) as stored, Image.open(stored) as image:
+                self.assertEqual((image.format, image.width), ('JPEG', width))
+        self.assertTrue(threat.image_src.endswith('/480.jpg'))
+        self.assertIn(' 1024w', threat.image_webp_srcset)
+
+        # Same bytes, same files
+        twin = self.built(self.create_threat('Anthracnose Twin', SimpleUploadedFile('copy.png', data, 'image/png')))
+        self.assertEqual(twin.image_variants['variants'], variants)
+
+    def test_small_images_are_not_upscaled(self):
+        threat = self.built(self.create_threat('Sooty Mould', SimpleUploadedFile('small.jpg', png_bytes(300, 200, 'RGB'))))
+        self.assertEqual([width for width, name in threat.image_variants['variants']['jpeg']], [160, 300])
+
+    def test_backfill_command_builds_missing_derivatives(self):
+        name = default_storage.save('threat_images/existing.png', ContentFile(png_bytes(640, 480)))
+        threat = self.create_threat('Powdery Mildew', name)
+        broken = self.create_threat('Bacterial Black Spot', 'threat_images/missing.png')
+        self.assertEqual(threat.image_variants, {})
+
+        out = StringIO()
+        with self.assertLogs('mango_pests_app.images', 'WARNING'):
+            call_command('build_image_derivatives', stdout=out, stderr=StringIO())
+        self.assertIn('1 threat(s), 1 skipped', out.getvalue())
+        threat.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual([width for width, name in threat.image_variants['variants']['webp']], [160, 480, 640])
+        self.assertEqual(broken.image_variants, {})
+
+        response = self.client.get(reverse('threat_details', kwargs={'threat_name': threat.slug}))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, threat.image_src)
+
+
+class HistoryExportTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.trees = self.create_trees(6)
+        self.older = self.create_record(date=date(2025, 1, 5), notes='First walk')
+        bulk_create_tree_inspections(self.older, self.trees, plant_parts=[self.leaves, self.fruit],
+                                     threats=[self.fruit_fly], action_required=True)
+        self.newer = self.create_record(date=date(2025, 3, 1))
+        bulk_create_tree_inspections(self.newer, self.trees[:2], plant_parts=[self.leaves])
+        self.empty = self.create_record(date=date(2025, 2, 1), notes='Rained off')
+        self.client.force_login(self.user)
+
+    def export_csv(self, **params):
+        response = self.client.get(reverse('surveillance_history_export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_rows_are_flattened_per_inspection_newest_first(self):
+        rows = self.export_csv()
+        self.assertEqual(len(rows), 2 + 1 + 6)
+        self.assertEqual([row['date'] for row in rows[:3]], ['2025-03-01', '2025-03-01', '2025-02-01'])
+        self.assertEqual(rows[2]['notes'], 'Rained off')
+        self.assertEqual(rows[2]['inspection_id'], '')
+
+        first_walk = [row for row in rows if row['record_id'] == str(self.older.pk)]
+        self.assertEqual(len(first_walk), 6)
+        self.assertEqual(first_walk[0]['plant_parts_checked'], 'Fruit; Leaves')
+        self.assertEqual(first_walk[0]['threats_found'], 'Fruit Fly')
+        self.assertEqual(first_walk[0]['tree_id'], self.trees[0].tree_id)
+
+    def test_history_filters_apply(self):
+        rows = self.export_csv(date_from='2025-02-01', has_threats='1')
+        self.assertEqual(rows, [])
+        rows = self.export_csv(date_to='2025-02-15', has_threats='1')
+        self.assertEqual({row['record_id'] for row in rows}, {str(self.older.pk)})
+
+    def test_query_count_depends_on_chunks_not_rows(self):
+        catalog.get_catalog()
+
+        def count_queries(chunk_size):
+            records = exports.history_queryset(self.grower, {})
+            with CaptureQueriesContext(connection) as queries:
+                rows = list(exports.history_rows(records, chunk_size=chunk_size))
+            self.assertEqual(len(rows), 9)
+            return len(queries)
+
+        # records + inspections, then the two M2M lookups per chunk of inspections
+        self.assertEqual(count_queries(100), 2 + 2)
+        self.assertEqual(count_queries(3), 2 + 2 * 3)
+
+    def test_command_writes_csv_and_rejects_unknown_grower(self):
+        out = StringIO()
+        call_command('export_surveillance_history', self.user.username, '--location', str(self.location.pk), stdout=out)
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(out.getvalue())))), 9)
+        with self.assertRaises(CommandError):
+            call_command('export_surveillance_history', 'nobody', stdout=StringIO())
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), "pyarrow is not installed")
+    def test_parquet_round_trip(self):
+        import pyarrow.parquet as pq
+        response = self.client.get(reverse('surveillance_history_export'), {'format': 'parquet'})
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.num_rows, 9)
+        self.assertEqual(table.column_names, exports.COLUMNS)
+
+    @skipIf(importlib.util.find_spec('pyarrow'), "pyarrow is installed")
+    def test_parquet_without_pyarrow_is_a_clear_error(self):
+        response = self.client.get(reverse('surveillance_history_export'), {'format': 'parquet'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pyarrow', response.json()['error'])
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('surveillance_history_export'), {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrchardImportTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.existing = self.create_trees(1)[0]
+        self.client.force_login(self.user)
+
+    def upload(self, text, **data):
+        upload = SimpleUploadedFile('trees.csv', text.encode(), 'text/csv')
+        return self.client.post(reverse('tree_import'), {'file': upload, **data})
+
+    def test_valid_rows_are_bulk_created_and_rejects_reported(self):
+        text = (
+            "Tree ID,Age,Variety,Location,Location Address,Height Meters\n"
+            "A-1,2,Kensington Pride,Block A,,2.5\n"
+            "A-2,9,keitt,,,\n"
+            f"{self.existing.tree_id},4,kent,,,\n"
+            "A-1,5,kent,,,\n"
+            "A-3,old,mystery,,,\n"
+            "N-1,20,calypso,North Block,9 Ridge Road,\n"
+            "A-4,3,kent,,,nan\n"
+        )
+        response = self.upload(text, location=self.location.pk)
+        self.assertEqual(response.status_code, 302)
+
+        trees = {tree.tree_id: tree for tree in MangoTree.objects.filter(tree_id__in=['A-1', 'A-2', 'N-1'])}
+        self.assertEqual(len(trees), 3)
+        self.assertEqual((trees['A-1'].age_group, trees['A-1'].variety), ('young', 'kensington_pride'))
+        self.assertEqual(trees['A-2'].age_group, 'mature')
+        self.assertEqual(trees['A-2'].location, self.location)
+        self.assertEqual(trees['N-1'].location.name, 'North Block')
+        self.assertEqual(trees['N-1'].location.grower, self.grower)
+
+        page = self.client.get(response.url)
+        report = self.client.get(page.context['report_url'])
+        rows = list(csv.DictReader(io.StringIO(report.content.decode())))
+        self.assertEqual([row['row'] for row in rows], ['4', '5', '6', '8'])
+        self.assertIn('already exists', rows[0]['errors'])
+        self.assertIn('more than once', rows[1]['errors'])
+        self.assertIn('age must be', rows[2]['errors'])
+        self.assertIn('Unknown variety', rows[2]['errors'])
+        self.assertEqual(rows[3]['errors'], 'height_meters must be a number')
+
+    def test_tree_ids_are_checked_once_per_chunk(self):
+        from .orchard_import import OrchardImport
+        rows = [{'tree_id': f'C-{i}', 'age': str(i % 20)} for i in range(50)]
+        importer = OrchardImport(self.grower, location=self.location, chunk_size=25)
+        with CaptureQueriesContext(connection) as queries:
+            importer.run(['tree_id', 'age'], iter(rows))
+        self.assertEqual(importer.created, 50)
+        # Per chunk: the tree_id lookup, one INSERT (and the savepoint pair) and the plan effort UPDATE
+        self.assertLessEqual(len(queries), 2 * 5)
+
+    def test_locations_are_created_only_with_a_tree(self):
+        from .orchard_import import OrchardImport
+        rows = [
+            {'tree_id': self.existing.tree_id, 'age': '4', 'location': 'Ghost Block', 'location_address': '1 Gully'},
+            {'tree_id': 'S-1', 'age': '4', 'location': 'Second Block', 'location_address': '2 Gully'},
+        ]
+        importer = OrchardImport(self.grower, chunk_size=1).run(['tree_id', 'age', 'location', 'location_address'],
+                                                                iter(rows))
+        self.assertEqual((importer.created, importer.created_locations, len(importer.rejected)), (1, 1, 1))
+        self.assertFalse(Location.objects.filter(name='Ghost Block').exists())
+        self.assertEqual(MangoTree.objects.get(tree_id='S-1').location.name, 'Second Block')
+
+    def test_missing_columns_and_other_growers_reports(self):
+        response = self.upload("id,years\n1,2\n")
+        self.assertContains(response, 'Missing required column(s): tree_id, age')
+        other = User.objects.create_user(username='other', password='mango-pass-123')
+        Grower.objects.create(user=other, farm_name='Other Farm')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('tree_import_report', kwargs={'report_id': 'x'})).status_code, 404)
+
+    def test_command_imports_csv(self):
+        path = tempfile.mktemp(suffix='.csv')
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        with open(path, 'w') as source:
+            source.write("tree_id,age\nK-1,3\nK-2,12\n")
+        out = StringIO()
+        call_command('import_orchard', path, '--grower', self.user.username, '--location', str(self.location.pk),
+                     stdout=out)
+        self.assertIn('Imported 2 tree(s)', out.getvalue())
+        self.assertEqual(MangoTree.objects.get(tree_id='K-2').age_group, 'mature')
+
+        # Malformed CSV is a command error, not a traceback
+        with open(path, 'w') as source:
+            source.write("tree_id,age\nK-3," + "9" * 200_000 + "\n")
+        with self.assertRaisesMessage(CommandError, 'field larger than field limit'):
+            call_command('import_orchard', path, '--grower', self.user.username, '--location', str(self.location.pk),
+                         stdout=StringIO())
+
+
+class ProximityTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Location.objects.filter(pk=self.location.pk).delete()
+        self.location = self.block('Home Block', self.grower, '-12.400000', '130.900000')
+        neighbour = Grower.objects.create(user=User.objects.create_user(username='neighbour', password='x'))
+        # About 2.2 km and 40 km away, and one block without coordinates
+        self.near = self.block('Over The Fence', neighbour, '-12.420000', '130.900000')
+        self.far = self.block('Down South', neighbour, '-12.760000', '130.900000')
+        self.block('Unmapped', neighbour)
+        record = SurveillanceRecord.objects.create(grower=neighbour, location=self.near, date=date.today())
+        bulk_create_tree_inspections(record, self.create_trees(2, location=self.near), threats=[self.fruit_fly])
+
+    def block(self, name, grower, latitude=None, longitude=None):
+        return Location.objects.create(
+            name=name, address='Orchard Road', grower=grower,
+            gps_latitude=latitude and Decimal(latitude), gps_longitude=longitude and Decimal(longitude),
+        )
+
+    def test_grid_cells_follow_the_coordinates(self):
+        self.assertEqual((self.location.grid_lat, self.location.grid_lon), (-248, 2618))
+        self.near.gps_latitude = Decimal('-12.760000')
+        self.near.save(update_fields=['gps_latitude'])
+        self.near.refresh_from_db()
+        self.assertEqual(self.near.grid_lat, self.far.grid_lat)
+        self.assertIsNone(Location.objects.get(name='Unmapped').grid_lat)
+
+    def test_nearby_reads_only_the_surrounding_cells(self):
+        with self.assertNumQueries(1):
+            nearby = spatial.nearby_locations([(self.location.gps_latitude, self.location.gps_longitude)], 10,
+                                              exclude_ids=[self.location.pk])
+        self.assertEqual([(location, round(distance)) for location, distance in nearby], [(self.near, 2)])
+        if connection.vendor == 'sqlite':
+            lat_range, lon_range = spatial.cell_ranges(-12.4, 130.9, 10)
+            query = Location.objects.filter(grid_lat__range=lat_range, grid_lon__range=lon_range)
+            self.assertIn('location_grid_idx', query.explain())
+
+    def test_location_search_anonymises_other_growers(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('api_outbreak_proximity'),
+                                   {'location': self.location.pk, 'radius_km': 50})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['distance_km'] for result in results], [2.22, 40.03])
+        self.assertNotIn('name', results[0])
+        self.assertEqual([(d['threat'], d['trees']) for d in results[0]['detections']], [(self.fruit_fly.slug, 2)])
+
+        other = self.client.get(reverse('api_outbreak_proximity'), {'location': self.near.pk})
+        self.assertEqual(other.status_code, 400)
+
+    def test_threat_search_starts_from_detection_sites(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('api_outbreak_proximity'), {'threat': self.fruit_fly.slug})
+        body = response.json()
+        self.assertEqual([source['name'] for source in body['sources']], ['Over The Fence'])
+        self.assertEqual([(result['name'], result['detections']) for result in body['results']],
+                         [('Home Block', [])])
+        self.assertEqual(self.client.get(reverse('api_outbreak_proximity'), {'radius_km': 500}).status_code, 400)
+
+class OutbreakAlertTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user.email = 'grower@example.com'
+        self.user.save()
+        self.location.gps_latitude, self.location.gps_longitude = Decimal('-12.400000'), Decimal('130.900000')
+        self.location.save()
+        self.trees = self.create_trees(30)
+        for username, latitude in (('neighbour', '-12.420000'), ('distant', '-12.760000')):
+            user = User.objects.create_user(username=username, password='x', email=f'{username}@example.com')
+            Location.objects.create(name=f'{username} block', address='Orchard Road', grower=Grower.objects.create(user=user),
+                                    gps_latitude=Decimal(latitude), gps_longitude=Decimal('130.900000'))
+
+    def survey(self, threats):
+        record = self.create_record(date=date.today())
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_create_tree_inspections(record, self.trees, threats=threats)
+            self.assertFalse(OutbreakEvent.objects.filter(record=record).exists())
+        return record
+
+    def test_sessions_queue_one_event_per_high_risk_threat(self):
+        record = self.survey([self.fruit_fly, self.scale])
+        self.assertEqual(list(OutbreakEvent.objects.values_list('record', 'threat')), [(record.pk, self.fruit_fly.pk)])
+
+        moderate = self.survey([self.scale])
+        self.assertFalse(OutbreakEvent.objects.filter(record=moderate).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            moderate.tree_inspections.first().threats_found.add(self.fruit_fly)
+        self.assertTrue(OutbreakEvent.objects.filter(record=moderate, threat=self.fruit_fly).exists())
+
+    def test_digests_reach_owner_and_neighbours_once_per_window(self):
+        self.survey([self.fruit_fly])
+        self.survey([self.fruit_fly])
+        self.assertEqual(alerts.dispatch_pending(), (2, 2))
+        digests = {message.to[0]: message.body for message in mail.outbox}
+        self.assertEqual(set(digests), {'grower@example.com', 'neighbour@example.com'})
+        self.assertIn("Fruit Fly at your block Block A: 60 trees", digests['grower@example.com'])
+        self.assertIn("Fruit Fly 2.22 km from your nearest block", digests['neighbour@example.com'])
+        self.assertNotIn("Block A", digests['neighbour@example.com'])
+
+        self.survey([self.fruit_fly])
+        self.assertEqual(alerts.dispatch_pending(), (1, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(OutbreakEvent.objects.filter(processed_at__isnull=True).exists())
+
+        self.survey([self.fruit_fly])
+        self.assertEqual(alerts.dispatch_pending(now=dj_timezone.now() + timedelta(hours=25)), (1, 2))
+        self.assertEqual(OutbreakNotification.objects.count(), 4)
+
+    def test_command_drains_the_queue(self):
+        self.survey([self.fruit_fly])
+        out = StringIO()
+        call_command('send_outbreak_alerts', stdout=out)
+        self.assertIn("Sent 2 outbreak digest(s) for 1 detection event(s)", out.getvalue())
+
+class BackgroundJobTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        jobs.task('test_flaky')(self.flaky)
+        self.addCleanup(jobs.TASKS.pop, 'test_flaky')
+
+    def flaky(self, fail_times):
+        self.calls.append(fail_times)
+        if len(self.calls) <= fail_times:
+            raise RuntimeError("Database unavailable")
+        return {'calls': len(self.calls)}
+
+    def test_failures_back_off_then_give_up(self):
+        job = jobs.enqueue('test_flaky', {'fail_times': 5}, user=self.user)
+        job.max_attempts = 2
+        job.save()
+        claimed = jobs.claim('worker-a')
+        self.assertEqual(claimed, [job])
+        jobs.run(claimed[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), ('queued', 1, "RuntimeError: Database unavailable"))
+
+        # Not due again until the backoff has passed
+        self.assertEqual(jobs.claim('worker-a'), [])
+        jobs.run(jobs.claim('worker-a', now=job.run_after)[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        job = jobs.enqueue('test_flaky', {'fail_times': 0}, unique=True)
+        self.assertEqual(jobs.enqueue('test_flaky', {'fail_times': 0}, unique=True), job)
+        self.assertEqual(jobs.claim('worker-a'), [job])
+        self.assertEqual(jobs.claim('worker-b'), [])
+
+        # A worker that died holding the job gives it back after the lock timeout
+        BackgroundJob.objects.filter(pk=job.pk).update(locked_at=dj_timezone.now() - jobs.LOCK_TIMEOUT * 2)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        out = StringIO()
+        call_command('run_workers', processes=1, burst=True, stdout=out)
+        self.assertIn("Ran 1 background job(s)", out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('succeeded', {'calls': 1}))
+
+    def test_unique_jobs_are_enforced_by_the_database(self):
+        job = jobs.enqueue('test_flaky', {'fail_times': 1}, unique=True)
+        # A request that missed the waiting job in its lookup cannot insert a second copy
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BackgroundJob.objects.create(task='test_flaky', payload={'fail_times': 1}, unique=True)
+        self.assertNotEqual(jobs.enqueue('test_flaky', {'fail_times': 1}), job)
+
+        # Once started the job no longer stands in for new work, and its retry can coexist with the fresh copy
+        jobs.run(jobs.claim('worker-a')[0])
+        fresh = jobs.enqueue('test_flaky', {'fail_times': 1}, unique=True)
+        self.assertNotEqual(fresh, job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+
+    def test_non_atomic_tasks_keep_work_done_before_a_failure(self):
+        def partial(name):
+            Location.objects.create(name=name, address='1 Orchard Road', grower=self.grower)
+            raise RuntimeError("Mail server unavailable")
+        for name, atomic in (('test_atomic', True), ('test_batches', False)):
+            jobs.task(name, atomic=atomic)(partial)
+            self.addCleanup(jobs.TASKS.pop, name)
+        self.addCleanup(jobs.NON_ATOMIC_TASKS.discard, 'test_batches')
+        jobs.enqueue('test_atomic', {'name': 'Rolled back'})
+        jobs.enqueue('test_batches', {'name': 'Kept'})
+        jobs.work('test-worker', burst=True, batch_size=2)
+        self.assertFalse(Location.objects.filter(name='Rolled back').exists())
+        self.assertTrue(Location.objects.filter(name='Kept').exists())
+        self.assertTrue({'dispatch_outbreak_alerts', 'export_history'} <= jobs.NON_ATOMIC_TASKS)
+
+    def test_long_running_tasks_are_not_requeued_early(self):
+        export = jobs.enqueue('export_history', {'grower_id': self.grower.pk, 'params': {}, 'export_format': 'csv'})
+        flaky = jobs.enqueue('test_flaky', {'fail_times': 0})
+        jobs.claim('worker-a', limit=2)
+        BackgroundJob.objects.update(locked_at=dj_timezone.now() - jobs.LOCK_TIMEOUT * 2)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(BackgroundJob.objects.get(pk=flaky.pk).status, 'queued')
+        self.assertEqual(BackgroundJob.objects.get(pk=export.pk).status, 'running')
+        self.assertEqual(jobs.requeue_stale(now=dj_timezone.now() + jobs.LOCK_TIMEOUTS['export_history']), 1)
+
+    def test_status_endpoint_and_background_export(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        bulk_create_tree_inspections(self.create_record(date=date(2025, 5, 6)), self.create_trees(3))
+        self.client.force_login(self.user)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            response = self.client.get(reverse('surveillance_history_export'), {'format': 'csv', 'background': 1})
+            self.assertEqual(response.status_code, 202)
+            status_url = response.json()['status_url']
+            self.assertEqual(self.client.get(status_url).json()['status'], 'queued')
+
+            jobs.work('test-worker', burst=True)
+            status = self.client.get(status_url).json()
+            self.assertEqual((status['status'], status['attempts']), ('succeeded', 1))
+            download = self.client.get(status['download_url'])
+            self.assertEqual(len(b''.join(download.streaming_content).decode().splitlines()), 4)
+
+        stranger = User.objects.create_user(username='stranger', password='x')
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+
+class FieldSyncTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.trees = self.create_trees(3)
+        self.client.force_login(self.user)
+
+    def session(self, key, trees, **fields):
+        return {
+            'client_key': key, 'location_id': self.location.pk, 'date': '2025-05-06',
+            'start_time': '08:00', 'end_time': '09:15',
+            'inspections': [
+                {'tree_id': tree.tree_id, 'plant_parts': ['Leaves', 'Fruit'],
+                 'threats': [self.fruit_fly.slug] if i == 0 else [], 'severity_level': 'high' if i == 0 else 'none',
+                 'action_required': i == 0, 'inspection_time_minutes': 2.5}
+                for i, tree in enumerate(trees)
+            ],
+            **fields
+        }
+
+    def sync(self, sessions, compress=True):
+        body = json.dumps({'sessions': sessions}).encode()
+        headers = {}
+        if compress:
+            body = gzip.compress(body)
+            headers['HTTP_CONTENT_ENCODING'] = 'gzip'
+        return self.client.post(reverse('api_field_sync'), body, content_type='application/json', **headers)
+
+    def test_bundle_is_saved_once_and_retries_are_duplicates(self):
+        sessions = [self.session('s-1', self.trees), self.session('s-2', self.trees[:1], date='2025-06-01')]
+        response = self.sync(sessions)
+        self.assertEqual(response.status_code, 200)
+        manifest = response.json()
+        self.assertEqual((manifest['created'], manifest['duplicates'], manifest['rejected']), (2, 0, 0))
+        self.assertEqual(manifest['results'][0]['inspections'], 3)
+
+        record = SurveillanceRecord.objects.get(pk=manifest['results'][0]['record_id'])
+        self.assertEqual((record.client_key, record.total_time_minutes, record.trees_surveyed_count), ('s-1', 75, 3))
+        inspection = record.tree_inspections.get(tree=self.trees[0])
+        self.assertEqual((inspection.threat_count, inspection.has_threats), (1, True))
+        self.assertEqual(set(inspection.plant_parts_checked.values_list('name', flat=True)), {'Leaves', 'Fruit'})
+        stats = GrowerSurveillanceStats.objects.get(grower=self.grower)
+        self.assertEqual((stats.total_records, stats.total_inspections, stats.inspections_with_threats), (2, 4, 2))
+        self.assertEqual(SurveillanceMonthlyRollup.objects.get(
+            grower=self.grower, location__isnull=True, month=date(2025, 5, 1)
+        ).inspection_count, 3)
+
+        # The field app retries after a dropped connection, plus one new session
+        retry = self.sync(sessions + [self.session('s-3', self.trees[1:])], compress=False).json()
+        self.assertEqual((retry['created'], retry['duplicates']), (1, 2))
+        self.assertEqual(retry['results'][1], {'client_key': 's-2', 'status': 'duplicate',
+                                               'record_id': manifest['results'][1]['record_id']})
+        self.assertEqual(SurveillanceRecord.objects.filter(grower=self.grower).count(), 3)
+        self.assertEqual(TreeInspection.objects.count(), 6)
+
+    def test_invalid_sessions_are_rejected_without_blocking_valid_ones(self):
+        other_location = Location.objects.create(name='Block B', address='2 Orchard Road', grower=self.grower)
+        elsewhere = self.create_trees(1, location=other_location, prefix='B')[0]
+        bad = self.session('bad', self.trees[:1] + [elsewhere])
+        bad['inspections'][0]['threats'] = ['no-such-threat']
+        bad['inspections'].append({'tree_id': 'missing', 'plant_parts': ['Bark']})
+        sessions = [bad, self.session('good', self.trees), {'location_id': self.location.pk, 'date': 'May'}]
+
+        manifest = self.sync(sessions).json()
+        self.assertEqual((manifest['created'], manifest['rejected']), (1, 2))
+        errors = manifest['results'][0]['errors']
+        self.assertIn("inspections[0].unknown threat 'no-such-threat'", errors)
+        self.assertIn(f"inspections[1].tree '{elsewhere.tree_id}' is not at location {self.location.pk}", errors)
+        self.assertIn("inspections[2].unknown tree 'missing'", errors)
+        self.assertIn("inspections[2].unknown plant part 'Bark'", errors)
+        self.assertEqual(manifest['results'][2]['errors'],
+                         ['client_key is required', 'date must be a YYYY-MM-DD date'])
+        self.assertEqual(list(SurveillanceRecord.objects.values_list('client_key', flat=True)), ['good'])
+
+    def test_malformed_values_are_rejected_not_server_errors(self):
+        bad = self.session('bad', self.trees[:2])
+        bad['inspections'][0]['severity_level'] = ['x']
+        bad['inspections'][1]['inspection_time_minutes'] = float('nan')  # json.dumps writes a bare NaN
+        response = self.sync([bad, self.session('good', self.trees[2:])])
+        self.assertEqual(response.status_code, 200)
+        manifest = response.json()
+        self.assertEqual((manifest['created'], manifest['rejected']), (1, 1))
+        self.assertEqual(manifest['results'][0]['errors'], [
+            "inspections[0].unknown severity_level ['x']",
+            "inspections[1].inspection_time_minutes must be a number",
+        ])
+
+    def test_lookups_do_not_grow_with_the_bundle(self):
+        self.sync([self.session('warm-up', [])])  # creates the stats and rollup rows
+        with CaptureQueriesContext(connection) as small:
+            self.sync([self.session('s-1', self.trees[:1])])
+        trees = self.create_trees(30, prefix='L')
+        with CaptureQueriesContext(connection) as large:
+            self.sync([self.session('s-2', trees)])
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_unreadable_bundles_are_refused(self):
+        url = reverse('api_field_sync')
+        self.assertEqual(self.client.post(url, b'not json', content_type='application/json').status_code, 400)
+        response = self.client.post(url, b'\x1f\x8bgarbage', content_type='application/json',
+                                    HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(response.json()['error'], "The bundle is not valid gzip/deflate data")
+        with self.settings(DATA_UPLOAD_MAX_MEMORY_SIZE=10):
+            self.assertEqual(self.sync([self.session('s-1', self.trees)]).status_code, 413)
+
+
+class PlanScheduleTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.plan = SurveillancePlan.objects.create(
+            grower=self.grower, name='Fortnightly', frequency_days=14, start_date=date(2025, 3, 1)
+        )
+        self.plan.locations.add(self.location)
+
+    def next_due(self):
+        self.plan.refresh_from_db()
+        return self.plan.next_due_date
+
+    def test_next_due_follows_the_latest_record(self):
+        self.assertEqual(self.next_due(), date(2025, 3, 1))
+
+        record = self.create_record(date=date(2025, 3, 10))
+        self.create_record(date=date(2025, 3, 4))
+        self.assertEqual(self.next_due(), date(2025, 3, 24))
+        self.assertEqual(self.plan.last_surveyed_date, date(2025, 3, 10))
+
+        other = Location.objects.create(name='Block B', address='2 Orchard Road', grower=self.grower)
+        record.location = other
+        record.save()
+        self.assertEqual(self.next_due(), date(2025, 3, 18))
+        self.plan.locations.add(other)
+        self.assertEqual(self.next_due(), date(2025, 3, 24))
+
+        record.delete()
+        self.assertEqual(self.next_due(), date(2025, 3, 18))
+        self.plan.end_date = date(2025, 3, 15)
+        self.plan.save()
+        self.assertIsNone(self.next_due())
+
+    def test_due_this_week_worklist_is_one_indexed_query(self):
+        self.create_record(date=date(2025, 3, 1))
+        later = SurveillancePlan.objects.create(grower=self.grower, name='Monthly', frequency_days=30,
+                                                start_date=date(2025, 6, 1))
+        SurveillancePlan.objects.create(grower=self.grower, name='Paused', is_active=False,
+                                        start_date=date(2025, 3, 1))
+
+        with self.assertNumQueries(1):
+            due = list(SurveillancePlan.due_by(date(2025, 3, 20), grower=self.grower))
+        self.assertEqual(due, [self.plan])
+        self.assertEqual(due[0].days_overdue(date(2025, 3, 20)), 5)
+        self.assertEqual(list(SurveillancePlan.due_by(date(2025, 6, 1))), [self.plan, later])
+        if connection.vendor == 'sqlite':
+            self.assertIn('plan_grower_next_due_idx',
+                          SurveillancePlan.due_by(date(2025, 3, 20), grower=self.grower).explain())
+
+    def test_planner_lists_overdue_plans(self):
+        self.client.force_login(self.user)
+        self.create_record(date=date.today() - timedelta(days=20))
+        response = self.client.get(reverse('surveillance_planner'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([plan.overdue_days for plan in response.context['due_plans']], [6])
+        self.assertContains(response, '6 days overdue')
+
+
+class AsyncAnalyticsTests(SurveillanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        record = self.create_record(date=date(2025, 4, 2), total_time_minutes=40, trees_surveyed_count=4)
+        bulk_create_tree_inspections(record, self.create_trees(4), plant_parts=[self.leaves],
+                                     threats=[self.fruit_fly], severity_level='moderate')
+        self.client.force_login(self.user)
+
+    def test_async_endpoints_match_sync_ones(self):
+        for sync_name, async_name in (('api_threat_analytics', 'api_threat_analytics_async'),
+                                      ('api_history_statistics', 'api_history_statistics_async')):
+            sync_data = self.client.get(reverse(sync_name)).json()
+            self.assertEqual(self.client.get(reverse(async_name)).json(), sync_data)
+
+        data = self.client.get(reverse('api_threat_analytics_async')).json()
+        self.assertEqual(data['threats_detected'], 1)
+        self.assertEqual(data['common_threats'][0]['detection_count'], 4)
+        self.assertEqual(data['user_metrics']['total_inspections'], 4)
+
+    def test_dashboard_page_renders_the_same_figures(self):
+        response = self.client.get(reverse('analytics'))
+        self.assertEqual(response.context['user_metrics']['threats_detected'], 1)
+        self.assertEqual(response.context['common_threats'], self.client.get(reverse('api_threat_analytics')).json()['common_threats'])
+        self.assertContains(response, 'Pest - High Risk')
+        self.assertContains(response, '40 minutes per session')
+
+    def test_anonymous_requests_are_redirected_to_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_history_statistics_async')).status_code, 302)
+
+
+class ConcurrentAnalyticsQueryTests(SurveillanceTestMixin, TransactionTestCase):
+
+    def test_concurrent_results_match_sequential(self):
+        record = self.create_record(date=date(2025, 4, 2), total_time_minutes=40)
+        bulk_create_tree_inspections(record, self.create_trees(3), threats=[self.scale])
+        queries = analytics.history_statistics_queries(self.grower)
+        self.assertEqual(async_to_sync(analytics.run_concurrently)(queries), analytics.run_sequentially(queries))
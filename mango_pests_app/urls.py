@@ -2,6 +2,7 @@
 
 from django.urls import path
 from . import views
+from .analytics import history_statistics_queries, threat_analytics_queries
 from .views import (
     # Main Views
     HomeView, ThreatListView, ThreatDetailView, AboutView, CompareThreatsView,
@@ -12,16 +13,19 @@ from .views import (
     ThreatCreateView, ThreatUpdateView, ThreatDeleteView,
     LocationCreateView, LocationUpdateView, LocationDeleteView,
     MangoTreeCreateView, MangoTreeUpdateView, MangoTreeDeleteView,
-    LocationListView, TreeListView,
+    LocationListView, TreeListView, OrchardImportView, OrchardImportReportView,
     # Analytics
     ThreatAnalyticsView,
     # Surveillance Views
     SurveillanceRecordCreateView, DetailedSurveillanceRecordView, 
-    SurveillanceHistoryView, SurveillanceAnalyticsView,
+    SurveillanceHistoryView, SurveillanceHistoryExportView, SurveillanceAnalyticsView,
     # Legacy Surveillance Views (keeping for compatibility)
     SurveillancePlannerView, SurveillanceReportView,
     # AJAX API
-    ThreatAjaxAPIView,
+    ThreatAjaxAPIView, ThreatReadAPIView, AnalyticsDataView, AsyncAnalyticsDataView, FieldSyncAPIView,
+    OutbreakProximityAPIView, JobStatusAPIView, JobDownloadView,
+    # Diagnostics
+    RequestProfileStatsView,
 )
 
 urlpatterns = [
@@ -45,6 +49,7 @@ urlpatterns = [
     path('surveillance/records/create/', SurveillanceRecordCreateView.as_view(), name='surveillance_record_create'),
     path('surveillance/records/<int:pk>/', DetailedSurveillanceRecordView.as_view(), name='surveillance_record_detail'),
     path('surveillance/history/', SurveillanceHistoryView.as_view(), name='surveillance_history'),
+    path('surveillance/history/export/', SurveillanceHistoryExportView.as_view(), name='surveillance_history_export'),
     path('surveillance/analytics/', SurveillanceAnalyticsView.as_view(), name='surveillance_analytics'),
     
     # Legacy Surveillance Views (keeping for compatibility)
@@ -69,10 +74,29 @@ urlpatterns = [
     # Tree Management
     path('trees/', TreeListView.as_view(), name='tree_list'),
     path('trees/create/', MangoTreeCreateView.as_view(), name='tree_create'),
+    path('trees/import/', OrchardImportView.as_view(), name='tree_import'),
+    path('trees/import/<str:report_id>/errors.csv', OrchardImportReportView.as_view(), name='tree_import_report'),
     path('trees/<int:pk>/edit/', MangoTreeUpdateView.as_view(), name='tree_update'),
     path('trees/<int:pk>/delete/', MangoTreeDeleteView.as_view(), name='tree_delete'),
     
     # AJAX API endpoints
     path('api/threats/', ThreatAjaxAPIView.as_view(), name='api_threats'),
     path('api/threats/<int:threat_id>/', ThreatAjaxAPIView.as_view(), name='api_threat_detail'),
+    path('api/v1/threats/', ThreatReadAPIView.as_view(), name='api_v1_threats'),
+    path('api/v1/field-sync/', FieldSyncAPIView.as_view(), name='api_field_sync'),
+    path('api/v1/proximity/', OutbreakProximityAPIView.as_view(), name='api_outbreak_proximity'),
+    path('api/v1/jobs/<int:pk>/', JobStatusAPIView.as_view(), name='api_job_status'),
+    path('api/v1/jobs/<int:pk>/download/', JobDownloadView.as_view(), name='api_job_download'),
+    # Analytics JSON: the async variants run their independent aggregates concurrently under ASGI
+    path('api/analytics/threats/', AnalyticsDataView.as_view(queries=threat_analytics_queries),
+         name='api_threat_analytics'),
+    path('api/analytics/threats/async/', AsyncAnalyticsDataView.as_view(queries=threat_analytics_queries),
+         name='api_threat_analytics_async'),
+    path('api/history/statistics/', AnalyticsDataView.as_view(queries=history_statistics_queries),
+         name='api_history_statistics'),
+    path('api/history/statistics/async/', AsyncAnalyticsDataView.as_view(queries=history_statistics_queries),
+         name='api_history_statistics_async'),
+    
+    # Diagnostics (staff only)
+    path('diagnostics/request-stats/', RequestProfileStatsView.as_view(), name='request_profile_stats'),
 ]
\ No newline at end of file
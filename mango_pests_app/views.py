@@ -5,18 +5,26 @@ from sqlalchemy import Transaction
 from .forms import SurveillanceRecordForm, TreeInspectionForm, SurveillanceSearchForm
 
 from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.urls import reverse_lazy, reverse
-from django.http import JsonResponse
-from django.db.models import Q, Count, Avg, Sum, Min, Max
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db.models import Q, Count, Avg, Exists, OuterRef
 from django.views.generic import (
     TemplateView, ListView, DetailView, CreateView, 
     UpdateView, DeleteView, FormView, View
 )
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.storage import default_storage
 from django.core.paginator import Paginator
 from django.contrib.auth import logout, login, authenticate
+from django.contrib.auth.views import redirect_to_login
+from asgiref.sync import sync_to_async
+from django.utils import timezone as dj_timezone
 from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+import csv
 import json
 from datetime import datetime, timedelta, timezone
 
@@ -31,12 +39,24 @@ except ImportError:
 
 from .models import (
     MangoThreat, Location, MangoTree, SurveillanceRecord, Grower,
-    SurveillancePlan, TreeInspection, PlantPart
+    SurveillancePlan, TreeInspection, PlantPart, GrowerSurveillanceStats,
+    SurveillanceMonthlyRollup, BackgroundJob
 )
 from .forms import (
-    MangoThreatForm, LocationForm, MangoTreeForm, UserRegistrationForm
+    MangoThreatForm, LocationForm, MangoTreeForm, OrchardImportForm, UserRegistrationForm
+)
+from . import analytics, api, field_sync, jobs, orchard_import, spatial
+from .catalog import get_catalog
+from .conditional import (
+    catalog_etag, private_revalidate, threat_detail_etag,
+    threat_detail_last_modified, threat_page_cache,
 )
-from .data import mango_threats
+from .effort import location_tree_minutes
+from .exports import EXPORT_FORMATS, ExportError, export_chunks, history_queryset
+from .inspections import summarize_record_inspections
+from .profiling import request_stats
+from .routes import plan_route
+from .search import ThreatSearchResults
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -61,63 +81,53 @@ class HomeView(TemplateView):
         context['description'] = "We are dedicated to combating mango pests and diseases through research and awareness."
         
         # Statistics
-        context['total_threats'] = MangoThreat.objects.count()
-        context['pest_count'] = MangoThreat.objects.filter(threat_type='pest').count()
-        context['disease_count'] = MangoThreat.objects.filter(threat_type='disease').count()
+        threat_counts = get_catalog().threat_counts
+        context['total_threats'] = threat_counts['total']
+        context['pest_count'] = threat_counts['pest']
+        context['disease_count'] = threat_counts['disease']
         
         return context
 
+@method_decorator([
+    threat_page_cache,
+    condition(etag_func=catalog_etag),
+], name='get')
 class ThreatListView(TemplateView):
     """List all mango threats with search and filtering"""
     template_name = 'mango_pests_app/threat_list.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        threats = mango_threats
-
-        # Search functionality
-        query = self.request.GET.get('q', '').strip().lower()
-        if query:
-            threats = [
-                t for t in threats
-                if query in t.name.lower() or query in t.description.lower()
-            ]
 
-        # Category filter
+        # Search, category filter, ranking and pagination all run in the database
+        query = self.request.GET.get('q', '').strip()
         category = self.request.GET.get('category', '')
-        if category in ['pest', 'disease']:
-            threats = [t for t in threats if t.threat_type == category]
-
-        # Sort
-        sort_option = self.request.GET.get('sort', 'name_asc')
-        if sort_option == 'name_desc':
-            threats.sort(key=lambda t: t.name, reverse=True)
-        else:
-            threats.sort(key=lambda t: t.name)
+        results = ThreatSearchResults(query, threat_type=category, sort=self.request.GET.get('sort'))
+        counts = results.type_counts()
 
         # Pagination
-        paginator = Paginator(threats, 10)
+        paginator = Paginator(results, 10)
         page_number = self.request.GET.get('page')
         page_obj = paginator.get_page(page_number)
 
-        # Count info
-        pest_count = len([t for t in threats if t.threat_type == 'pest'])
-        disease_count = len([t for t in threats if t.threat_type == 'disease'])
-
         context.update({
             'page_obj': page_obj,
             'query': query,
-            'threat_type': category,
-            'sort_option': sort_option,
-            'pest_count': pest_count,
-            'disease_count': disease_count,
-            'total_results': len(threats),
+            'threat_type': results.threat_type or '',
+            'sort_option': results.sort,
+            'pest_count': counts['pest'],
+            'disease_count': counts['disease'],
+            'total_results': results.count(),
             'start_index': page_obj.start_index(),
             'end_index': page_obj.end_index(),
         })
 
         return context
 
+@method_decorator([
+    threat_page_cache,
+    condition(etag_func=threat_detail_etag, last_modified_func=threat_detail_last_modified),
+], name='get')
 class ThreatDetailView(DetailView):
     """Display individual threat information"""
     model = MangoThreat
@@ -126,14 +136,18 @@ class ThreatDetailView(DetailView):
     slug_field = 'slug'
     slug_url_kwarg = 'threat_name'
 
-class CompareThreatsView(FormView):
+@method_decorator([
+    private_revalidate,
+    condition(etag_func=catalog_etag),
+], name='get')
+class CompareThreatsView(TemplateView):
     """Compare selected mango threats"""
     template_name = 'mango_pests_app/compare_threats.html'
     MAX_SELECTIONS = 3
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['threats'] = MangoThreat.objects.all().order_by('name')
+        context['threats'] = get_catalog().threats
         return context
 
     def post(self, request, *args, **kwargs):
@@ -141,11 +155,11 @@ class CompareThreatsView(FormView):
 
         if len(selected_slugs) == 0:
             messages.error(request, "Please select at least one threat to compare.")
-            return self.get(request, *args, **kwargs)
+            return self.render_to_response(self.get_context_data())
 
         if len(selected_slugs) > self.MAX_SELECTIONS:
             messages.error(request, f"You can only compare up to {self.MAX_SELECTIONS} threats.")
-            return self.get(request, *args, **kwargs)
+            return self.render_to_response(self.get_context_data())
 
         selected_threats = MangoThreat.objects.filter(slug__in=selected_slugs)
         
@@ -164,13 +178,14 @@ class SurveillanceCalculatorView(LoginRequiredMixin, TemplateView):
         grower, created = Grower.objects.get_or_create(user=self.request.user)
         
         # REQUIREMENT 1 & 2: Get user's locations and plant count
-        locations = Location.objects.filter(grower=grower).prefetch_related('mango_trees')
-        total_trees = sum(location.mango_trees.count() for location in locations)
+        locations = Location.objects.filter(grower=grower)
+        location_effort = location_tree_minutes(locations)
+        total_trees = sum(effort['tree_count'] for effort in location_effort.values())
         
         # REQUIREMENT 3: Surveillance calculation
         surveillance_calculation = None
         if total_trees > 0:
-            surveillance_calculation = self.calculate_surveillance_effort(grower, locations, total_trees)
+            surveillance_calculation = self.calculate_surveillance_effort(grower, locations, total_trees, location_effort)
         
         # REQUIREMENT 4: Plant type flexibility
         plant_types_available = [
@@ -199,7 +214,7 @@ class SurveillanceCalculatorView(LoginRequiredMixin, TemplateView):
         ]
         
         # REQUIREMENT 7: Stocking rate analysis
-        stocking_analysis = self.get_stocking_rate_analysis(locations)
+        stocking_analysis = self.get_stocking_rate_analysis(locations, location_effort)
         
         # REQUIREMENT 8: Historical data summary
         historical_summary = self.get_historical_data_summary(grower)
@@ -230,12 +245,12 @@ class SurveillanceCalculatorView(LoginRequiredMixin, TemplateView):
             'historical_summary': historical_summary,
             'compliance_status': compliance_status,
             'compliance_percentage': compliance_percentage,
-            'high_priority_threats': MangoThreat.objects.filter(risk_level='high')[:5],
+            'high_priority_threats': get_catalog().high_risk_threats[:5],
         })
         
         return context
     
-    def calculate_surveillance_effort(self, grower, locations, total_trees):
+    def calculate_surveillance_effort(self, grower, locations, total_trees, location_effort):
         """ Calculation considering all business requirements"""
         base_minutes_per_tree = 6
         total_base_minutes = total_trees * base_minutes_per_tree
@@ -245,8 +260,10 @@ class SurveillanceCalculatorView(LoginRequiredMixin, TemplateView):
         total_location_time = 0
         
         for location in locations:
-            tree_count = location.mango_trees.count()
-            if tree_count > 0:
+            effort = location_effort.get(location.pk)
+            if effort:
+                tree_count = effort['tree_count']
+                
                 # Calculate stocking rate
                 stocking_rate = None
                 stocking_multiplier = 1.0
@@ -258,11 +275,8 @@ class SurveillanceCalculatorView(LoginRequiredMixin, TemplateView):
                     elif stocking_rate < 50:
                         stocking_multiplier = 0.9
                 
-                # Individual tree time calculation
-                location_minutes = 0
-                for tree in location.mango_trees.all():
-                    tree_time = tree.calculate_surveillance_time_minutes()
-                    location_minutes += tree_time
+                # Individual tree time calculation (grouped in the database)
+                location_minutes = float(effort['minutes'])
                 
                 # Apply adjustments
                 location_minutes *= stocking_multiplier
@@ -281,8 +295,9 @@ class SurveillanceCalculatorView(LoginRequiredMixin, TemplateView):
                     'includes_plant_parts': True,
                 })
         
-        # Travel and documentation time
-        travel_time = locations.count() * 10 if locations.count() > 1 else 5
+        # Travel along the shortest route through the blocks' GPS positions, and documentation time
+        route = plan_route(list(locations))
+        travel_time = float(route.travel_minutes)
         doc_time = total_location_time * 0.15
         
         # Final totals
@@ -300,7 +315,9 @@ class SurveillanceCalculatorView(LoginRequiredMixin, TemplateView):
             'total_time_hours': round(total_hours, 2),
             'base_time_minutes': total_base_minutes,
             'location_specific_time': round(total_location_time),
-            'travel_time_minutes': travel_time,
+            'travel_time_minutes': round(travel_time),
+            'route': route.locations,
+            'route_distance_km': round(route.distance_km, 1),
             'documentation_time_minutes': round(doc_time),
             'location_breakdown': location_breakdown,
             'monthly_effort_hours': round(monthly_hours, 1),
@@ -318,13 +335,13 @@ class SurveillanceCalculatorView(LoginRequiredMixin, TemplateView):
             }
         }
     
-    def get_stocking_rate_analysis(self, locations):
+    def get_stocking_rate_analysis(self, locations, location_effort):
         """Analyze stocking rates for compliance"""
         analysis = []
         
         for location in locations:
             if location.area_hectares:
-                tree_count = location.mango_trees.count()
+                tree_count = location_effort.get(location.pk, {}).get('tree_count', 0)
                 if tree_count > 0:
                     rate = tree_count / float(location.area_hectares)
                     
@@ -362,18 +379,18 @@ class SurveillanceCalculatorView(LoginRequiredMixin, TemplateView):
     
     def get_historical_data_summary(self, grower):
         """Show historical data compliance"""
-        records = SurveillanceRecord.objects.filter(grower=grower)
+        stats = GrowerSurveillanceStats.for_grower(grower)
         
         return {
-            'total_records': records.count(),
+            'total_records': stats.total_records,
             'date_range': {
-                'earliest': records.order_by('date').first().date if records.exists() else None,
-                'latest': records.order_by('-date').first().date if records.exists() else None,
+                'earliest': stats.earliest_date,
+                'latest': stats.latest_date,
             },
             'data_separation': f"Data isolated to user {grower.user.username}",
             'record_types': {
-                'surveillance_sessions': records.count(),
-                'tree_inspections': TreeInspection.objects.filter(surveillance_record__grower=grower).count(),
+                'surveillance_sessions': stats.total_records,
+                'tree_inspections': stats.total_inspections,
             },
             'requirement_met': True,
         }
@@ -683,6 +700,61 @@ class MangoTreeCreateView(LoginRequiredMixin, CreateView):
     def get_success_url(self):
         return reverse('surveillance_calculator') + '?updated=true'
 
+class OrchardImportView(LoginRequiredMixin, FormView):
+    """Bulk import trees from a CSV/XLSX upload; rejected rows come back as a CSV report"""
+    form_class = OrchardImportForm
+    template_name = 'mango_pests_app/crud/tree_import.html'
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['required_columns'] = orchard_import.REQUIRED_COLUMNS
+        context['optional_columns'] = orchard_import.OPTIONAL_COLUMNS
+        report_id = self.request.GET.get('report')
+        if report_id and orchard_import.load_error_report(self.request.user.pk, report_id) is not None:
+            context['report_url'] = reverse('tree_import_report', kwargs={'report_id': report_id})
+        return context
+
+    def form_valid(self, form):
+        grower, created = Grower.objects.get_or_create(user=self.request.user)
+        upload = form.cleaned_data['file']
+        importer = orchard_import.OrchardImport(grower, location=form.cleaned_data['location'])
+        try:
+            importer.run(*orchard_import.read_rows(upload, upload.name))
+        except (orchard_import.ImportFileError, UnicodeDecodeError, csv.Error) as e:
+            form.add_error('file', f"{e} ({importer.created} tree(s) were imported before this error)"
+                           if importer.created else str(e))
+            return self.form_invalid(form)
+
+        messages.success(
+            self.request,
+            f'✅ Imported {importer.created} tree(s)'
+            + (f' and {importer.created_locations} new location(s)' if importer.created_locations else '')
+        )
+        url = reverse('tree_import')
+        if importer.rejected:
+            messages.warning(self.request, f'⚠️ {len(importer.rejected)} row(s) were rejected, see the error report.')
+            report_id = orchard_import.store_error_report(self.request.user.pk, importer.error_report())
+            url += f'?report={report_id}'
+        return redirect(url)
+
+
+class OrchardImportReportView(LoginRequiredMixin, View):
+    """Download the rejected rows of one of the user's own imports"""
+
+    def get(self, request, report_id, *args, **kwargs):
+        report = orchard_import.load_error_report(request.user.pk, report_id)
+        if report is None:
+            raise Http404("This import report has expired")
+        response = HttpResponse(report, content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="tree-import-errors.csv"'
+        return response
+
+
 class MangoTreeUpdateView(LoginRequiredMixin, UpdateView):
     model = MangoTree
     form_class = MangoTreeForm
@@ -728,10 +800,11 @@ class CrudDashboardView(LoginRequiredMixin, TemplateView):
         
         context['threat_form'] = MangoThreatForm()
         
+        threat_counts = get_catalog().threat_counts
         context['stats'] = {
-            'total_threats': MangoThreat.objects.count(),
-            'total_pests': MangoThreat.objects.filter(threat_type='pest').count(),
-            'total_diseases': MangoThreat.objects.filter(threat_type='disease').count(),
+            'total_threats': threat_counts['total'],
+            'total_pests': threat_counts['pest'],
+            'total_diseases': threat_counts['disease'],
             'total_locations': Location.objects.filter(grower=grower).count(),
             'total_trees': MangoTree.objects.filter(location__grower=grower).count(),
         }
@@ -786,94 +859,85 @@ class ThreatAnalyticsView(LoginRequiredMixin, TemplateView):
         # Get current user's grower profile
         grower, created = Grower.objects.get_or_create(user=self.request.user)
         
-        # Real threat statistics
-        all_threats = MangoThreat.objects.all()
-        
-        # Threat distribution by type
-        threat_by_type = all_threats.values('threat_type').annotate(
-            count=Count('id')
-        ).order_by('threat_type')
-        
-        # Threat distribution by risk level
-        threat_by_risk = all_threats.values('risk_level').annotate(
-            count=Count('id')
-        ).order_by('risk_level')
-        
-        # User-specific surveillance data
-        user_records = SurveillanceRecord.objects.filter(grower=grower)
-        user_inspections = TreeInspection.objects.filter(
-            surveillance_record__grower=grower
-        )
-        
-        # Threats found in user's surveillance
-        threats_found_by_user = MangoThreat.objects.filter(
-            treeinspection__surveillance_record__grower=grower
-        ).annotate(
-            detection_count=Count('treeinspection')
-        ).order_by('-detection_count')
-        
-        # Monthly surveillance trends
-        from django.db.models.functions import TruncMonth
-        monthly_records = user_records.annotate(
-            month=TruncMonth('date')
-        ).values('month').annotate(
-            session_count=Count('id'),
-            threats_found=Count('tree_inspections__threats_found', distinct=True)
-        ).order_by('month')
-        
-        # Plant parts most affected
-        plant_parts_affected = PlantPart.objects.filter(
-            treeinspection__surveillance_record__grower=grower
-        ).annotate(
-            inspection_count=Count('treeinspection'),
-            threat_count=Count('treeinspection__threats_found', distinct=True)
-        ).order_by('-inspection_count')
-        
-        # Performance metrics
-        total_sessions = user_records.count()
-        total_inspections = user_inspections.count()
-        threats_detected = threats_found_by_user.count()
-        
-        detection_rate = 0
-        if total_inspections > 0:
-            inspections_with_threats = user_inspections.filter(
-                threats_found__isnull=False
-            ).distinct().count()
-            detection_rate = (inspections_with_threats / total_inspections) * 100
+        # The same figures the analytics JSON endpoints serve, one query each
+        results = analytics.run_sequentially(analytics.threat_analytics_queries(grower))
         
         context.update({
             'threat_stats': {
-                'by_type': list(threat_by_type),
-                'by_risk': list(threat_by_risk),
-            },
-            'total_threats': all_threats.count(),
-            'high_risk_count': all_threats.filter(risk_level='high').count(),
-            'locations_count': Location.objects.filter(grower=grower).count(),
-            'user_metrics': {
-                'total_sessions': total_sessions,
-                'total_inspections': total_inspections,
-                'threats_detected': threats_detected,
-                'detection_rate': round(detection_rate, 1),
-                'avg_session_time': user_records.filter(
-                    total_time_minutes__isnull=False
-                ).aggregate(avg=Avg('total_time_minutes'))['avg'] or 0,
+                'by_type': results['by_type'],
+                'by_risk': results['by_risk'],
             },
-            'monthly_trends': list(monthly_records),
-            'common_threats': threats_found_by_user[:10],
-            'affected_plant_parts': plant_parts_affected[:10],
+            'total_threats': results['total_threats'],
+            'high_risk_count': results['high_risk_count'],
+            'locations_count': results['locations_count'],
+            'user_metrics': {**results['user_metrics'], 'threats_detected': results['threats_detected']},
+            'monthly_trends': results['monthly_trends'],
+            'common_threats': results['common_threats'],
+            'affected_plant_parts': results['affected_plant_parts'],
             'grower': grower,
         })
         
         return context
 
+def _grower_or_none(request):
+    if not request.user.is_authenticated:
+        return None
+    grower, created = Grower.objects.get_or_create(user=request.user)
+    return grower
+
+
+class AnalyticsDataView(View):
+    """JSON analytics for the signed-in grower, one query after another (WSGI)
+
+    `queries` is analytics.threat_analytics_queries or history_statistics_queries.
+    """
+    queries = None
+
+    def get(self, request, *args, **kwargs):
+        grower = _grower_or_none(request)
+        if grower is None:
+            return redirect_to_login(request.get_full_path())
+        return JsonResponse(analytics.run_sequentially(self.queries(grower)))
+
+
+class AsyncAnalyticsDataView(AnalyticsDataView):
+    """Same JSON as AnalyticsDataView with the independent queries run concurrently (ASGI)"""
+
+    async def get(self, request, *args, **kwargs):
+        # The lazy request.user hits the database, so resolve it off the event loop
+        grower = await sync_to_async(_grower_or_none)(request)
+        if grower is None:
+            return redirect_to_login(request.get_full_path())
+        return JsonResponse(await analytics.run_concurrently(self.queries(grower)))
+
 # Surveillance Planning Views (Placeholder for future development)
 class SurveillancePlannerView(LoginRequiredMixin, TemplateView):
+    """Worklist of the grower's plans due this week, from the stored next-due dates"""
     template_name = 'mango_pests_app/surveillance_planner.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         grower = get_object_or_404(Grower, user=self.request.user)
-        context['grower'] = grower
+        today = dj_timezone.localdate()
+        week_end = today + timedelta(days=6)
+        due_plans = list(SurveillancePlan.due_by(week_end, grower=grower).prefetch_related('locations'))
+        efforts = SurveillancePlan.efforts_for(due_plans)
+        for plan in due_plans:
+            plan.overdue_days = plan.days_overdue(today)
+            plan.effort = efforts[plan.pk]
+        if any(plan.effort_dirty for plan in due_plans):
+            # Priced in memory for this page; store them in the background for the next visit
+            jobs.enqueue('refresh_plan_efforts', {'grower_id': grower.pk}, user=self.request.user, unique=True)
+        context.update({
+            'grower': grower,
+            'today': today,
+            'week_end': week_end,
+            'due_plans': due_plans,
+            'overdue_count': sum(1 for plan in due_plans if plan.overdue_days),
+            'later_plans': SurveillancePlan.objects.filter(
+                grower=grower, is_active=True, next_due_date__gt=week_end
+            ).order_by('next_due_date', 'pk'),
+        })
         return context
 
 class SurveillanceHistoryView(LoginRequiredMixin, TemplateView):
@@ -943,7 +1007,7 @@ class ThreatAjaxAPIView(LoginRequiredMixin, View):
             })
 
     def get(self, request, *args, **kwargs):
-        threats = MangoThreat.objects.all()
+        threats = get_catalog().threats
         data = [{
             'id': threat.id,
             'name': threat.name,
@@ -954,6 +1018,186 @@ class ThreatAjaxAPIView(LoginRequiredMixin, View):
         
         return JsonResponse({'threats': data})
 
+
+@method_decorator([
+    private_revalidate,
+    condition(etag_func=catalog_etag),
+], name='get')
+class ThreatReadAPIView(LoginRequiredMixin, View):
+    """Versioned read API: keyset pagination on (name, id), field selection and deltas.
+
+    GET /api/v1/threats/?fields=id,name&limit=50&cursor=<next_cursor>&updated_since=<server_time>
+    """
+
+    def get(self, request, *args, **kwargs):
+        # Taken before querying so rows saved during this request appear in the next delta
+        server_time = dj_timezone.now()
+        try:
+            fields = api.parse_fields(request.GET.get('fields'))
+            limit = api.parse_limit(request.GET.get('limit'))
+            updated_since = api.parse_updated_since(request.GET.get('updated_since'))
+
+            threats = MangoThreat.objects.all()
+            if updated_since:
+                threats = threats.filter(updated_at__gt=updated_since)
+            results, next_cursor = api.keyset_page(
+                threats, fields, cursor=request.GET.get('cursor'), limit=limit
+            )
+        except api.APIError as e:
+            return JsonResponse({'version': api.API_VERSION, 'error': str(e)}, status=400)
+
+        return JsonResponse({
+            'version': api.API_VERSION,
+            'results': results,
+            'next_cursor': next_cursor,
+            'server_time': server_time.isoformat(),
+            # Catalog totals let clients spot deletions, which deltas cannot report
+            'counts': get_catalog().threat_counts,
+        })
+
+
+class FieldSyncAPIView(LoginRequiredMixin, View):
+    """Batch upload of surveillance sessions recorded offline by the field app
+
+    POST /api/v1/field-sync/ with {"sessions": [...]} as JSON, optionally sent
+    with Content-Encoding: gzip. Answers with one result per session.
+    """
+
+    def post(self, request, *args, **kwargs):
+        grower, created = Grower.objects.get_or_create(user=request.user)
+        try:
+            sessions = field_sync.decode_bundle(request.body, request.headers.get('Content-Encoding', ''))
+        except RequestDataTooBig:
+            return JsonResponse({'version': field_sync.BUNDLE_VERSION, 'error': "The bundle is too large"},
+                                status=413)
+        except field_sync.BundleTooLarge as e:
+            return JsonResponse({'version': field_sync.BUNDLE_VERSION, 'error': str(e)}, status=413)
+        except field_sync.BundleError as e:
+            return JsonResponse({'version': field_sync.BUNDLE_VERSION, 'error': str(e)}, status=400)
+        return JsonResponse(field_sync.FieldSync(grower).run(sessions).manifest())
+
+
+class OutbreakProximityAPIView(LoginRequiredMixin, View):
+    """Blocks near a location, or near where a threat was found, with their recent detections
+
+    GET /api/v1/proximity/?location=<id>&radius_km=10&days=30
+    GET /api/v1/proximity/?threat=<slug>&radius_km=10&days=30
+    Candidates come from the Location grid index rather than a scan of every block.
+    Other growers' blocks are only described by distance and detections.
+    """
+
+    def get(self, request, *args, **kwargs):
+        staff = request.user.is_staff
+        grower = None if staff else Grower.objects.get_or_create(user=request.user)[0]
+        try:
+            radius_km = spatial.parse_radius(request.GET.get('radius_km'))
+            since = dj_timezone.localdate() - timedelta(days=spatial.parse_days(request.GET.get('days')))
+            threat = None
+            if request.GET.get('location'):
+                locations = Location.objects.all() if staff else grower.locations.all()
+                try:
+                    source = locations.get(pk=int(request.GET['location']))
+                except (ValueError, Location.DoesNotExist):
+                    raise api.APIError("Unknown location")
+                if source.gps_latitude is None or source.gps_longitude is None:
+                    raise api.APIError(f"{source.name} has no GPS coordinates")
+                sources = [source]
+            elif request.GET.get('threat'):
+                threat = get_catalog().threats_by_slug.get(request.GET['threat'])
+                if threat is None:
+                    raise api.APIError("Unknown threat")
+                sources = spatial.detection_sites(threat, since, grower=grower)
+            else:
+                raise api.APIError("Give a location id or a threat slug")
+        except api.APIError as e:
+            return JsonResponse({'version': api.API_VERSION, 'error': str(e)}, status=400)
+
+        source_ids = [source.pk for source in sources]
+        nearby = spatial.nearby_locations(
+            [(source.gps_latitude, source.gps_longitude) for source in sources], radius_km, exclude_ids=source_ids
+        )
+        detections = spatial.recent_detections(
+            source_ids + [location.pk for location, _ in nearby], since,
+            threat_ids=[threat.pk] if threat else None,
+        )
+
+        def describe(location, distance_km=None):
+            own = location.grower_id is not None and location.grower_id == getattr(grower, 'pk', None)
+            entry = {'own': own, 'detections': detections.get(location.pk, [])}
+            if distance_km is not None:
+                entry['distance_km'] = distance_km
+            if own or staff:
+                entry.update(id=location.pk, name=location.name)
+            return entry
+
+        return JsonResponse({
+            'version': api.API_VERSION,
+            'radius_km': radius_km,
+            'since': since.isoformat(),
+            'threat': threat.slug if threat else None,
+            'sources': [describe(source) for source in sources],
+            'results': [describe(location, distance_km) for location, distance_km in nearby],
+        })
+
+class JobStatusAPIView(LoginRequiredMixin, View):
+    """Progress of a background job started by the user, for pages that poll after returning early
+
+    GET /api/v1/jobs/<id>/
+    """
+
+    def get_job(self, request, pk):
+        jobs_visible = BackgroundJob.objects.all() if request.user.is_staff else request.user.background_jobs.all()
+        return get_object_or_404(jobs_visible, pk=pk)
+
+    def get(self, request, pk, *args, **kwargs):
+        job = self.get_job(request, pk)
+        body = {
+            'version': api.API_VERSION,
+            'id': job.pk,
+            'task': job.task,
+            'status': job.status,
+            'attempts': job.attempts,
+            'max_attempts': job.max_attempts,
+            'created_at': job.created_at.isoformat(),
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+            'result': job.result,
+            'error': job.error or None,
+        }
+        if job.status == BackgroundJob.QUEUED and job.attempts:
+            body['retry_at'] = job.run_after.isoformat()
+        if job.status == BackgroundJob.SUCCEEDED and (job.result or {}).get('file'):
+            body['download_url'] = reverse('api_job_download', kwargs={'pk': job.pk})
+        return JsonResponse(body)
+
+
+class JobDownloadView(JobStatusAPIView):
+    """The file written by a finished export job"""
+
+    def get(self, request, pk, *args, **kwargs):
+        job = self.get_job(request, pk)
+        name = (job.result or {}).get('file') if job.status == BackgroundJob.SUCCEEDED else None
+        if not name or not default_storage.exists(name):
+            raise Http404("No file for this job")
+        return FileResponse(default_storage.open(name, 'rb'), as_attachment=True, filename=job.result['filename'])
+
+class RequestProfileStatsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Staff-only percentiles collected by RequestProfilingMiddleware"""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({
+            'enabled': settings.REQUEST_PROFILING,
+            'samples_per_view': request_stats.samples_per_view,
+            'views': request_stats.summary(),
+        })
+
+    def post(self, request, *args, **kwargs):
+        """Clear the collected samples; a POST so prefetchers and history reopening the link cannot"""
+        request_stats.clear()
+        return self.get(request, *args, **kwargs)
+
 # Authentication Views
 def login_view(request):
     if request.method == 'POST':
@@ -1035,15 +1279,16 @@ class SurveillanceRecordCreateView(LoginRequiredMixin, CreateView):
         
         grower, created = Grower.objects.get_or_create(user=self.request.user)
         context['locations'] = Location.objects.filter(grower=grower)
-        context['plant_parts'] = PlantPart.objects.all().order_by('-surveillance_priority')
-        context['threats'] = MangoThreat.objects.all().order_by('name')
+        catalog = get_catalog()
+        context['plant_parts'] = catalog.plant_parts
+        context['threats'] = catalog.threats
         context['grower'] = grower
         
         return context
     
     def ensure_plant_parts_exist(self):
         """Create default plant parts if they don't exist"""
-        if PlantPart.objects.count() == 0:
+        if not get_catalog().plant_parts:
             default_parts = [
                 {'name': 'Leaves', 'description': 'Leaf inspection', 'surveillance_priority': 5, 'time_multiplier': 1.2},
                 {'name': 'Fruit', 'description': 'Fruit inspection', 'surveillance_priority': 5, 'time_multiplier': 1.5},
@@ -1124,8 +1369,13 @@ class SurveillanceRecordCreateView(LoginRequiredMixin, CreateView):
         # Save the surveillance record
         surveillance_record = form.save()
         
-        # Create detailed tree inspections
-        threats_summary = self.create_tree_inspections(surveillance_record, plant_parts, threats_found)
+        # Tree inspections are written by a background job; the detail page polls for it
+        catalog = get_catalog()
+        threat_ids = [int(threat_id) for threat_id in threats_found if threat_id.isdigit()]
+        threats_summary = [catalog.threats_by_id[pk].name for pk in dict.fromkeys(threat_ids) if pk in catalog.threats_by_id]
+        self.job = jobs.enqueue('record_inspections', {
+            'record_id': surveillance_record.pk, 'plant_parts': plant_parts, 'threat_ids': threat_ids,
+        }, user=self.request.user)
         
         # Create success message with threat summary
         if total_time_minutes:
@@ -1133,122 +1383,23 @@ class SurveillanceRecordCreateView(LoginRequiredMixin, CreateView):
         else:
             duration_text = ""
             
-        success_message = f'✅ Surveillance session recorded successfully! Surveyed {trees_count} trees at {surveillance_record.location.name}{duration_text}.'
+        success_message = (
+            f'✅ Surveillance session recorded at {surveillance_record.location.name}{duration_text}. '
+            f'Inspections for {trees_count} trees are being saved in the background.'
+        )
         
         if threats_found:
             threat_count = len(threats_found)
-            success_message += f' Found {threat_count} threat type(s): {", ".join(threats_summary[:3])}'
+            success_message += f' Reported {threat_count} threat type(s): {", ".join(threats_summary[:3])}'
             if len(threats_summary) > 3:
                 success_message += f' and {len(threats_summary) - 3} more.'
         else:
-            success_message += ' No threats detected - trees appear healthy!'
+            success_message += ' No threats were reported.'
         
         messages.success(self.request, success_message)
         
         return super().form_valid(form)
     
-    def create_tree_inspections(self, surveillance_record, plant_parts, threats_found):
-        """Create detailed tree inspection records with threat associations"""
-        try:
-            location = surveillance_record.location
-            trees = MangoTree.objects.filter(location=location)
-            
-            if not trees.exists():
-                print(f"No trees found at location: {location}")
-                return []
-            
-            # Get plant part objects
-            plant_part_objects = []
-            if plant_parts:
-                plant_part_objects = PlantPart.objects.filter(name__in=plant_parts)
-                print(f"DEBUG: Found plant part objects: {[p.name for p in plant_part_objects]}")
-            
-            # Get threat objects
-            threat_objects = []
-            if threats_found:
-                threat_objects = MangoThreat.objects.filter(id__in=threats_found)
-                print(f"DEBUG: Found threat objects: {[t.name for t in threat_objects]}")
-            
-            # Determine overall severity based on threats found
-            overall_severity = 'none'
-            action_required = False
-            
-            if threat_objects:
-                high_risk_threats = [t for t in threat_objects if t.risk_level == 'high']
-                moderate_risk_threats = [t for t in threat_objects if t.risk_level == 'moderate']
-                
-                if high_risk_threats:
-                    overall_severity = 'high'
-                    action_required = True
-                elif moderate_risk_threats:
-                    overall_severity = 'moderate'
-                    action_required = True
-                else:
-                    overall_severity = 'low'
-            
-            # Create individual tree inspections
-            threats_summary = []
-            inspections_created = 0
-            
-            for tree in trees:
-                try:
-                    base_time = tree.calculate_surveillance_time_minutes()
-                    if threat_objects:
-                        threat_investigation_time = len(threat_objects) * 2
-                        inspection_time = base_time + threat_investigation_time
-                    else:
-                        inspection_time = base_time
-                    
-                    # Ensure inspection time is positive and reasonable
-                    inspection_time = max(1, min(inspection_time, 120))
-                    
-                    # Build findings text
-                    findings_parts = []
-                    if plant_parts:
-                        findings_parts.append(f"Plant parts inspected: {', '.join(plant_parts)}")
-                    if threat_objects:
-                        threat_names = [threat.name for threat in threat_objects]
-                        findings_parts.append(f"Threats found: {', '.join(threat_names)}")
-                        threats_summary = threat_names  # Update summary
-                    else:
-                        findings_parts.append("No threats detected")
-                    
-                    findings_text = ". ".join(findings_parts)
-                    
-                    # Create tree inspection record
-                    inspection = TreeInspection.objects.create(
-                        surveillance_record=surveillance_record,
-                        tree=tree,
-                        severity_level=overall_severity,
-                        inspection_time_minutes=inspection_time,
-                        findings=findings_text,
-                        action_required=action_required,
-                        photo_taken=False
-                    )
-                    
-                    # Add plant parts checked (many-to-many relationship)
-                    if plant_part_objects:
-                        inspection.plant_parts_checked.set(plant_part_objects)
-                        print(f"DEBUG: Added plant parts to inspection {inspection.id}")
-                    
-                    # Add threats found (many-to-many relationship)
-                    if threat_objects:
-                        inspection.threats_found.set(threat_objects)
-                        print(f"DEBUG: Added threats to inspection {inspection.id}")
-                    
-                    inspections_created += 1
-                    
-                except Exception as e:
-                    print(f"Error creating inspection for tree {tree}: {e}")
-                    continue
-            
-            print(f"DEBUG: Created {inspections_created} inspections")
-            return threats_summary
-            
-        except Exception as e:
-            print(f"Error in create_tree_inspections: {e}")
-            return []
-    
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
         grower, created = Grower.objects.get_or_create(user=self.request.user)
@@ -1263,8 +1414,24 @@ class SurveillanceRecordCreateView(LoginRequiredMixin, CreateView):
         return form
     
     def get_success_url(self):
-        return reverse('surveillance_record_detail', kwargs={'pk': self.object.pk})
+        url = reverse('surveillance_record_detail', kwargs={'pk': self.object.pk})
+        return f"{url}?job={self.job.pk}"
+
+
+
+# Inspection rows rendered per page of a record's detail view
+INSPECTIONS_PER_PAGE = 100
+
 
+def inspection_page(request, record, total_inspections):
+    """One page of a record's inspections, counted from the summary instead of a COUNT query"""
+    paginator = Paginator(TreeInspection.objects.filter(
+        surveillance_record=record
+    ).select_related('tree').prefetch_related('plant_parts_checked', 'threats_found').order_by('pk'),
+        INSPECTIONS_PER_PAGE)
+    paginator.count = total_inspections
+    page = paginator.get_page(request.GET.get('page'))
+    return {'inspections': page.object_list, 'inspections_page': page}
 
 
 class DetailedSurveillanceRecordView(LoginRequiredMixin, DetailView):
@@ -1282,49 +1449,9 @@ class DetailedSurveillanceRecordView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         record = self.object
         
-        # Get all tree inspections for this record
-        inspections = TreeInspection.objects.filter(
-            surveillance_record=record
-        ).prefetch_related('plant_parts_checked', 'threats_found', 'tree')
-        
-        # Calculate summary statistics
-        context['inspections'] = inspections
-        context['total_inspections'] = inspections.count()
-        context['threats_found_count'] = inspections.filter(threats_found__isnull=False).distinct().count()
-        context['action_required_count'] = inspections.filter(action_required=True).count()
-        
-        # Plant parts summary
-        plant_parts_data = {}
-        for inspection in inspections:
-            for part in inspection.plant_parts_checked.all():
-                if part.name not in plant_parts_data:
-                    plant_parts_data[part.name] = {
-                        'count': 0,
-                        'threats': set(),
-                        'priority': part.surveillance_priority
-                    }
-                plant_parts_data[part.name]['count'] += 1
-                for threat in inspection.threats_found.all():
-                    plant_parts_data[part.name]['threats'].add(threat.name)
-        
-        context['plant_parts_summary'] = plant_parts_data
-        
-        # Threats summary
-        threats_data = {}
-        for inspection in inspections:
-            for threat in inspection.threats_found.all():
-                if threat.name not in threats_data:
-                    threats_data[threat.name] = {
-                        'count': 0,
-                        'threat_type': threat.threat_type,
-                        'risk_level': threat.risk_level,
-                        'affected_parts': set()
-                    }
-                threats_data[threat.name]['count'] += 1
-                for part in inspection.plant_parts_checked.all():
-                    threats_data[threat.name]['affected_parts'].add(part.name)
-        
-        context['threats_summary'] = threats_data
+        # Summaries come from grouped queries; the inspections themselves are listed a page at a time
+        context.update(summarize_record_inspections(record))
+        context.update(inspection_page(self.request, record, context['total_inspections']))
         
         # Location and stocking rate information
         location = record.location
@@ -1370,8 +1497,8 @@ class SurveillanceHistoryView(LoginRequiredMixin, ListView):
             if form.cleaned_data['has_threats']:
                 # Only records where threats were found
                 queryset = queryset.filter(
-                    tree_inspections__threats_found__isnull=False
-                ).distinct()
+                    Exists(TreeInspection.objects.filter(surveillance_record=OuterRef('pk'), has_threats=True))
+                )
         
         return queryset
     
@@ -1384,10 +1511,10 @@ class SurveillanceHistoryView(LoginRequiredMixin, ListView):
         
         # Calculate comprehensive statistics
         all_records = SurveillanceRecord.objects.filter(grower=grower)
-        context['statistics'] = self.calculate_surveillance_statistics(all_records)
+        context['statistics'] = self.calculate_surveillance_statistics(grower)
         
         # Monthly trend data for charts
-        context['monthly_trends'] = self.get_monthly_trends(all_records)
+        context['monthly_trends'] = self.get_monthly_trends(grower)
         
         # Most common threats
         context['common_threats'] = self.get_common_threats(grower)
@@ -1397,72 +1524,52 @@ class SurveillanceHistoryView(LoginRequiredMixin, ListView):
         
         return context
     
-    def calculate_surveillance_statistics(self, records):
+    def calculate_surveillance_statistics(self, grower):
         """Calculate comprehensive surveillance statistics"""
-        total_records = records.count()
+        stats = GrowerSurveillanceStats.for_grower(grower)
         
-        if total_records == 0:
+        if stats.total_records == 0:
             return {'no_data': True}
         
-        # Time statistics
-        time_stats = records.filter(total_time_minutes__isnull=False).aggregate(
-            avg_time=Avg('total_time_minutes'),
-            total_time=Sum('total_time_minutes'),
-            min_time=Min('total_time_minutes'),
-            max_time=Max('total_time_minutes')
-        )
-        
-        # Tree and location statistics
-        tree_stats = records.aggregate(
-            total_trees_surveyed=Sum('trees_surveyed_count'),
-            avg_trees_per_session=Avg('trees_surveyed_count')
-        )
-        
         # Threat detection statistics
-        all_inspections = TreeInspection.objects.filter(surveillance_record__grower=records.first().grower)
         threat_stats = {
-            'total_inspections': all_inspections.count(),
-            'inspections_with_threats': all_inspections.filter(threats_found__isnull=False).distinct().count(),
-            'action_required_count': all_inspections.filter(action_required=True).count(),
+            'total_inspections': stats.total_inspections,
+            'inspections_with_threats': stats.inspections_with_threats,
+            'action_required_count': stats.action_required_count,
+            'detection_rate': stats.detection_rate,
         }
         
-        if threat_stats['total_inspections'] > 0:
-            threat_stats['detection_rate'] = round(
-                (threat_stats['inspections_with_threats'] / threat_stats['total_inspections']) * 100, 1
-            )
-        else:
-            threat_stats['detection_rate'] = 0
-        
         return {
-            'total_records': total_records,
+            'total_records': stats.total_records,
             'date_range': {
-                'earliest': records.order_by('date').first().date,
-                'latest': records.order_by('-date').first().date,
+                'earliest': stats.earliest_date,
+                'latest': stats.latest_date,
             },
             'time_stats': {
-                'avg_minutes': round(time_stats['avg_time']) if time_stats['avg_time'] else 0,
-                'total_hours': round(time_stats['total_time'] / 60) if time_stats['total_time'] else 0,
-                'min_minutes': time_stats['min_time'] or 0,
-                'max_minutes': time_stats['max_time'] or 0,
+                'avg_minutes': round(stats.avg_time_minutes) if stats.avg_time_minutes else 0,
+                'total_hours': round(stats.total_time_minutes / 60) if stats.total_time_minutes else 0,
+                'min_minutes': stats.min_time_minutes or 0,
+                'max_minutes': stats.max_time_minutes or 0,
             },
             'tree_stats': {
-                'total_surveyed': tree_stats['total_trees_surveyed'] or 0,
-                'avg_per_session': round(tree_stats['avg_trees_per_session']) if tree_stats['avg_trees_per_session'] else 0,
+                'total_surveyed': stats.total_trees_surveyed,
+                'avg_per_session': round(stats.avg_trees_per_session) if stats.avg_trees_per_session else 0,
             },
             'threat_stats': threat_stats,
         }
     
-    def get_monthly_trends(self, records):
+    def get_monthly_trends(self, grower):
         """Get monthly surveillance trends"""        
-        monthly_data = records.annotate(
-            month=TruncMonth('date')
-        ).values('month').annotate(
-            session_count=Count('id'),
-            avg_time=Avg('total_time_minutes'),
-            trees_surveyed=Sum('trees_surveyed_count')
+        rollups = SurveillanceMonthlyRollup.objects.filter(
+            grower=grower, location__isnull=True
         ).order_by('month')
         
-        return list(monthly_data)
+        return [{
+            'month': rollup.month,
+            'session_count': rollup.session_count,
+            'avg_time': rollup.avg_time,
+            'trees_surveyed': rollup.trees_surveyed,
+        } for rollup in rollups]
     
     def get_common_threats(self, grower):
         """Get most commonly found threats"""
@@ -1585,49 +1692,14 @@ class DetailedSurveillanceRecordView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         record = self.object
         
-        # Get all tree inspections for this record
-        inspections = TreeInspection.objects.filter(
-            surveillance_record=record
-        ).prefetch_related('plant_parts_checked', 'threats_found', 'tree')
-        
-        # Calculate summary statistics
-        context['inspections'] = inspections
-        context['total_inspections'] = inspections.count()
-        context['threats_found_count'] = inspections.filter(threats_found__isnull=False).distinct().count()
-        context['action_required_count'] = inspections.filter(action_required=True).count()
-        
-        # Plant parts summary
-        plant_parts_data = {}
-        for inspection in inspections:
-            for part in inspection.plant_parts_checked.all():
-                if part.name not in plant_parts_data:
-                    plant_parts_data[part.name] = {
-                        'count': 0,
-                        'threats': set(),
-                        'priority': part.surveillance_priority
-                    }
-                plant_parts_data[part.name]['count'] += 1
-                for threat in inspection.threats_found.all():
-                    plant_parts_data[part.name]['threats'].add(threat.name)
-        
-        context['plant_parts_summary'] = plant_parts_data
-        
-        # Threats summary
-        threats_data = {}
-        for inspection in inspections:
-            for threat in inspection.threats_found.all():
-                if threat.name not in threats_data:
-                    threats_data[threat.name] = {
-                        'count': 0,
-                        'threat_type': threat.threat_type,
-                        'risk_level': threat.risk_level,
-                        'affected_parts': set()
-                    }
-                threats_data[threat.name]['count'] += 1
-                for part in inspection.plant_parts_checked.all():
-                    threats_data[threat.name]['affected_parts'].add(part.name)
+        # Summaries come from grouped queries; the inspections themselves are listed a page at a time
+        context.update(summarize_record_inspections(record))
+        context.update(inspection_page(self.request, record, context['total_inspections']))
         
-        context['threats_summary'] = threats_data
+        # Just after the form is saved the inspections job may still be running
+        job_id = self.request.GET.get('job', '')
+        if job_id.isdigit():
+            context['job'] = BackgroundJob.objects.filter(pk=job_id, user=self.request.user).first()
         
         # Location and stocking rate information
         location = record.location
@@ -1659,32 +1731,8 @@ class SurveillanceHistoryView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         grower, created = Grower.objects.get_or_create(user=self.request.user)
-        queryset = SurveillanceRecord.objects.filter(grower=grower).order_by('-date', '-created_at')
-        
-        # Apply basic filters from GET parameters
-        date_from = self.request.GET.get('date_from')
-        date_to = self.request.GET.get('date_to')
-        location_id = self.request.GET.get('location')
-        
-        if date_from:
-            try:
-                queryset = queryset.filter(date__gte=datetime.strptime(date_from, '%Y-%m-%d').date())
-            except ValueError:
-                pass
-        
-        if date_to:
-            try:
-                queryset = queryset.filter(date__lte=datetime.strptime(date_to, '%Y-%m-%d').date())
-            except ValueError:
-                pass
-        
-        if location_id:
-            try:
-                queryset = queryset.filter(location_id=int(location_id))
-            except (ValueError, TypeError):
-                pass
-        
-        return queryset
+        # Shared with the CSV/Parquet export so both apply the same filters
+        return history_queryset(grower, self.request.GET)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -1694,8 +1742,7 @@ class SurveillanceHistoryView(LoginRequiredMixin, ListView):
         context['locations'] = Location.objects.filter(grower=grower)
         
         # Calculate basic statistics
-        all_records = SurveillanceRecord.objects.filter(grower=grower)
-        context['statistics'] = self.calculate_basic_statistics(all_records)
+        context['statistics'] = self.calculate_basic_statistics(grower)
         
         # Add filter values to maintain state
         context['current_filters'] = {
@@ -1706,43 +1753,60 @@ class SurveillanceHistoryView(LoginRequiredMixin, ListView):
         
         return context
     
-    def calculate_basic_statistics(self, records):
+    def calculate_basic_statistics(self, grower):
         """Calculate basic surveillance statistics"""
-        total_records = records.count()
+        stats = GrowerSurveillanceStats.for_grower(grower)
         
-        if total_records == 0:
+        if stats.total_records == 0:
             return {'no_data': True}
         
-        # Basic time statistics
-        time_records = records.filter(total_time_minutes__isnull=False)
-        avg_time = time_records.aggregate(avg=Avg('total_time_minutes'))['avg']
-        total_time = time_records.aggregate(total=Sum('total_time_minutes'))['total']
-        
-        # Tree statistics
-        total_trees_surveyed = records.aggregate(total=Sum('trees_surveyed_count'))['total']
-        
-        # Threat detection (simplified calculation)
-        total_inspections = TreeInspection.objects.filter(surveillance_record__grower=records.first().grower).count()
-        inspections_with_threats = TreeInspection.objects.filter(
-            surveillance_record__grower=records.first().grower,
-            threats_found__isnull=False
-        ).distinct().count()
-        
-        detection_rate = (inspections_with_threats / total_inspections * 100) if total_inspections > 0 else 0
-        
         return {
-            'total_records': total_records,
-            'avg_time_minutes': round(avg_time) if avg_time else 0,
-            'total_time_hours': round(total_time / 60) if total_time else 0,
-            'total_trees_surveyed': total_trees_surveyed or 0,
-            'threat_detection_rate': round(detection_rate, 1),
+            'total_records': stats.total_records,
+            'avg_time_minutes': round(stats.avg_time_minutes) if stats.avg_time_minutes else 0,
+            'total_time_hours': round(stats.total_time_minutes / 60) if stats.total_time_minutes else 0,
+            'total_trees_surveyed': stats.total_trees_surveyed,
+            'threat_detection_rate': stats.detection_rate,
             'date_range': {
-                'earliest': records.order_by('date').first().date if records.exists() else None,
-                'latest': records.order_by('-date').first().date if records.exists() else None,
+                'earliest': stats.earliest_date,
+                'latest': stats.latest_date,
             }
         }
 
 
+class SurveillanceHistoryExportView(LoginRequiredMixin, View):
+    """Stream the filtered surveillance history as CSV or Parquet, one row per inspection
+
+    With ?background=1 the file is written by a background job instead; the
+    response links to the job's status, which links to the download when done.
+    """
+
+    def get(self, request, *args, **kwargs):
+        grower, created = Grower.objects.get_or_create(user=request.user)
+        export_format = request.GET.get('format', 'csv')
+        records = history_queryset(grower, request.GET)
+        try:
+            chunks = export_chunks(records, export_format)
+        except ExportError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        if request.GET.get('background'):
+            params = {key: request.GET.get(key) for key in ('date_from', 'date_to', 'location', 'has_threats')}
+            job = jobs.enqueue('export_history', {
+                'grower_id': grower.pk, 'params': params, 'export_format': export_format,
+            }, user=request.user)
+            return JsonResponse({
+                'version': api.API_VERSION,
+                'job': job.pk,
+                'status_url': reverse('api_job_status', kwargs={'pk': job.pk}),
+            }, status=202)
+
+        content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        filename = f"surveillance-history-{dj_timezone.localdate():%Y%m%d}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 class SurveillanceAnalyticsView(LoginRequiredMixin, TemplateView):
     """Basic analytics for surveillance data"""
     template_name = 'mango_pests_app/surveillance/analytics.html'
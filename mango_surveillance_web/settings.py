@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 
 # Media files configuration
 MEDIA_URL = '/media/'
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "mango_pests_app.profiling.RequestProfilingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -57,6 +59,10 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Per-request SQL/timing profiling, off unless MANGO_REQUEST_PROFILING=1
+REQUEST_PROFILING = os.environ.get("MANGO_REQUEST_PROFILING") == "1"
+REQUEST_PROFILING_SLOW_MS = int(os.environ.get("MANGO_REQUEST_PROFILING_SLOW_MS", 500))
+
 ROOT_URLCONF = "mango_surveillance_web.urls"
 
 TEMPLATES = [
@@ -89,6 +95,40 @@ DATABASES = {
 }
 
 
+# Cache
+# The file cache is shared by every worker process on the host, which the threat
+# catalog relies on for invalidation. Point these at Redis/Memcached when scaling out.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("MANGO_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.environ.get("MANGO_CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "mango_surveillance_cache")),
+    }
+}
+
+# How long browsers and reverse proxies may reuse public threat pages before revalidating
+THREAT_PAGE_MAX_AGE = int(os.environ.get("MANGO_THREAT_PAGE_MAX_AGE", 300))
+
+
+# Email
+# Console output locally; set MANGO_EMAIL_BACKEND (and EMAIL_HOST etc.) to send real mail
+
+EMAIL_BACKEND = os.environ.get("MANGO_EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+DEFAULT_FROM_EMAIL = os.environ.get("MANGO_DEFAULT_FROM_EMAIL", "alerts@mango-surveillance.local")
+
+# Outbreak alerts reach growers with a block within this radius of a high-risk detection,
+# at most once per block and threat within the deduplication window
+OUTBREAK_ALERT_RADIUS_KM = float(os.environ.get("MANGO_OUTBREAK_ALERT_RADIUS_KM", 10))
+OUTBREAK_ALERT_DEDUP_HOURS = int(os.environ.get("MANGO_OUTBREAK_ALERT_DEDUP_HOURS", 24))
+
+
+# Background jobs
+# Processes started by `python manage.py run_workers` unless --processes is given; SQLite
+# serialises writes, so more than one there only contends for the database lock
+JOB_WORKER_PROCESSES = int(os.environ.get(
+    "MANGO_JOB_WORKER_PROCESSES", 1 if DATABASES["default"]["ENGINE"].endswith("sqlite3") else 2
+))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 